@@ -1,17 +1,290 @@
 import os
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional
+
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import monitoring
 from beanie import init_beanie
-from backend.models import Village
-
-async def init_db():
-    # Use standard MongoDB connection string
-    # Default to localhost if not set
-    mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    
-    # Define database name
-    db_name = os.getenv("MONGODB_DB_NAME", "indest_db")
-    db = client[db_name]
-    
-    # Initialize Beanie with the Village document model
-    await init_beanie(database=db, document_models=[Village])
+from backend.models import Village, IndicatorVersion, RegionalTrend
+
+# ==========================================
+# SETTINGS
+# ==========================================
+
+def _env_int(name: str, default: Optional[int]) -> Optional[int]:
+    value = os.getenv(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+@dataclass(frozen=True)
+class DatabaseSettings:
+    """
+    Connection settings shared by the API and every script.
+    All values can be overridden with MONGODB_* environment variables.
+    """
+    url: str = "mongodb://localhost:27017"
+    db_name: str = "indest_db"
+    app_name: str = "indest"
+    max_pool_size: int = 50
+    min_pool_size: int = 0
+    max_idle_time_ms: Optional[int] = 300000
+    wait_queue_timeout_ms: Optional[int] = 10000
+    connect_timeout_ms: int = 10000
+    server_selection_timeout_ms: int = 10000
+    socket_timeout_ms: Optional[int] = None
+    compressors: str = "zlib"
+    zlib_compression_level: int = 6
+    read_preference: str = "primaryPreferred"
+
+    @classmethod
+    def from_env(cls) -> "DatabaseSettings":
+        return cls(
+            url=os.getenv("MONGODB_URL", cls.url),
+            db_name=os.getenv("MONGODB_DB_NAME", cls.db_name),
+            app_name=os.getenv("MONGODB_APP_NAME", cls.app_name),
+            max_pool_size=_env_int("MONGODB_MAX_POOL_SIZE", cls.max_pool_size),
+            min_pool_size=_env_int("MONGODB_MIN_POOL_SIZE", cls.min_pool_size),
+            max_idle_time_ms=_env_int("MONGODB_MAX_IDLE_TIME_MS", cls.max_idle_time_ms),
+            wait_queue_timeout_ms=_env_int("MONGODB_WAIT_QUEUE_TIMEOUT_MS", cls.wait_queue_timeout_ms),
+            connect_timeout_ms=_env_int("MONGODB_CONNECT_TIMEOUT_MS", cls.connect_timeout_ms),
+            server_selection_timeout_ms=_env_int("MONGODB_SERVER_SELECTION_TIMEOUT_MS", cls.server_selection_timeout_ms),
+            socket_timeout_ms=_env_int("MONGODB_SOCKET_TIMEOUT_MS", cls.socket_timeout_ms),
+            compressors=os.getenv("MONGODB_COMPRESSORS", cls.compressors),
+            zlib_compression_level=_env_int("MONGODB_ZLIB_COMPRESSION_LEVEL", cls.zlib_compression_level),
+            read_preference=os.getenv("MONGODB_READ_PREFERENCE", cls.read_preference),
+        )
+
+    def client_options(self) -> Dict:
+        """Keyword arguments passed straight to AsyncIOMotorClient."""
+        options = {
+            "appname": self.app_name,
+            "maxPoolSize": self.max_pool_size,
+            "minPoolSize": self.min_pool_size,
+            "connectTimeoutMS": self.connect_timeout_ms,
+            "serverSelectionTimeoutMS": self.server_selection_timeout_ms,
+            "readPreference": self.read_preference,
+        }
+        if self.max_idle_time_ms is not None:
+            options["maxIdleTimeMS"] = self.max_idle_time_ms
+        if self.wait_queue_timeout_ms is not None:
+            options["waitQueueTimeoutMS"] = self.wait_queue_timeout_ms
+        if self.socket_timeout_ms is not None:
+            options["socketTimeoutMS"] = self.socket_timeout_ms
+        if self.compressors:
+            # zstd/snappy need their optional modules; pymongo warns and skips them otherwise
+            options["compressors"] = self.compressors
+            options["zlibCompressionLevel"] = self.zlib_compression_level
+        return options
+
+# ==========================================
+# POOL METRICS
+# ==========================================
+
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool events so we can see how much of the pool is
+    actually used (useful for sizing Atlas connection limits).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self.pools = 0
+            self.open_connections = 0
+            self.checked_out = 0
+            self.peak_checked_out = 0
+            self.waiting = 0
+            self.peak_waiting = 0
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.pool_clears = 0
+            self._wait_ms_total = 0.0
+            self._wait_ms_max = 0.0
+
+    # Pool lifecycle
+    def pool_created(self, event):
+        with self._lock:
+            self.pools += 1
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pool_clears += 1
+
+    def pool_closed(self, event):
+        with self._lock:
+            self.pools = max(self.pools - 1, 0)
+
+    # Connection lifecycle
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+            self.open_connections += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+            self.open_connections = max(self.open_connections - 1, 0)
+
+    # Checkout lifecycle
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+            self.peak_waiting = max(self.peak_waiting, self.waiting)
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting = max(self.waiting - 1, 0)
+            self.checkout_failures += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting = max(self.waiting - 1, 0)
+            self.checked_out += 1
+            self.checkouts += 1
+            self.peak_checked_out = max(self.peak_checked_out, self.checked_out)
+            # `duration` (seconds) is only reported by newer pymongo releases
+            duration = getattr(event, "duration", None)
+            if duration is not None:
+                wait_ms = duration * 1000
+                self._wait_ms_total += wait_ms
+                self._wait_ms_max = max(self._wait_ms_max, wait_ms)
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out = max(self.checked_out - 1, 0)
+
+    def snapshot(self, max_pool_size: int) -> Dict:
+        with self._lock:
+            capacity = max_pool_size * max(self.pools, 1)
+            return {
+                "pools": self.pools,
+                "max_pool_size": max_pool_size,
+                "open_connections": self.open_connections,
+                "checked_out": self.checked_out,
+                "peak_checked_out": self.peak_checked_out,
+                "waiting": self.waiting,
+                "peak_waiting": self.peak_waiting,
+                "utilization": round(self.checked_out / capacity, 4) if capacity else 0.0,
+                "peak_utilization": round(self.peak_checked_out / capacity, 4) if capacity else 0.0,
+                "checkouts": self.checkouts,
+                "checkout_failures": self.checkout_failures,
+                "avg_checkout_wait_ms": round(self._wait_ms_total / self.checkouts, 3) if self.checkouts else 0.0,
+                "max_checkout_wait_ms": round(self._wait_ms_max, 3),
+                "connections_created": self.connections_created,
+                "connections_closed": self.connections_closed,
+                "pool_clears": self.pool_clears,
+            }
+
+# ==========================================
+# EMBEDDED MODE (NO MONGO)
+# ==========================================
+
+def is_embedded() -> bool:
+    """
+    INDEST_STORAGE=embedded serves everything from data/podes_dashboard_data.csv
+    (see services/embedded_store.py) without any network I/O.
+    """
+    return os.getenv("INDEST_STORAGE", "mongo").strip().lower() == "embedded"
+
+
+class _EmbeddedCollection:
+    def __init__(self, name: str):
+        self.name = name
+
+    def __getattr__(self, item):
+        raise RuntimeError(
+            f"{self.name}.{item}() needs MongoDB; with INDEST_STORAGE=embedded read through the village repository"
+        )
+
+
+class EmbeddedDatabase:
+    """
+    Just enough of a Motor database for init_beanie, so Village documents
+    can be built and validated without a server. Any query raises.
+    """
+    name = "embedded"
+
+    async def command(self, command, *args, **kwargs):
+        if "buildInfo" in command:
+            return {"version": "7.0.0"}
+        raise RuntimeError(f"Command {command} not supported with INDEST_STORAGE=embedded")
+
+    def __getitem__(self, name: str):
+        return _EmbeddedCollection(name)
+
+# ==========================================
+# CLIENT (ONE PER PROCESS)
+# ==========================================
+
+pool_metrics = PoolMetricsListener()
+
+_client: Optional[AsyncIOMotorClient] = None
+_settings: Optional[DatabaseSettings] = None
+
+
+def get_client(settings: Optional[DatabaseSettings] = None) -> AsyncIOMotorClient:
+    """
+    Returns the process-wide Motor client, creating it on first use.
+    """
+    global _client, _settings
+    if _client is None:
+        _settings = settings or DatabaseSettings.from_env()
+        _client = AsyncIOMotorClient(
+            _settings.url,
+            event_listeners=[pool_metrics],
+            **_settings.client_options(),
+        )
+    return _client
+
+
+def get_database():
+    client = get_client()
+    return client[_settings.db_name]
+
+
+DOCUMENT_MODELS = [Village, IndicatorVersion, RegionalTrend]
+
+
+async def init_db(document_models: Optional[List] = None, settings: Optional[DatabaseSettings] = None):
+    """
+    Initializes Beanie on the shared client. Used by the API startup hook
+    and by every script under scripts/.
+    """
+    document_models = document_models or DOCUMENT_MODELS
+    if is_embedded():
+        await init_beanie(database=EmbeddedDatabase(), document_models=document_models, skip_indexes=True)
+        return
+    get_client(settings)
+    await init_beanie(database=get_database(), document_models=document_models)
+
+
+def close_db():
+    global _client, _settings
+    if _client is not None:
+        _client.close()
+    _client = None
+    _settings = None
+
+
+def get_pool_stats() -> Dict:
+    settings = _settings or DatabaseSettings.from_env()
+    stats = pool_metrics.snapshot(settings.max_pool_size)
+    stats["connected"] = _client is not None
+    stats["storage"] = "embedded" if is_embedded() else "mongo"
+    stats["read_preference"] = settings.read_preference
+    stats["compressors"] = settings.compressors
+    return stats
@@ -1,8 +1,9 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.gzip import GZipMiddleware
+from pydantic import ValidationError
 from dotenv import load_dotenv
 import os
 
@@ -10,16 +11,25 @@ import os
 # This fixes the issue where running from root ignores backend/.env
 env_path = os.path.join(os.path.dirname(__file__), ".env")
 load_dotenv(env_path)
-from typing import List
-from backend.database import init_db
+from typing import List, Optional
+from datetime import datetime, timezone
+from backend.database import init_db, close_db, get_pool_stats
 from backend.models import Village, AIAnalysis, VillageMacroProjection
-from backend.schemas import MacroResponse, MicroResponse, VillageMacro, VillageMicro, HealthRadar, EducationFunnel, IndependenceIndex, AIInsights, AISwot
-from backend.services.analytics import ScoringAlgorithm
+from backend.schemas import MacroResponse, MicroResponse, VillageMacro, VillageMicro, HealthRadar, EducationFunnel, IndependenceIndex, AIInsights, AISwot, SearchResponse, TrendResponse, InsightJobResponse, InsightSearchResponse, WhatIfRequest, WhatIfResponse, RankingsResponse
+from backend.services.ai_service import insight_events
+from backend.services.analytics import ScoringAlgorithm, clustering_service
 from backend.services.geofencing import geofence_service
+from backend.services.insight_jobs import insight_jobs, QueueFull
+from backend.services.insight_search import insight_search_index
+from backend.services.rankings import METRICS, ranking_index
+from backend.services.rate_limit import RateLimited
+from backend.services.repository import keep_unless_data_changed, village_repository
+from backend.services.scoring import active_scoring, snapshot_features, what_if
+from backend.services.search import village_search_index
+from backend.services.trends import get_trend
 import time
-import math
-import os
 import json
+import os
 
 app = FastAPI(title="Village Intelligence Dashboard API")
 
@@ -37,75 +47,59 @@ app.add_middleware(
 @app.on_event("startup")
 async def on_startup():
     await init_db()
+    # Warm the snapshot so the first request doesn't pay for the full load
+    try:
+        await village_repository.refresh()
+    except Exception as e:
+        print(f"WARNING: initial village load failed: {e}")
+    insight_jobs.start()
+
+@app.on_event("shutdown")
+async def on_shutdown():
+    await insight_jobs.stop()
+    close_db()
+
+@app.get("/api/metrics/db-pool")
+def get_db_pool_metrics():
+    """
+    Connection pool utilization for the shared Mongo client.
+    Use peak_checked_out / peak_waiting to size MONGODB_MAX_POOL_SIZE.
+    """
+    return get_pool_stats()
 
 # Logic moved to end of file
 
-# Simple In-Memory Cache
-MACRO_CACHE = {"data": None, "expiry": 0}
-BOUNDARIES_CACHE = None
-CACHE_DURATION = 300  # 5 minutes
+# All villages live in one immutable in-memory snapshot (see services/repository.py).
+# Endpoints read from it; a background version check swaps in new data.
+def on_snapshot_swap(previous, snapshot):
+    if village_search_index.rebuild_if_changed(snapshot.search_rows()):
+        print(f"DEBUG search: index rebuilt with {len(village_search_index)} villages")
+    changed = insight_search_index.sync(snapshot)
+    if changed:
+        print(f"DEBUG search: {changed} analyses (re)indexed, {len(insight_search_index)} searchable")
+    ranking_index.sync(snapshot)
+
+village_repository.subscribe(on_snapshot_swap)
 
 @app.get("/api/boundaries")
 def get_boundaries():
     """
     Get GeoJSON boundaries for all villages.
-    Cached in memory for performance.
+    Loaded and serialized once, shared with the geofence service.
     """
-    global BOUNDARIES_CACHE
-    if BOUNDARIES_CACHE:
-        return BOUNDARIES_CACHE
-
-    file_path = os.path.join(os.getcwd(), "data", "peta_desa_202513524.geojson")
-    if not os.path.exists(file_path):
-         file_path = os.path.join(os.getcwd(), "..", "data", "peta_desa_202513524.geojson")
-    
-    if not os.path.exists(file_path):
+    content = geofence_service.get_geojson_bytes()
+    if content is None:
         raise HTTPException(status_code=404, detail="GeoJSON not found")
-        
-    try:
-        # Try Latin-1 first
-        with open(file_path, "r", encoding="latin-1") as f:
-            BOUNDARIES_CACHE = json.load(f)
-    except Exception:
-        try:
-            print("Latin-1 failed, retrying with UTF-8...")
-            with open(file_path, "r", encoding="utf-8") as f:
-                BOUNDARIES_CACHE = json.load(f)
-        except Exception as e:
-            print(f"CRITICAL: Failed to load boundaries: {e}")
-            BOUNDARIES_CACHE = { "type": "FeatureCollection", "features": [] }
-            
-    return BOUNDARIES_CACHE
+    return Response(content=content, media_type="application/json")
 
-@app.get("/api/macro", response_model=MacroResponse)
-async def get_macro_data():
-    """
-    Get aggregated data for Regional Macro View.
-    Cached for 5 minutes to improve performance.
-    """
-    start_time = time.time()
-    print("DEBUG request: /api/macro started")
-    
-    current_time = time.time()
-    
-    # Check Cache
-    if MACRO_CACHE["data"] and current_time < MACRO_CACHE["expiry"]:
-        print("DEBUG request: Serving from CACHE")
-        return MACRO_CACHE["data"]
-
-    # Fetch all villages with projection (exclude ai_analysis)
-    # Using a Pydantic model projection for type safety and speed
-    print("DEBUG request: Fetching from DB (Atlas)...")
-    t1 = time.time()
-    villages = await Village.find_all().project(VillageMacroProjection).to_list()
-    t2 = time.time()
-    print(f"DEBUG request: DB Fetch took {t2 - t1:.4f}s. Items: {len(villages)}")
+def build_macro_payload(snapshot) -> bytes:
     results = []
     
-    for v in villages:
-        # Calculate on fly (could be cached)
+    model = clustering_service.model
+    for v, features in zip(snapshot.villages, snapshot_features(snapshot)):
         health = ScoringAlgorithm.calculate_health_radar(v)
         edu = ScoringAlgorithm.calculate_education_funnel(v)
+        cluster = clustering_service.predict(v, features)
         
         results.append(VillageMacro(
             id=v.id,
@@ -124,52 +118,137 @@ async def get_macro_data():
             criminal=v.criminal,
             social=v.social,
             security=v.security,
-            sanitasi=v.sanitasi
+            sanitasi=v.sanitasi,
+            cluster=cluster,
+            cluster_label=model.names[cluster] if cluster is not None else None
         ))
         
-    response = MacroResponse(data=results)
-    
-    # Update Cache
-    MACRO_CACHE["data"] = response
-    MACRO_CACHE["expiry"] = current_time + CACHE_DURATION
-    
-    print(f"DEBUG request: Total processing took {time.time() - start_time:.4f}s")
-    return response
+    return MacroResponse(data=results).model_dump_json().encode("utf-8")
+
+@app.get("/api/macro", response_model=MacroResponse)
+async def get_macro_data():
+    """
+    Get aggregated data for Regional Macro View.
+    Built and serialized once per data version.
+    """
+    snapshot = await village_repository.get_snapshot()
+    return Response(content=snapshot.memo("macro", build_macro_payload, keep_unless_data_changed), media_type="application/json")
+
+@app.get("/api/search", response_model=SearchResponse)
+async def search_villages(q: str = "", limit: int = Query(10, ge=1, le=50)):
+    """
+    Typeahead search over village and district names.
+    Case/accent-insensitive, tolerant of old spellings and typos.
+    """
+    await village_repository.get_snapshot()
+    t0 = time.perf_counter()
+    results = village_search_index.search(q, limit=limit)
+    return SearchResponse(query=q, results=results, took_us=int((time.perf_counter() - t0) * 1_000_000))
+
+@app.get("/api/search/insights", response_model=InsightSearchResponse)
+async def search_insights(
+    q: str = "",
+    limit: int = Query(10, ge=1, le=50),
+    district: Optional[str] = None,
+    mode: str = Query("hybrid", pattern="^(bm25|hybrid|vector)$"),
+):
+    """
+    Full-text search over the AI analyses (persona, narrative, SWOT items,
+    recommendations), e.g. "irigasi" or "villages with irrigation problems".
+    Each hit lists the passages that matched.
+    """
+    await village_repository.get_snapshot()
+    t0 = time.perf_counter()
+    results = insight_search_index.search(q, limit=limit, district=district, mode=mode)
+    return InsightSearchResponse(
+        query=q, mode=mode, indexed=len(insight_search_index), results=results,
+        took_us=int((time.perf_counter() - t0) * 1_000_000),
+    )
+
+@app.get("/api/scoring/config")
+async def get_scoring_config():
+    """
+    Active scoring weights and thresholds (backend/scoring_config.json).
+    """
+    return active_scoring.config.model_dump()
+
+@app.post("/api/scoring/what-if", response_model=WhatIfResponse)
+async def scoring_what_if(request: WhatIfRequest):
+    """
+    Rescores every village with a partial config merged into the active one
+    and reports the status / grade shifts. Stored scores and the active
+    config are not changed.
+    """
+    snapshot = await village_repository.get_snapshot()
+    try:
+        result = what_if(snapshot, request.overrides, district=request.district, top=request.top)
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=e.errors(include_url=False, include_context=False))
+    return WhatIfResponse(**result)
+
+@app.get("/api/rankings", response_model=RankingsResponse)
+async def get_rankings(
+    metric: str = Query(..., pattern=f"^({'|'.join(METRICS)})$"),
+    district: Optional[str] = None,
+    top: int = Query(10, ge=0, le=100),
+    village_id: Optional[str] = None,
+):
+    """
+    Top-N villages for an indicator (region-wide or in one district) with its
+    quantiles; `village_id` adds that village's rank and percentile.
+    Served from precomputed sorted arrays (services/rankings.py).
+    """
+    snapshot = await village_repository.get_snapshot()
+    position = None
+    if village_id:
+        if not snapshot.get(village_id):
+            raise HTTPException(status_code=404, detail="Village not found")
+        position = ranking_index.position(metric, village_id)
+    return RankingsResponse(
+        metric=metric, label=METRICS[metric][0], district=district,
+        top=ranking_index.top(metric, top, district), village=position,
+        **ranking_index.summary(metric, district),
+    )
+
+def to_ai_insights(aa: Optional[AIAnalysis]) -> Optional[AIInsights]:
+    """
+    Stored AIAnalysis -> API shape (None when there is no analysis).
+    """
+    if not aa:
+        return None
+    # Handle potential None or empty dict
+    swot_raw = aa.swot_analysis or {}
+    # Ensure strict typing
+    swot = AISwot(
+        strengths=swot_raw.get("strengths", []),
+        weaknesses=swot_raw.get("weaknesses", []),
+        opportunities=swot_raw.get("opportunities", []),
+        threats=swot_raw.get("threats", [])
+    )
+    return AIInsights(
+        swot=swot,
+        persona=aa.persona or "Unknown",
+        local_hero=aa.social_capital_narrative or "",
+        recommendations=aa.recommendations.get("recommendations", []) if aa.recommendations else []
+    )
 
 @app.get("/api/micro/{village_id}", response_model=MicroResponse)
 async def get_micro_data(village_id: str):
     """
     Get detailed profile for a specific village, including AI Insights.
     """
-    village = await Village.get(village_id)
+    snapshot = await village_repository.get_snapshot()
+    village = snapshot.get(village_id)
     if not village:
         raise HTTPException(status_code=404, detail="Village not found")
-        
+
     # Analytics
     health = ScoringAlgorithm.calculate_health_radar(village)
     edu = ScoringAlgorithm.calculate_education_funnel(village)
     index = ScoringAlgorithm.calculate_independence_index(village)
     
     # AI Data
-    ai_data = None
-    if village.ai_analysis:
-        aa = village.ai_analysis
-        # Handle potential None or empty dict
-        swot_raw = aa.swot_analysis or {}
-        # Ensure strict typing
-        swot = AISwot(
-            strengths=swot_raw.get("strengths", []),
-            weaknesses=swot_raw.get("weaknesses", []),
-            opportunities=swot_raw.get("opportunities", []),
-            threats=swot_raw.get("threats", [])
-        )
-        
-        ai_data = AIInsights(
-            swot=swot,
-            persona=aa.persona or "Unknown",
-            local_hero=aa.social_capital_narrative or "",
-            recommendations=aa.recommendations.get("recommendations", []) if aa.recommendations else []
-        )
+    ai_data = to_ai_insights(village.ai_analysis)
 
     # Construct Response
     return MicroResponse(data=VillageMicro(
@@ -194,7 +273,9 @@ async def get_micro_data(village_id: str):
         analytics={
             "health_radar": health,
             "education_funnel": edu,
-            "independence_index": index
+            "independence_index": index,
+            # metric -> rank / percentile, region-wide and in the district
+            "rankings": ranking_index.positions(village.id)
         },
         ai_insights=ai_data,
         
@@ -212,16 +293,106 @@ async def get_micro_data(village_id: str):
         sanitasi=village.sanitasi
     ))
 
-def haversine(lat1, lon1, lat2, lon2):
-    R = 6371  # Radius of earth in km
-    dLat = math.radians(lat2 - lat1)
-    dLon = math.radians(lon2 - lon1)
-    a = math.sin(dLat/2) * math.sin(dLat/2) + \
-        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
-        math.sin(dLon/2) * math.sin(dLon/2)
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    d = R * c
-    return d
+@app.get("/api/micro/{village_id}/trend", response_model=TrendResponse)
+async def get_micro_trend(village_id: str):
+    """
+    Indicators of one village across PODES waves, with the precomputed
+    year-over-year deltas of its district and of the whole region.
+    """
+    snapshot = await village_repository.get_snapshot()
+    village = snapshot.get(village_id)
+    if not village:
+        raise HTTPException(status_code=404, detail="Village not found")
+    return await get_trend(snapshot, village)
+
+def job_response(job) -> InsightJobResponse:
+    to_dt = lambda ts: datetime.fromtimestamp(ts, tz=timezone.utc) if ts else None
+    return InsightJobResponse(
+        job_id=job.id,
+        village_id=job.village_id,
+        status=job.status,
+        created_at=to_dt(job.created_at),
+        started_at=to_dt(job.started_at),
+        finished_at=to_dt(job.finished_at),
+        attempts=job.attempts,
+        error=job.error,
+        insights=to_ai_insights(job.analysis),
+    )
+
+@app.post("/api/micro/{village_id}/insights", response_model=InsightJobResponse, status_code=202)
+async def request_micro_insights(village_id: str, response: Response, force: bool = False):
+    """
+    Queues AI insight generation for a village; poll /api/insights/jobs/{job_id}.
+    Concurrent requests for the same village share one job. Villages that
+    already have insights return a finished job unless `force` is set.
+    """
+    snapshot = await village_repository.get_snapshot()
+    village = snapshot.get(village_id)
+    if not village:
+        raise HTTPException(status_code=404, detail="Village not found")
+
+    analysis = village.ai_analysis
+    if not force and analysis and analysis.persona and analysis.persona != "Unknown":
+        response.status_code = 200
+        return job_response(insight_jobs.completed(village_id, analysis))
+    try:
+        job = insight_jobs.submit(village_id)
+    except QueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
+    return job_response(job)
+
+@app.get("/api/insights/jobs/{job_id}", response_model=InsightJobResponse)
+async def get_insight_job(job_id: str):
+    """
+    Status of an insight job; `insights` is set once the result is persisted.
+    """
+    job = insight_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or expired")
+    return job_response(job)
+
+def sse(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+async def insight_event_stream(village, force: bool):
+    yield sse("status", {"village_id": village.id, "status": "running"})
+    try:
+        analysis = village.ai_analysis
+        if not force and analysis and analysis.persona and analysis.persona != "Unknown":
+            insights = to_ai_insights(analysis).model_dump()
+            for event, data in insight_events(insights):
+                yield sse(event, data)
+            yield sse("done", {"village_id": village.id, "insights": insights})
+            return
+        async for event, data in insight_jobs.stream(village):
+            if event == "saved":
+                yield sse("done", {"village_id": village.id, "insights": to_ai_insights(data).model_dump()})
+            else:
+                yield sse(event, data)
+    except RateLimited as e:
+        yield sse("error", {"detail": str(e), "retry_after": e.retry_after})
+    except Exception as e:
+        yield sse("error", {"detail": str(e)})
+
+@app.get("/api/micro/{village_id}/insights/stream")
+async def stream_micro_insights(village_id: str, force: bool = False):
+    """
+    Server-Sent Events version of POST /api/micro/{village_id}/insights:
+    `swot` (one per section), `persona`, `local_hero` and `recommendation`
+    events arrive as soon as the model has written them, then `done` with
+    the persisted insights (or `error`). Stored insights are replayed
+    immediately unless `force` is set.
+    """
+    snapshot = await village_repository.get_snapshot()
+    village = snapshot.get(village_id)
+    if not village:
+        raise HTTPException(status_code=404, detail="Village not found")
+    return StreamingResponse(
+        insight_event_stream(village, force),
+        media_type="text/event-stream",
+        # Proxies (nginx) must not buffer the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 @app.get("/api/nearest-village")
 async def get_nearest_village(lat: float, long: float):
@@ -254,33 +425,22 @@ async def get_nearest_village(lat: float, long: float):
             "method": "geofence_fuzzy"
         }
 
-    print("DEBUG: Fuzzy MISS. Falling back to Haversine Centroid.")
+    print("DEBUG: Fuzzy MISS. Falling back to nearest centroid.")
 
-    # 3. Fallback to Nearest Centroid (Haversine)
-    # Fetch all villages (cached/fast since few hundred docs)
-    villages = await Village.find_all().to_list()
-    
-    if not villages:
-        raise HTTPException(status_code=404, detail="No villages found")
+    # 3. Fallback to Nearest Centroid (Haversine over the snapshot grid)
+    snapshot = await village_repository.get_snapshot()
+    nearest = snapshot.nearest(lat, long)
 
-    nearest_village = None
-    min_dist = float('inf')
-
-    for v in villages:
-        try:
-            dist = haversine(lat, long, float(v.latitude), float(v.longitude))
-            if dist < min_dist:
-                min_dist = dist
-                nearest_village = v
-        except Exception:
-            continue
-            
-    if not nearest_village:
-        return {"id": "3524012015", "name": "Kemlagi Lor (Fallback)", "distance_km": 0, "method": "error_fallback"}
+    if not nearest:
+        raise HTTPException(status_code=404, detail="No villages found")
 
+    nearest_village, distance_km = nearest
     return {
         "id": nearest_village.id, 
-        "name": nearest_village.name, }
+        "name": nearest_village.name,
+        "distance_km": float(distance_km),
+        "method": "centroid"
+    }
 
 # ==========================================
 # FRONTEND SERVING LOGIC (MUST BE AT END)
@@ -1,6 +1,8 @@
 from typing import Optional, List, Dict
-from beanie import Document
-from pydantic import BaseModel, Field
+from datetime import datetime
+from beanie import Document, before_event, Insert, Replace, Save, SaveChanges, Update
+from pydantic import BaseModel, Field, model_validator
+from pymongo import IndexModel, ASCENDING, DESCENDING
 from decimal import Decimal
 
 # --- Embedded Models (formerly Tables) ---
@@ -166,6 +168,12 @@ class Sanitasi(BaseModel):
     pencemaran_lingkungan: Optional[str] = None
 
 
+class GeoPoint(BaseModel):
+    """GeoJSON point, note the (longitude, latitude) order."""
+    type: str = "Point"
+    coordinates: List[float]
+
+
 # --- Main Document ---
 
 class Village(Document):
@@ -177,6 +185,15 @@ class Village(Document):
     topography: Optional[str] = None
     forest_location: Optional[str] = None
     status: Optional[str] = None
+    # GeoJSON point derived from latitude/longitude
+    location: Optional[GeoPoint] = None
+    # Bumped on every write; the village repository uses max(updated_at) as its data version.
+    # Raw pymongo writers (bulk scripts) must $set it themselves.
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+    # Hash of the CSV-derived content, lets the importer skip unchanged villages
+    content_hash: Optional[str] = None
+    # PODES waves (e.g. 2018, 2021, 2024) this village appears in; see IndicatorVersion
+    podes_years: List[int] = Field(default_factory=list)
 
     # Embedded Models
     health: Optional[Health] = None
@@ -192,8 +209,63 @@ class Village(Document):
     security: Optional[Security] = None
     sanitasi: Optional[Sanitasi] = None
 
+    @model_validator(mode="after")
+    def sync_location(self):
+        lat, lon = self.latitude, self.longitude
+        if (lat or lon) and -90 <= lat <= 90 and -180 <= lon <= 180:
+            self.location = GeoPoint(coordinates=[lon, lat])
+        else:
+            self.location = None
+        return self
+
+    @before_event(Insert, Replace, Save, SaveChanges, Update)
+    def touch(self):
+        self.updated_at = datetime.utcnow()
+
     class Settings:
         name = "villages"
+        # Created idempotently by init_beanie on startup (existing indexes are left alone).
+        # Reads are served from the in-memory snapshot; Mongo only sees the
+        # repository's version check and delta query on updated_at (and _id lookups).
+        indexes = [
+            IndexModel([("updated_at", DESCENDING)], name="updated_at"),
+        ]
+
+class IndicatorVersion(Document):
+    """
+    One version of a village's indicator subdocument (health, education, ...),
+    valid from `year` until the next version of the same section.
+    A new version is only written when the section content changes, so
+    unchanged values are not duplicated across PODES waves.
+    """
+    village_id: str
+    section: str
+    year: int
+    content_hash: str
+    data: Dict
+
+    class Settings:
+        name = "indicator_versions"
+        indexes = [
+            IndexModel([("village_id", ASCENDING), ("section", ASCENDING), ("year", ASCENDING)],
+                       name="village_section_year", unique=True),
+        ]
+
+class RegionalTrend(Document):
+    """
+    Precomputed per-year totals and year-over-year deltas for one district
+    (id = district name) or the whole region (id = "__all__").
+    Lists are aligned with `years`.
+    """
+    id: str = Field(primary_key=True)
+    years: List[int] = Field(default_factory=list)
+    village_counts: List[int] = Field(default_factory=list)
+    metrics: Dict[str, List[float]] = Field(default_factory=dict)
+    deltas: Dict[str, List[Optional[float]]] = Field(default_factory=dict)
+    updated_at: datetime = Field(default_factory=datetime.utcnow)
+
+    class Settings:
+        name = "regional_trends"
 
 class VillageMacroProjection(BaseModel):
     id: str = Field(alias="_id")
@@ -1,6 +1,7 @@
 from typing import List, Optional, Dict, Any
-from pydantic import BaseModel, ConfigDict
+from pydantic import BaseModel, ConfigDict, Field
 from decimal import Decimal
+from datetime import datetime
 
 from backend.models import (
     Health, Education, Economy, Infrastructure, 
@@ -41,6 +42,9 @@ class VillageMacro(BaseModel):
     social: Optional[Social] = None
     security: Optional[Security] = None
     sanitasi: Optional[Sanitasi] = None
+    # k-means cluster (backend/cluster_model.json), None without a trained model
+    cluster: Optional[int] = None
+    cluster_label: Optional[str] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -94,3 +98,119 @@ class VillageMicro(BaseModel):
 
 class MicroResponse(BaseModel):
     data: VillageMicro
+
+# Search Schema
+class SearchHit(BaseModel):
+    id: str
+    name: str
+    district: str
+    score: float
+    match: str
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchHit]
+    took_us: int
+
+# Insight search (/api/search/insights)
+class InsightMatch(BaseModel):
+    field: str  # persona | social_capital_narrative | swot.<section> | recommendations | investment_potential
+    text: str
+
+class InsightSearchHit(BaseModel):
+    id: str
+    name: str
+    district: str
+    persona: Optional[str] = None
+    score: float
+    matches: List[InsightMatch]
+
+class InsightSearchResponse(BaseModel):
+    query: str
+    mode: str
+    indexed: int
+    results: List[InsightSearchHit]
+    took_us: int
+
+# Trend Schema (/api/micro/{id}/trend), lists aligned with `years`
+class TrendSeries(BaseModel):
+    years: List[int]
+    metrics: Dict[str, List[float]]
+    deltas: Dict[str, List[Optional[float]]]
+    village_counts: Optional[List[int]] = None
+
+class TrendResponse(BaseModel):
+    village_id: str
+    name: str
+    district: str
+    village: TrendSeries
+    district_trend: Optional[TrendSeries] = None
+    region_trend: Optional[TrendSeries] = None
+
+# On-demand AI insight jobs
+class InsightJobResponse(BaseModel):
+    job_id: str
+    village_id: str
+    status: str  # queued | running | done | failed
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    insights: Optional[AIInsights] = None
+
+# Scoring what-if (/api/scoring/what-if), counts keyed by status / grade
+class WhatIfRequest(BaseModel):
+    overrides: Dict[str, Any] = {}  # partial scoring config, e.g. {"independence": {"maju_above": 75}}
+    district: Optional[str] = None
+    top: int = Field(20, ge=0, le=200)
+
+class IndicatorShift(BaseModel):
+    before: Dict[str, int]
+    after: Dict[str, int]
+    changed: int
+    transitions: Dict[str, Dict[str, int]]  # old -> new -> villages
+
+class ScoreChange(BaseModel):
+    id: str
+    name: str
+    district: str
+    score_before: float
+    score_after: float
+    grade_before: str
+    grade_after: str
+
+class WhatIfResponse(BaseModel):
+    base_version: str
+    version: str
+    config: Dict[str, Any]
+    villages: int
+    indicators: Dict[str, IndicatorShift]
+    top_changes: List[ScoreChange]
+    took_ms: float
+
+# Rankings (/api/rankings), rank 1 = highest value, ties share a rank
+class RankingEntry(BaseModel):
+    rank: int
+    id: str
+    name: str
+    district: str
+    value: float
+
+class RankingPosition(BaseModel):
+    value: float
+    rank: int
+    of: int
+    percentile: float  # % of ranked villages with the same or a lower value
+    district_rank: int
+    district_of: int
+    district_percentile: float
+
+class RankingsResponse(BaseModel):
+    metric: str
+    label: str
+    district: Optional[str] = None
+    ranked: int
+    quantiles: Dict[str, float]  # p25, p50, ... over the ranked villages
+    top: List[RankingEntry]
+    village: Optional[RankingPosition] = None
@@ -0,0 +1,193 @@
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+
+from backend.services.podes import CSV_FILE_PATH
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(CSV_FILE_PATH), ".ai_cache.sqlite")
+DEFAULT_TTL_DAYS = 30
+DEFAULT_MAX_ENTRIES = 100_000
+
+# Eviction runs every EVICT_EVERY stores instead of on every write
+EVICT_EVERY = 200
+
+
+def cache_key(template: str, model: str, config: Dict, village_data: Dict) -> str:
+    """
+    Content address of one generation: SHA-256 over the prompt template, model,
+    generation config and canonical (sort-keyed, compact) input JSON.
+    Changing any of them is a miss; reformatting the input is not.
+    """
+    canonical = json.dumps(
+        {"template": template, "model": model, "config": config, "input": village_data},
+        sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str,
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class InsightCache:
+    """
+    Persistent SQLite cache of validated model responses (INDEST_AI_CACHE_PATH,
+    empty string disables). Entries expire after `ttl_seconds`; beyond
+    `max_entries` the least recently used ones are evicted.
+
+    `get` / `put` block on sqlite; async code uses `aget` / `aput`, which run
+    them in a worker thread.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl_seconds: Optional[float] = None,
+                 max_entries: Optional[int] = None):
+        if path is None:
+            path = os.getenv("INDEST_AI_CACHE_PATH", DEFAULT_CACHE_PATH)
+        if ttl_seconds is None:
+            ttl_seconds = float(os.getenv("INDEST_AI_CACHE_TTL_DAYS", DEFAULT_TTL_DAYS)) * 86400
+        if max_entries is None:
+            max_entries = int(os.getenv("INDEST_AI_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES))
+        self.path = path or None
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "stores": 0, "evicted": 0}
+        self._stores_since_evict = 0
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.path is not None
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.path:
+            return None
+        try:
+            conn = sqlite3.connect(self.path)
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, model TEXT NOT NULL, response TEXT NOT NULL,"
+                " created_at REAL NOT NULL, last_used REAL NOT NULL, hits INTEGER NOT NULL DEFAULT 0);"
+                "CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used);"
+            )
+            return conn
+        except sqlite3.Error as e:
+            # Read-only filesystems (serverless): always call the model
+            print(f"AI cache: disabled ({e})")
+            self.path = None
+            return None
+
+    def _count(self, name: str, n: int = 1):
+        with self._lock:
+            self.counters[name] += n
+
+    # ---------- lookups ----------
+
+    def get(self, key: str) -> Optional[Dict]:
+        conn = self._connect()
+        if conn is None:
+            return None
+        now = time.time()
+        try:
+            with conn:
+                row = conn.execute("SELECT response, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    self._count("misses")
+                    return None
+                if now - row[1] > self.ttl_seconds:
+                    conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._count("expired")
+                    self._count("misses")
+                    return None
+                conn.execute("UPDATE responses SET last_used = ?, hits = hits + 1 WHERE key = ?", (now, key))
+        finally:
+            conn.close()
+        self._count("hits")
+        return json.loads(row[0])
+
+    def put(self, key: str, model: str, response: Dict):
+        conn = self._connect()
+        if conn is None:
+            return
+        now = time.time()
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_used, hits)"
+                    " VALUES (?, ?, ?, ?, ?, 0)",
+                    (key, model, json.dumps(response, ensure_ascii=False), now, now),
+                )
+            self._count("stores")
+            with self._lock:
+                self._stores_since_evict += 1
+                due = self._stores_since_evict >= EVICT_EVERY
+                if due:
+                    self._stores_since_evict = 0
+            if due:
+                self._evict(conn, now)
+        finally:
+            conn.close()
+
+    async def aget(self, key: str) -> Optional[Dict]:
+        if not self.enabled:
+            return None
+        return await asyncio.to_thread(self.get, key)
+
+    async def aput(self, key: str, model: str, response: Dict):
+        if self.enabled:
+            await asyncio.to_thread(self.put, key, model, response)
+
+    # ---------- eviction ----------
+
+    def _evict(self, conn: sqlite3.Connection, now: float) -> int:
+        with conn:
+            removed = conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+            excess = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0] - self.max_entries
+            if excess > 0:
+                removed += conn.execute(
+                    "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY last_used LIMIT ?)",
+                    (excess,),
+                ).rowcount
+        self._count("evicted", removed)
+        return removed
+
+    def evict(self) -> int:
+        """
+        Drops expired entries and the least recently used beyond max_entries.
+        """
+        conn = self._connect()
+        if conn is None:
+            return 0
+        try:
+            return self._evict(conn, time.time())
+        finally:
+            conn.close()
+
+    def clear(self):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute("DELETE FROM responses")
+        finally:
+            conn.close()
+
+    # ---------- reporting ----------
+
+    def stats(self) -> Dict:
+        with self._lock:
+            stats = dict(self.counters)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+        stats["enabled"] = self.enabled
+        conn = self._connect()
+        if conn is not None:
+            try:
+                stats["entries"] = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+            finally:
+                conn.close()
+        return stats
+
+# Singleton instance
+insight_cache = InsightCache()
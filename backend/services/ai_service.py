@@ -1,7 +1,15 @@
 import os
 import json
+import time
+from typing import Dict, List, Optional, Tuple
+
 from dotenv import load_dotenv
-from google import genai
+from pydantic import BaseModel, ConfigDict, StrictStr, ValidationError
+
+from backend.services.ai_cache import cache_key, insight_cache
+from backend.services.ai_usage import usage_tracker, OK, RATE_LIMITED, INVALID, ERROR
+from backend.services.llm import LLMResponse, get_provider
+from backend.services.rate_limit import RateLimited
 
 # ==========================================
 # LOAD ENV
@@ -12,14 +20,11 @@ load_dotenv(
     )
 )
 
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
-if not GEMINI_API_KEY:
-    raise RuntimeError("GEMINI_API_KEY not found in environment variables")
-
 # ==========================================
-# INIT GEMINI CLIENT (CLIENT-BASED, CONSISTENT)
+# PROVIDER
 # ==========================================
-client = genai.Client(api_key=GEMINI_API_KEY)
+# The model client is created lazily by backend/services/llm.py (LLM_PROVIDER=gemini|stub),
+# so importing this module needs neither GEMINI_API_KEY nor the SDK.
 
 # ==========================================
 # PROMPT TEMPLATE
@@ -45,35 +50,490 @@ Output JSON Schema:
 }}
 """
 
+# Packed mode: several villages per request, one keyed result per village
+PACKED_PROMPT_TEMPLATE = """
+You are an expert regional planner and data analyst for Indonesian villages.
+Analyze EACH village below independently and generate a comprehensive insight report per village in valid JSON format.
+
+Input Data (object keyed by village_id):
+{villages_data}
+
+Output JSON Schema: an array with exactly one object per input village, in any order:
+[
+  {{
+    "village_id": "string (the input key)",
+    "swot": {{
+      "strengths": ["string"],
+      "weaknesses": ["string"],
+      "opportunities": ["string"],
+      "threats": ["string"]
+    }},
+    "persona": "string",
+    "local_hero": "string",
+    "recommendations": ["string"]
+  }}
+]
+"""
+
+GENERATION_CONFIG = {
+    "temperature": 0.7,
+    "top_p": 0.95,
+    "top_k": 40,
+    "max_output_tokens": 4096,
+    "response_mime_type": "application/json",
+}
+
+# Shape an answer must have before it is cached or stored (strict: "good" is not a list)
+class _InsightSwot(BaseModel):
+    model_config = ConfigDict(strict=True)
+    strengths: List[StrictStr]
+    weaknesses: List[StrictStr]
+    opportunities: List[StrictStr]
+    threats: List[StrictStr]
+
+class _InsightSchema(BaseModel):
+    model_config = ConfigDict(strict=True)
+    swot: _InsightSwot
+    persona: StrictStr
+    local_hero: Optional[StrictStr] = None
+    recommendations: List[StrictStr]
+
+# Output budget per village in packed mode (the single-village budget is 4096)
+PACKED_OUTPUT_TOKENS_PER_VILLAGE = 1536
+MAX_OUTPUT_TOKENS = 65536
+
 # ==========================================
-# MAIN FUNCTION
+# PROMPT MODES
 # ==========================================
-def generate_village_insights(village_data: dict) -> dict:
+# "full": input as-is, indented JSON (original behaviour)
+# "compact": null / zero / empty fields dropped, compact JSON, and at most
+#            AI_INPUT_TOKEN_BUDGET input tokens per village
+FULL, COMPACT = "full", "compact"
+PROMPT_MODES = (FULL, COMPACT)
+PROMPT_MODE = os.getenv("AI_PROMPT_MODE", FULL)
+INPUT_TOKEN_BUDGET = int(os.getenv("AI_INPUT_TOKEN_BUDGET", "300"))
+
+# Dropped first (in this order) when a compacted input is still over budget
+BUDGET_DROP_ORDER = (
+    ("raw_stats", "disaster_history"),
+    ("forest",),
+    ("demographics", "education"),
+    ("demographics", "health"),
+    ("demographics", "economy"),
+    ("raw_stats", "internet"),
+)
+
+def resolve_mode(mode: Optional[str]) -> str:
+    mode = mode or PROMPT_MODE
+    if mode not in PROMPT_MODES:
+        raise ValueError(f"Unknown prompt mode '{mode}' (expected one of {PROMPT_MODES})")
+    return mode
+
+def drop_empty(value):
+    """
+    Recursively removes None, 0, "", empty containers (False is kept: it carries meaning).
+    """
+    if isinstance(value, dict):
+        cleaned = {k: drop_empty(v) for k, v in value.items()}
+        return {k: v for k, v in cleaned.items() if not _is_empty(v)}
+    if isinstance(value, list):
+        return [v for v in (drop_empty(v) for v in value) if not _is_empty(v)]
+    return value
+
+def _is_empty(value) -> bool:
+    if value is None or value == "" or value == {} or value == []:
+        return True
+    return isinstance(value, (int, float)) and not isinstance(value, bool) and value == 0
+
+def serialize_input(data, mode: str) -> str:
+    if mode == COMPACT:
+        return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    return json.dumps(data, indent=2, ensure_ascii=False)
+
+def prepare_input(village_data: dict, mode: Optional[str] = None, budget: Optional[int] = None) -> dict:
+    """
+    Input actually sent for one village in `mode`.
+    """
+    if resolve_mode(mode) == FULL:
+        return village_data
+    budget = budget or INPUT_TOKEN_BUDGET
+    data = drop_empty(village_data)
+    for path in BUDGET_DROP_ORDER:
+        if estimate_tokens(serialize_input(data, COMPACT)) <= budget:
+            break
+        parent = data
+        for key in path[:-1]:
+            parent = parent.get(key) if isinstance(parent, dict) else None
+        if isinstance(parent, dict):
+            parent.pop(path[-1], None)
+    return drop_empty(data)
+
+def mode_config(mode: str, config: Dict = GENERATION_CONFIG) -> Dict:
     """
-    Generates AI insights for a village using Gemini (client-based API).
+    Generation config as used in cache keys (the mode changes the prompt).
     """
+    return config if mode == FULL else dict(config, prompt_mode=mode)
 
-    prompt = SYSTEM_PROMPT_TEMPLATE.format(
-        village_data=json.dumps(village_data, indent=2, ensure_ascii=False)
+def build_prompt(village_data: dict, mode: Optional[str] = None) -> str:
+    mode = resolve_mode(mode)
+    return SYSTEM_PROMPT_TEMPLATE.format(
+        village_data=serialize_input(prepare_input(village_data, mode), mode)
     )
 
+def is_valid_insights(insights) -> bool:
+    if not isinstance(insights, dict):
+        return False
     try:
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=prompt,
-            config={
-                "temperature": 0.7,
-                "top_p": 0.95,
-                "top_k": 40,
-                "max_output_tokens": 4096,
-                "response_mime_type": "application/json",
-            },
-        )
+        _InsightSchema.model_validate(insights)
+    except ValidationError:
+        return False
+    return True
+
+def parse_insights(raw_text: str) -> dict:
+    """
+    Model output -> insights dict. Raises ValueError on invalid JSON or on
+    missing / mistyped fields (see _InsightSchema).
+    """
+    insights = json.loads(raw_text.strip())
+    if not is_valid_insights(insights):
+        raise ValueError("AI response does not match the insight schema")
+    return insights
+
+def build_packed_prompt(villages_data: Dict[str, dict], mode: Optional[str] = None) -> str:
+    mode = resolve_mode(mode)
+    prepared = {village_id: prepare_input(data, mode) for village_id, data in villages_data.items()}
+    return PACKED_PROMPT_TEMPLATE.format(villages_data=serialize_input(prepared, mode))
+
+def packed_config(n_villages: int) -> dict:
+    return dict(GENERATION_CONFIG, max_output_tokens=min(MAX_OUTPUT_TOKENS, PACKED_OUTPUT_TOKENS_PER_VILLAGE * n_villages))
+
+def iter_array_items(raw_text: str):
+    """
+    Objects of a top-level JSON array, one at a time. Stops at the first
+    undecodable item, so a truncated response still yields its complete entries.
+    """
+    decoder = json.JSONDecoder()
+    text = raw_text.strip()
+    if not text.startswith("["):
+        return
+    pos = 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] == "]":
+            return
+        try:
+            item, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            return
+        yield item
+
+def parse_packed_insights(raw_text: str, expected_ids) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    Packed model output -> ({village_id: insights}, ids without a valid result).
+    Every entry is validated on its own; unknown or duplicate ids are ignored.
+    """
+    expected = set(expected_ids)
+    results = {}
+    for item in iter_array_items(raw_text):
+        if not isinstance(item, dict):
+            continue
+        village_id = str(item.pop("village_id", ""))
+        if village_id in expected and village_id not in results and is_valid_insights(item):
+            results[village_id] = item
+    return results, [i for i in expected_ids if i not in results]
+
+# ==========================================
+# INCREMENTAL PARSING (streaming)
+# ==========================================
+_DECODER = json.JSONDecoder()
+_PARTIAL = object()
+
+def _members(text: str, pos: int):
+    """
+    (key, value position, value) of the object opening at text[pos], as far
+    as the text goes; the last value is _PARTIAL when it is still being written.
+    """
+    pos += 1
+    while True:
+        while pos < len(text) and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= len(text) or text[pos] != '"':
+            return
+        try:
+            key, pos = _DECODER.raw_decode(text, pos)
+            pos = text.index(":", pos) + 1
+        except ValueError:
+            return
+        while pos < len(text) and text[pos] in " \t\r\n":
+            pos += 1
+        if pos >= len(text):
+            return
+        try:
+            value, end = _DECODER.raw_decode(text, pos)
+        except ValueError:
+            yield key, pos, _PARTIAL
+            return
+        yield key, pos, value
+        pos = end
+
+def _insight_parts(text: str):
+    """
+    ((part id), event, data) for every piece of the insight object that is complete in `text`.
+    """
+    start = text.find("{")
+    if start < 0:
+        return
+    for key, pos, value in _members(text, start):
+        if key == "swot":
+            if value is _PARTIAL:
+                sections = ((k, v) for k, _, v in _members(text, pos) if v is not _PARTIAL) if text[pos] == "{" else ()
+            else:
+                sections = value.items() if isinstance(value, dict) else ()
+            for section, items in sections:
+                yield ("swot", section), "swot", {"section": section, "items": items}
+        elif key == "recommendations":
+            items = list(iter_array_items(text[pos:])) if value is _PARTIAL else value
+            for index, item in enumerate(items if isinstance(items, list) else []):
+                yield ("recommendations", index), "recommendation", {"index": index, "text": item}
+        elif key in ("persona", "local_hero") and value is not _PARTIAL:
+            yield (key,), key, value
+
+class InsightStreamParser:
+    """
+    Incremental reader of a single-village response. `feed` returns the
+    (event, data) pairs completed by the new text: one "swot" per section,
+    "persona", "local_hero" and one "recommendation" per item, each once.
+    """
 
-        # Gemini client returns unified text
-        raw_text = response.text.strip()
+    def __init__(self):
+        self.text = ""
+        self._sent = set()
+
+    def feed(self, chunk: str) -> List[Tuple[str, object]]:
+        self.text += chunk
+        events = []
+        for part, event, data in _insight_parts(self.text):
+            if part not in self._sent:
+                self._sent.add(part)
+                events.append((event, data))
+        return events
+
+def insight_events(insights: dict) -> List[Tuple[str, object]]:
+    """
+    The events a stream of these (complete) insights would have produced.
+    """
+    return InsightStreamParser().feed(json.dumps(insights, ensure_ascii=False))
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough prompt size (~4 characters per token) for comparing modes offline.
+    """
+    return max(1, len(text) // 4)
+
+def packing_savings(villages_data: Dict[str, dict], mode: Optional[str] = None) -> Dict[str, int]:
+    """
+    Estimated prompt tokens for these villages in single vs packed mode.
+    """
+    single = sum(estimate_tokens(build_prompt(data, mode)) for data in villages_data.values())
+    packed = estimate_tokens(build_packed_prompt(villages_data, mode))
+    return {"single_prompt_tokens": single, "packed_prompt_tokens": packed}
+
+# ==========================================
+# RESPONSE CACHE (see ai_cache.py)
+# ==========================================
+def model_id() -> str:
+    """
+    Provider and model of the active backend (stub answers are cached apart).
+    """
+    provider = get_provider()
+    return f"{provider.name}:{provider.model}"
+
+def insights_cache_key(village_data: dict, mode: Optional[str] = None) -> str:
+    mode = resolve_mode(mode)
+    return cache_key(SYSTEM_PROMPT_TEMPLATE, model_id(), mode_config(mode), prepare_input(village_data, mode))
+
+def cached_village_insights(village_data: dict, mode: Optional[str] = None) -> Optional[dict]:
+    """
+    Stored response for exactly this input / prompt / model / config, if any.
+    """
+    return insight_cache.get(insights_cache_key(village_data, mode))
+
+def store_village_insights(village_data: dict, insights: dict, mode: Optional[str] = None):
+    insight_cache.put(insights_cache_key(village_data, mode), model_id(), insights)
+
+def packed_cache_key(village_data: dict, mode: Optional[str] = None) -> str:
+    mode = resolve_mode(mode)
+    return cache_key(PACKED_PROMPT_TEMPLATE, model_id(), mode_config(mode), prepare_input(village_data, mode))
+
+def cached_packed_insights(village_data: dict, mode: Optional[str] = None) -> Optional[dict]:
+    return insight_cache.get(packed_cache_key(village_data, mode))
+
+# Non-blocking variants for the event loop (sqlite runs in a worker thread)
+async def acached_village_insights(village_data: dict, mode: Optional[str] = None) -> Optional[dict]:
+    return await insight_cache.aget(insights_cache_key(village_data, mode))
+
+async def astore_village_insights(village_data: dict, insights: dict, mode: Optional[str] = None):
+    await insight_cache.aput(insights_cache_key(village_data, mode), model_id(), insights)
+
+async def acached_packed_insights(village_data: dict, mode: Optional[str] = None) -> Optional[dict]:
+    return await insight_cache.aget(packed_cache_key(village_data, mode))
+
+# ==========================================
+# INSTRUMENTED CALLS (see ai_usage.py)
+# ==========================================
+def _record(mode: str, districts, started: float, outcome: str, prompt: str, response=None):
+    text = response.text if response is not None else ""
+    usage_tracker.record(
+        mode, districts, time.perf_counter() - started, outcome,
+        prompt_tokens=response.prompt_tokens if response is not None else 0,
+        output_tokens=response.output_tokens if response is not None else 0,
+        estimated_prompt_tokens=estimate_tokens(prompt),
+        estimated_output_tokens=estimate_tokens(text) if text else 0,
+    )
+
+def _failure(error: Exception) -> str:
+    return RATE_LIMITED if isinstance(error, RateLimited) else ERROR
+
+async def _call(prompt: str, config: Dict, mode: str, districts):
+    started = time.perf_counter()
+    try:
+        response = await get_provider().generate(prompt, config)
+    except Exception as e:
+        _record(mode, districts, started, _failure(e), prompt)
+        raise
+    return response, started
+
+def _call_sync(prompt: str, config: Dict, mode: str, districts):
+    started = time.perf_counter()
+    try:
+        response = get_provider().generate_sync(prompt, config)
+    except Exception as e:
+        _record(mode, districts, started, _failure(e), prompt)
+        raise
+    return response, started
+
+# ==========================================
+# ASYNC (batch / background generation)
+# ==========================================
+async def request_village_insights(village_data: dict, use_cache: bool = True, mode: Optional[str] = None) -> dict:
+    """
+    Non-blocking model call that raises instead of falling back:
+    RateLimited on 429 (with the server's retry hint), ValueError on
+    malformed output, LLMConfigError / the client's error otherwise.
+    """
+    mode = resolve_mode(mode)
+    if use_cache:
+        cached = await acached_village_insights(village_data, mode)
+        if cached is not None:
+            return cached
+    prompt = build_prompt(village_data, mode)
+    districts = [village_data.get("district")]
+    response, started = await _call(prompt, GENERATION_CONFIG, mode, districts)
+    try:
+        insights = parse_insights(response.text or "")
+    except ValueError:
+        _record(mode, districts, started, INVALID, prompt, response)
+        raise
+    _record(mode, districts, started, OK, prompt, response)
+    await astore_village_insights(village_data, insights, mode)
+    return insights
+
+async def stream_village_insights(village_data: dict, use_cache: bool = True, mode: Optional[str] = None):
+    """
+    Async generator over the model's answer: the InsightStreamParser events
+    as soon as each part is complete, then ("insights", validated insights),
+    cached like request_village_insights. A cache hit replays all events at
+    once. Raises like request_village_insights, possibly mid-stream.
+    """
+    mode = resolve_mode(mode)
+    if use_cache:
+        cached = await acached_village_insights(village_data, mode)
+        if cached is not None:
+            for event in insight_events(cached):
+                yield event
+            yield "insights", cached
+            return
+
+    prompt = build_prompt(village_data, mode)
+    districts = [village_data.get("district")]
+    parser = InsightStreamParser()
+    response = LLMResponse(text="")
+    started = time.perf_counter()
+    try:
+        async for chunk in get_provider().stream(prompt, GENERATION_CONFIG):
+            response.text += chunk.text or ""
+            response.prompt_tokens = chunk.prompt_tokens or response.prompt_tokens
+            response.output_tokens = chunk.output_tokens or response.output_tokens
+            for event in parser.feed(chunk.text or ""):
+                yield event
+    except Exception as e:
+        _record(mode, districts, started, _failure(e), prompt)
+        raise
+    try:
+        insights = parse_insights(response.text)
+    except ValueError:
+        _record(mode, districts, started, INVALID, prompt, response)
+        raise
+    _record(mode, districts, started, OK, prompt, response)
+    await astore_village_insights(village_data, insights, mode)
+    yield "insights", insights
+
+async def request_packed_insights(villages_data: Dict[str, dict], use_cache: bool = True,
+                                  mode: Optional[str] = None) -> Tuple[Dict[str, dict], List[str]]:
+    """
+    One request for several villages ({village_id: village_data}).
+    Returns ({village_id: insights}, ids to retry); valid entries are cached
+    individually. Raises RateLimited like request_village_insights.
+    """
+    mode = resolve_mode(mode)
+    results = {}
+    if use_cache:
+        for village_id, data in villages_data.items():
+            cached = await acached_packed_insights(data, mode)
+            if cached is not None:
+                results[village_id] = cached
+    pending = {i: d for i, d in villages_data.items() if i not in results}
+    if not pending:
+        return results, []
+
+    prompt = build_packed_prompt(pending, mode)
+    districts = [d.get("district") for d in pending.values()]
+    response, started = await _call(prompt, packed_config(len(pending)), mode, districts)
+    parsed, failed = parse_packed_insights(response.text or "", list(pending))
+    _record(mode, districts, started, INVALID if failed else OK, prompt, response)
+    for village_id, insights in parsed.items():
+        await insight_cache.aput(packed_cache_key(pending[village_id], mode), model_id(), insights)
+    results.update(parsed)
+    return results, failed
+
+# ==========================================
+# MAIN FUNCTION
+# ==========================================
+def generate_village_insights(village_data: dict, mode: Optional[str] = None) -> dict:
+    """
+    Generates AI insights for a village (blocking; falls back on any error).
+    """
+    mode = resolve_mode(mode)
+    cached = cached_village_insights(village_data, mode)
+    if cached is not None:
+        return cached
+
+    prompt = build_prompt(village_data, mode)
+    districts = [village_data.get("district")]
+
+    try:
+        response, started = _call_sync(prompt, GENERATION_CONFIG, mode, districts)
 
-        return json.loads(raw_text)
+        # Providers return unified text
+        try:
+            insights = parse_insights(response.text or "")
+        except ValueError:
+            _record(mode, districts, started, INVALID, prompt, response)
+            raise
+        _record(mode, districts, started, OK, prompt, response)
+        store_village_insights(village_data, insights, mode)
+        return insights
 
     except Exception as e:
         # ⚠️ jangan silent fail di production nanti
@@ -0,0 +1,152 @@
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+from collections import deque
+from typing import Dict, Iterable, List, Optional
+
+OK, RATE_LIMITED, INVALID, ERROR = "ok", "rate_limited", "invalid", "error"
+
+# Latency percentiles cover the most recent LATENCY_WINDOW calls of each bucket
+LATENCY_WINDOW = 2048
+
+
+def percentile(sorted_values: List[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+
+class _Bucket:
+    def __init__(self):
+        self.villages = 0.0
+        self.prompt_tokens = 0.0
+        self.output_tokens = 0.0
+        self.estimated_calls = 0
+        self.outcomes: Dict[str, int] = {}
+        self.calls = 0
+        self.latency_sum = 0.0
+        self.latencies = deque(maxlen=LATENCY_WINDOW)
+
+    def add(self, villages: float, prompt_tokens: float, output_tokens: float, latency_s: float,
+            outcome: str, estimated: bool):
+        self.villages += villages
+        self.prompt_tokens += prompt_tokens
+        self.output_tokens += output_tokens
+        self.estimated_calls += int(estimated)
+        self.outcomes[outcome] = self.outcomes.get(outcome, 0) + 1
+        self.calls += 1
+        self.latency_sum += latency_s
+        self.latencies.append(latency_s)
+
+    def report(self) -> Dict:
+        latencies = sorted(self.latencies)
+        villages = self.villages or 1
+        return {
+            "calls": self.calls,
+            "villages": round(self.villages, 2),
+            "outcomes": self.outcomes,
+            "prompt_tokens": round(self.prompt_tokens),
+            "output_tokens": round(self.output_tokens),
+            "tokens_per_village": round((self.prompt_tokens + self.output_tokens) / villages, 1),
+            "estimated_calls": self.estimated_calls,
+            "latency_ms": {
+                "p50": round(percentile(latencies, 50) * 1000, 1),
+                "p95": round(percentile(latencies, 95) * 1000, 1),
+                "mean": round(self.latency_sum / self.calls * 1000, 1) if self.calls else 0.0,
+            },
+        }
+
+
+class UsageTracker:
+    """
+    Token and latency accounting for model calls, aggregated per run.
+
+    Every call is recorded with its prompt mode and the districts of the
+    villages it covered (a packed call is split evenly between them). Token
+    counts come from the response usage metadata; when a provider reports
+    none, the ~4 chars/token estimate is used and counted as `estimated_calls`.
+    AI_USAGE_LOG (optional) appends one JSON line per call, written by a
+    background thread so record() never blocks the event loop on file I/O.
+    """
+
+    def __init__(self, log_path: Optional[str] = None):
+        self.log_path = log_path if log_path is not None else os.getenv("AI_USAGE_LOG") or None
+        self._lock = threading.Lock()
+        self._log: Optional[logging.Logger] = None
+        self._listener: Optional[logging.handlers.QueueListener] = None
+        self.reset()
+
+    def _usage_log(self) -> logging.Logger:
+        # One file handle, one writer thread: lines from concurrent calls never interleave
+        with self._lock:
+            if self._log is None:
+                handler = logging.FileHandler(self.log_path, encoding="utf-8")
+                handler.setFormatter(logging.Formatter("%(message)s"))
+                lines = queue.SimpleQueue()
+                self._listener = logging.handlers.QueueListener(lines, handler)
+                self._listener.start()
+                atexit.register(self.close)
+                log = logging.Logger("ai_usage", logging.INFO)
+                log.addHandler(logging.handlers.QueueHandler(lines))
+                self._log = log
+            return self._log
+
+    def close(self):
+        """
+        Flushes the pending log lines and closes the file.
+        """
+        with self._lock:
+            listener, self._listener, self._log = self._listener, None, None
+        if listener is not None:
+            listener.stop()
+            for handler in listener.handlers:
+                handler.close()
+
+    def reset(self):
+        with self._lock:
+            self.started = time.time()
+            self.total = _Bucket()
+            self.by_mode: Dict[str, _Bucket] = {}
+            self.by_region: Dict[str, _Bucket] = {}
+
+    def record(self, mode: str, districts: Iterable[Optional[str]], latency_s: float, outcome: str,
+               prompt_tokens: Optional[int] = None, output_tokens: Optional[int] = None,
+               estimated_prompt_tokens: int = 0, estimated_output_tokens: int = 0):
+        districts = [d or "-" for d in districts] or ["-"]
+        estimated = prompt_tokens is None
+        prompt = prompt_tokens if prompt_tokens is not None else estimated_prompt_tokens
+        output = output_tokens if output_tokens is not None else estimated_output_tokens
+        share = 1 / len(districts)
+        with self._lock:
+            self.total.add(len(districts), prompt, output, latency_s, outcome, estimated)
+            self.by_mode.setdefault(mode, _Bucket()).add(len(districts), prompt, output, latency_s, outcome, estimated)
+            for district in districts:
+                self.by_region.setdefault(district, _Bucket()).add(
+                    share, prompt * share, output * share, latency_s, outcome, estimated
+                )
+
+        if self.log_path:
+            line = {"ts": round(time.time(), 3), "mode": mode, "districts": districts, "outcome": outcome,
+                    "latency_ms": round(latency_s * 1000, 1), "prompt_tokens": prompt,
+                    "output_tokens": output, "estimated": estimated}
+            self._usage_log().info(json.dumps(line, ensure_ascii=False))
+
+    def report(self, top_regions: int = 20) -> Dict:
+        with self._lock:
+            regions = sorted(self.by_region.items(), key=lambda kv: -(kv[1].prompt_tokens + kv[1].output_tokens))
+            return {
+                "elapsed_s": round(time.time() - self.started, 1),
+                "total": self.total.report(),
+                "by_mode": {mode: bucket.report() for mode, bucket in self.by_mode.items()},
+                "by_region": {region: bucket.report() for region, bucket in regions[:top_regions]},
+            }
+
+# Singleton instance
+usage_tracker = UsageTracker()
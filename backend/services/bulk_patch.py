@@ -0,0 +1,117 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+DEFAULT_BATCH_SIZE = 1000
+# Write errors printed per run (the rest are only counted)
+MAX_PRINTED_ERRORS = 5
+
+
+@dataclass
+class PatchStats:
+    scanned: int = 0
+    patched: int = 0
+    matched: int = 0
+    modified: int = 0
+    failed: int = 0
+    batches: int = 0
+    elapsed_s: float = 0.0
+    dry_run: bool = False
+    samples: List[Tuple[str, Dict]] = field(default_factory=list)
+
+    def summary(self) -> str:
+        if self.dry_run:
+            return (f"[dry run] scanned {self.scanned}, would patch {self.patched} "
+                    f"in {self.elapsed_s:.2f}s")
+        rate = self.scanned / self.elapsed_s if self.elapsed_s else 0.0
+        return (f"scanned {self.scanned}, patched {self.patched} ({self.modified} modified, "
+                f"{self.failed} failed) in {self.batches} batches, {self.elapsed_s:.2f}s ({rate:,.0f} docs/s)")
+
+
+def subdocument_patch(doc: Dict, path: str, values: Dict, empty: Optional[Dict] = None) -> Dict:
+    """
+    $set fields writing `values` into doc[path]: dotted paths when the
+    subdocument exists (its other keys are untouched), the whole subdocument
+    (`empty` defaults + values) when it is missing or null.
+    """
+    if isinstance(doc.get(path), dict):
+        return {f"{path}.{key}": value for key, value in values.items()}
+    return {path: {**(empty or {}), **values}}
+
+
+class BulkPatcher:
+    """
+    Targeted updates over a collection without per-document round trips.
+
+    Documents matching `query` are streamed from an async cursor with only
+    the `projection` fields, `patch(doc)` returns the fields to $set (or
+    nothing to skip the document) and the updates go out as unordered
+    bulk_write batches of `batch_size`, the next batch being read while the
+    previous one is written. Every patch also sets `updated_at`, the data
+    version the village repository polls. `dry_run` only counts and keeps
+    a few sample patches.
+    """
+
+    def __init__(self, collection, batch_size: int = DEFAULT_BATCH_SIZE, dry_run: bool = False,
+                 touch: bool = True, samples: int = 3):
+        self.collection = collection
+        self.batch_size = max(1, batch_size)
+        self.dry_run = dry_run
+        self.touch = touch
+        self.max_samples = samples
+
+    async def run(self, query: Dict, projection: Optional[Dict], patch: Callable[[Dict], Optional[Dict]]) -> PatchStats:
+        stats = PatchStats(dry_run=self.dry_run)
+        started = time.perf_counter()
+        now = datetime.utcnow()
+        operations = []
+        writing: Optional[asyncio.Task] = None
+
+        cursor = self.collection.find(query, projection, batch_size=self.batch_size)
+        try:
+            async for doc in cursor:
+                stats.scanned += 1
+                fields = patch(doc)
+                if not fields:
+                    continue
+                if self.touch:
+                    fields = dict(fields, updated_at=now)
+                stats.patched += 1
+                if self.dry_run:
+                    if len(stats.samples) < self.max_samples:
+                        stats.samples.append((doc["_id"], fields))
+                    continue
+                operations.append(UpdateOne({"_id": doc["_id"]}, {"$set": fields}))
+                if len(operations) >= self.batch_size:
+                    if writing is not None:
+                        await writing
+                    writing = asyncio.create_task(self._write(operations, stats))
+                    operations = []
+        finally:
+            if writing is not None:
+                await writing
+        if operations:
+            await self._write(operations, stats)
+
+        stats.elapsed_s = time.perf_counter() - started
+        return stats
+
+    async def _write(self, operations: List[UpdateOne], stats: PatchStats):
+        stats.batches += 1
+        try:
+            result = await self.collection.bulk_write(operations, ordered=False)
+            stats.matched += result.matched_count
+            stats.modified += result.modified_count
+        except BulkWriteError as e:
+            details = e.details
+            errors = details.get("writeErrors", [])
+            stats.matched += details.get("nMatched", 0)
+            stats.modified += details.get("nModified", 0)
+            for error in errors[:max(0, MAX_PRINTED_ERRORS - stats.failed)]:
+                print(f"  - write error: {error.get('errmsg')}")
+            stats.failed += len(errors)
@@ -0,0 +1,133 @@
+import json
+import math
+import os
+from dataclasses import asdict, dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from backend.services.scoring import ScoringFeatures, active_scoring
+
+# ==========================================
+# FEATURES
+# ==========================================
+
+DEFAULT_MODEL_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "cluster_model.json")
+
+# name -> label given to a cluster whose centroid stands out on it
+FEATURES: Dict[str, str] = {
+    "digital": "Digitally connected",
+    "living": "Well-serviced",
+    "economy": "Economic hub",
+    "health_supply": "Health service hub",
+    "infectious": "Disease hotspot",
+    "education_ratio": "Education hub",
+}
+# Centroids with no feature above this (standardized) are "Underserved"
+STANDOUT_Z = 0.25
+UNCATEGORIZED = "Uncategorized (AI Disabled)"
+
+
+def feature_vector(f: ScoringFeatures) -> List[float]:
+    """
+    Clustering inputs of one village: the digital / living / economy indices
+    (0-100) and log-scaled health supply, infectious cases and school ratio.
+    """
+    digital, living, economy, _ = active_scoring.indices(f)
+    ratio = f.smp_sma / f.sd if f.sd else 0.0
+    return [digital, living, economy, math.log1p(active_scoring.supply(f)), math.log1p(f.infectious),
+            math.log1p(ratio)]
+
+
+def name_clusters(centroids: Sequence[Sequence[float]], features: Sequence[str]) -> List[str]:
+    """
+    A readable label per centroid (in standardized units) from its most
+    distinctive feature; repeated labels are numbered.
+    """
+    names, seen = [], {}
+    for centroid in centroids:
+        best = max(range(len(features)), key=lambda j: centroid[j])
+        name = FEATURES.get(features[best], features[best]) if centroid[best] > STANDOUT_Z else "Underserved"
+        seen[name] = seen.get(name, 0) + 1
+        names.append(name if seen[name] == 1 else f"{name} ({seen[name]})")
+    return names
+
+# ==========================================
+# MODEL
+# ==========================================
+
+@dataclass
+class ClusterModel:
+    """
+    Trained scaler and centroids (standardized space), persisted as a small
+    JSON file. Prediction is pure Python, O(k * features) per village.
+    """
+    features: List[str]
+    mean: List[float]
+    scale: List[float]
+    centroids: List[List[float]]
+    names: List[str]
+    villages: int = 0
+    inertia: float = 0.0
+    iterations: int = 0
+    mini_batch: bool = False
+    trained_at: Optional[str] = None
+
+    @property
+    def k(self) -> int:
+        return len(self.centroids)
+
+    def predict(self, vector: Sequence[float]) -> int:
+        z = [(x - m) / s for x, m, s in zip(vector, self.mean, self.scale)]
+        best, best_distance = 0, math.inf
+        for c, centroid in enumerate(self.centroids):
+            distance = sum((a - b) * (a - b) for a, b in zip(z, centroid))
+            if distance < best_distance:
+                best, best_distance = c, distance
+        return best
+
+    def save(self, path: Optional[str] = None) -> str:
+        path = path or os.getenv("CLUSTER_MODEL_PATH") or DEFAULT_MODEL_PATH
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(asdict(self), f, indent=1)
+        return path
+
+    @classmethod
+    def load(cls, path: Optional[str] = None) -> Optional["ClusterModel"]:
+        """
+        CLUSTER_MODEL_PATH (default backend/cluster_model.json); None if there is no
+        usable model, or if it was trained on other features.
+        """
+        path = path or os.getenv("CLUSTER_MODEL_PATH") or DEFAULT_MODEL_PATH
+        try:
+            with open(path, encoding="utf-8") as f:
+                model = cls(**json.load(f))
+        except FileNotFoundError:
+            return None
+        except (ValueError, TypeError) as e:
+            print(f"WARNING: ignoring cluster model {path}: {e}")
+            return None
+        return model if model.features == list(FEATURES) else None
+
+
+def train(vectors: Sequence[Sequence[float]], k: int = 5, seed: int = 0, **options) -> ClusterModel:
+    """
+    Fits k-means on feature vectors (requires numpy, see services/kmeans.py).
+    """
+    import numpy as np
+    from backend.services.kmeans import fit_kmeans, standardize
+
+    mean, scale, X = standardize(np.asarray(vectors, dtype=float))
+    result = fit_kmeans(X, k, seed=seed, **options)
+    centroids = [[round(float(v), 6) for v in c] for c in result.centroids]
+    return ClusterModel(
+        features=list(FEATURES),
+        mean=[float(v) for v in mean],
+        scale=[float(v) for v in scale],
+        centroids=centroids,
+        names=name_clusters(centroids, list(FEATURES)),
+        villages=len(X),
+        inertia=round(result.inertia, 3),
+        iterations=result.iterations,
+        mini_batch=result.mini_batch,
+        trained_at=datetime.now(timezone.utc).isoformat(timespec="seconds"),
+    )
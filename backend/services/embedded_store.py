@@ -0,0 +1,162 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+from backend.models import Village, AIAnalysis
+from backend.services.podes import CSV_FILE_PATH, read_villages
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(CSV_FILE_PATH), ".podes_cache.sqlite")
+
+
+class EmbeddedVillageStore:
+    """
+    Village store for INDEST_STORAGE=embedded: the PODES CSV is the source of
+    truth and everything lives in memory, no network I/O.
+
+    An optional SQLite sidecar (INDEST_CACHE_PATH, empty string disables) keeps
+    - the parsed documents, keyed by the CSV fingerprint, for faster restarts,
+    - AI analyses written at runtime, re-applied on top of the CSV data.
+
+    Implements the same interface as MongoVillageStore, including
+    `load_changes`: every write bumps the revision and records which village
+    it touched, so a refresh only swaps in those villages.
+    """
+
+    def __init__(self, csv_path: Optional[str] = None, cache_path: Optional[str] = None):
+        self.csv_path = csv_path or os.getenv("INDEST_CSV_PATH") or CSV_FILE_PATH
+        if cache_path is None:
+            cache_path = os.getenv("INDEST_CACHE_PATH", DEFAULT_CACHE_PATH)
+        self.cache_path = cache_path or None
+        self._villages: Dict[str, Village] = {}
+        self._fingerprint: Optional[Tuple] = None
+        self._revision = 0
+        # village id -> revision of its latest runtime write (since the last CSV load)
+        self._changed_at: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    # ---------- versioning ----------
+
+    def _csv_fingerprint(self) -> Tuple:
+        stat = os.stat(self.csv_path)
+        return (os.path.abspath(self.csv_path), stat.st_size, stat.st_mtime_ns)
+
+    async def version(self) -> Tuple:
+        return (self._csv_fingerprint(), self._revision)
+
+    # ---------- loading ----------
+
+    async def load_all(self) -> List[Village]:
+        fingerprint = self._csv_fingerprint()
+        if fingerprint != self._fingerprint:
+            await asyncio.to_thread(self._load, fingerprint)
+        with self._lock:
+            return list(self._villages.values())
+
+    async def load_changes(self, snapshot, version: Tuple) -> Optional[Tuple[List[Village], List[str]]]:
+        """
+        (changed villages, deleted ids) between `snapshot` and `version`,
+        or None when a full load is needed (the CSV changed).
+        """
+        fingerprint, _ = version
+        loaded_from, since = snapshot.version
+        with self._lock:
+            if fingerprint != self._fingerprint or loaded_from != self._fingerprint:
+                return None
+            changed = [self._villages[i] for i, revision in self._changed_at.items() if revision > since]
+        # Runtime writes never delete villages
+        return changed, []
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        if not self.cache_path:
+            return None
+        try:
+            conn = sqlite3.connect(self.cache_path)
+            conn.executescript(
+                "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);"
+                "CREATE TABLE IF NOT EXISTS villages (id TEXT PRIMARY KEY, doc TEXT NOT NULL);"
+                "CREATE TABLE IF NOT EXISTS ai_analysis (id TEXT PRIMARY KEY, doc TEXT NOT NULL, updated_at TEXT NOT NULL);"
+            )
+            return conn
+        except sqlite3.Error as e:
+            # Read-only filesystems (serverless): run from the CSV alone
+            print(f"Embedded store: cache disabled ({e})")
+            self.cache_path = None
+            return None
+
+    def _load(self, fingerprint: Tuple):
+        t0 = time.perf_counter()
+        conn = self._connect()
+        key = json.dumps(fingerprint)
+        villages = None
+        source = "csv"
+        try:
+            if conn is not None:
+                row = conn.execute("SELECT value FROM meta WHERE key = 'csv_fingerprint'").fetchone()
+                if row and row[0] == key:
+                    villages = [Village.model_validate_json(doc) for (doc,) in conn.execute("SELECT doc FROM villages")]
+                    source = "cache"
+
+            if villages is None:
+                villages = list(read_villages(self.csv_path))
+                if conn is not None:
+                    with conn:
+                        conn.execute("DELETE FROM villages")
+                        conn.executemany(
+                            "INSERT INTO villages (id, doc) VALUES (?, ?)",
+                            ((v.id, v.model_dump_json()) for v in villages),
+                        )
+                        conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('csv_fingerprint', ?)", (key,))
+
+            by_id = {v.id: v for v in villages}
+            # Runtime AI writes survive CSV reloads and restarts
+            if conn is not None:
+                for village_id, doc in conn.execute("SELECT id, doc FROM ai_analysis"):
+                    if village_id in by_id:
+                        by_id[village_id] = by_id[village_id].model_copy(
+                            update={"ai_analysis": AIAnalysis.model_validate_json(doc)}
+                        )
+        finally:
+            if conn is not None:
+                conn.close()
+
+        with self._lock:
+            self._villages = by_id
+            self._fingerprint = fingerprint
+            self._changed_at = {}
+        print(f"Embedded store: {len(by_id)} villages from {source} in {time.perf_counter() - t0:.3f}s")
+
+    # ---------- writes ----------
+
+    async def save_ai_analysis(self, village_id: str, analysis: AIAnalysis) -> bool:
+        with self._lock:
+            village = self._villages.get(village_id)
+            if village is None:
+                return False
+            # Copy-on-write: snapshots holding the old object stay unchanged
+            self._villages[village_id] = village.model_copy(
+                update={"ai_analysis": analysis, "updated_at": datetime.utcnow()}
+            )
+            self._revision += 1
+            self._changed_at[village_id] = self._revision
+
+        # Keep the sqlite write off the event loop
+        await asyncio.to_thread(self._persist_ai_analysis, village_id, analysis)
+        return True
+
+    def _persist_ai_analysis(self, village_id: str, analysis: AIAnalysis):
+        conn = self._connect()
+        if conn is None:
+            return
+        try:
+            with conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO ai_analysis (id, doc, updated_at) VALUES (?, ?, ?)",
+                    (village_id, analysis.model_dump_json(), datetime.utcnow().isoformat()),
+                )
+        finally:
+            conn.close()
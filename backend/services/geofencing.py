@@ -1,8 +1,20 @@
 import json
+import math
 import os
 from shapely.geometry import shape, Point
 from typing import Optional, Dict
 
+def haversine(lat1, lon1, lat2, lon2):
+    R = 6371  # Radius of earth in km
+    dLat = math.radians(lat2 - lat1)
+    dLon = math.radians(lon2 - lon1)
+    a = math.sin(dLat/2) * math.sin(dLat/2) + \
+        math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * \
+        math.sin(dLon/2) * math.sin(dLon/2)
+    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
+    d = R * c
+    return d
+
 class GeofenceService:
     """
     Service to handle polygon-based spatial lookups to identify 
@@ -10,6 +22,8 @@ class GeofenceService:
     """
     _instance = None
     _features = []
+    _geojson = None
+    _geojson_bytes = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -25,12 +39,15 @@ class GeofenceService:
         self._loaded = True
 
     def _load_geojson(self):
-        # Path relative to project root (usually where main.py runs)
-        # Assuming the backend is run from d:\BPS LA\indest
-        file_path = os.path.join(os.getcwd(), "data", "peta_desa_202513524.geojson")
-        
+        # INDEST_GEOJSON_PATH overrides the bundled regency map (e.g. synthetic boundaries)
+        file_path = os.getenv("INDEST_GEOJSON_PATH")
+        if not file_path:
+            # Path relative to project root (usually where main.py runs)
+            # Assuming the backend is run from d:\BPS LA\indest
+            file_path = os.path.join(os.getcwd(), "data", "peta_desa_202513524.geojson")
+
         # Fallback if running from backend folder
-        if not os.path.exists(file_path):
+        if not os.path.exists(file_path) and not os.getenv("INDEST_GEOJSON_PATH"):
             file_path = os.path.join(os.getcwd(), "..", "data", "peta_desa_202513524.geojson")
 
         if not os.path.exists(file_path):
@@ -51,7 +68,8 @@ class GeofenceService:
                 except Exception as e2:
                     print(f"Critical loading error: {e2}")
                     data = {"features": []}
-            
+
+            self._geojson = data
             for feature in data.get("features", []):
                     try:
                         # iddesa matches the village ID in our database
@@ -68,6 +86,24 @@ class GeofenceService:
         except Exception as e:
             print(f"Error loading GeoJSON: {e}")
 
+    def get_geojson(self) -> Optional[Dict]:
+        """
+        The raw FeatureCollection (loaded once, shared with /api/boundaries).
+        None if the GeoJSON file is missing.
+        """
+        self._ensure_loaded()
+        return self._geojson
+
+    def get_geojson_bytes(self) -> Optional[bytes]:
+        """
+        Serialized once so /api/boundaries doesn't re-encode the collection per request.
+        """
+        if self._geojson_bytes is None:
+            if self.get_geojson() is None:
+                return None
+            self._geojson_bytes = json.dumps(self.get_geojson(), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        return self._geojson_bytes
+
     def find_village(self, lat: float, lon: float) -> Optional[Dict]:
         """
         Detect if a point (lat, lon) falls within any defined village polygon.
@@ -0,0 +1,210 @@
+import asyncio
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
+
+from backend.models import AIAnalysis
+from backend.services.ai_service import request_village_insights, stream_village_insights
+from backend.services.db_service import apply_insights, village_ai_payload
+from backend.services.llm import LLMConfigError
+from backend.services.rate_limit import RateLimited, TokenBucket
+
+INSIGHT_WORKERS = int(os.getenv("INSIGHT_WORKERS", "2"))
+INSIGHT_QUEUE_SIZE = int(os.getenv("INSIGHT_QUEUE_SIZE", "500"))
+INSIGHT_RPM = float(os.getenv("INSIGHT_RPM", "60"))
+# Finished jobs stay pollable this long
+JOB_RETENTION_SECONDS = 3600
+MAX_ATTEMPTS = 3
+MAX_RETRY_WAIT_S = 60
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+
+class QueueFull(Exception):
+    pass
+
+
+@dataclass
+class InsightJob:
+    id: str
+    village_id: str
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    attempts: int = 0
+    error: Optional[str] = None
+    analysis: Optional[AIAnalysis] = None
+
+    @property
+    def active(self) -> bool:
+        return self.status in (QUEUED, RUNNING)
+
+
+class InsightJobQueue:
+    """
+    In-process queue for on-demand AI insights.
+
+    - `submit` deduplicates: while a village has a queued or running job,
+      further requests return that job,
+    - `workers` asyncio tasks call the async provider (backend/services/llm.py,
+      never blocking the event loop) under a shared TokenBucket; 429s wait
+      for Retry-After, other errors retry up to MAX_ATTEMPTS,
+    - a job is `done` only once the analysis is persisted through the
+      repository (Mongo or embedded store) and the snapshot refreshed.
+    `stream` is the SSE counterpart of a job: same rate limit and persistence,
+    but the caller receives the partial results.
+    """
+
+    def __init__(self, repository=None, generate: Callable[[dict], Awaitable[dict]] = request_village_insights,
+                 workers: int = INSIGHT_WORKERS, max_queue: int = INSIGHT_QUEUE_SIZE, rpm: float = INSIGHT_RPM,
+                 stream_generate: Callable[[dict], AsyncIterator[Tuple[str, object]]] = stream_village_insights):
+        if repository is None:
+            from backend.services.repository import village_repository
+            repository = village_repository
+        self.repository = repository
+        self.generate = generate
+        self.stream_generate = stream_generate
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self.bucket = TokenBucket(rpm / 60, burst=self.workers)
+        self.jobs: Dict[str, InsightJob] = {}
+        self.active_by_village: Dict[str, InsightJob] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+
+    # ---------- lifecycle ----------
+
+    def start(self):
+        if self._tasks:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    # ---------- API ----------
+
+    def submit(self, village_id: str) -> InsightJob:
+        self.start()
+        self._prune()
+        active = self.active_by_village.get(village_id)
+        if active is not None:
+            return active
+        job = InsightJob(id=uuid.uuid4().hex, village_id=village_id)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise QueueFull(f"{self.max_queue} insight jobs already queued")
+        self.jobs[job.id] = job
+        self.active_by_village[village_id] = job
+        return job
+
+    def completed(self, village_id: str, analysis: AIAnalysis) -> InsightJob:
+        """
+        Job record for a village whose insights already exist (nothing to run).
+        """
+        now = time.time()
+        job = InsightJob(id=uuid.uuid4().hex, village_id=village_id, status=DONE,
+                         started_at=now, finished_at=now, analysis=analysis)
+        self.jobs[job.id] = job
+        return job
+
+    async def stream(self, village) -> AsyncIterator[Tuple[str, object]]:
+        """
+        Generates insights for `village` right away, yielding the partial
+        events of stream_village_insights, then ("saved", AIAnalysis) once
+        persisted. One attempt: errors reach the caller.
+        """
+        await self.bucket.acquire()
+        insights = None
+        try:
+            async for event, data in self.stream_generate(village_ai_payload(village)):
+                if event == "insights":
+                    insights = data
+                else:
+                    yield event, data
+        except RateLimited as e:
+            self.bucket.on_throttle(e.retry_after)
+            raise
+        self.bucket.on_success()
+        yield "saved", await self._persist(village, insights)
+
+    def get(self, job_id: str) -> Optional[InsightJob]:
+        return self.jobs.get(job_id)
+
+    def stats(self) -> Dict:
+        counts = {QUEUED: 0, RUNNING: 0, DONE: 0, FAILED: 0}
+        for job in self.jobs.values():
+            counts[job.status] += 1
+        counts["workers"] = len(self._tasks)
+        return counts
+
+    # ---------- workers ----------
+
+    def _prune(self):
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [j.id for j in self.jobs.values() if not j.active and j.finished_at < cutoff]:
+            del self.jobs[job_id]
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                job.status, job.error = FAILED, str(e)
+            finally:
+                if job.finished_at is None:
+                    job.finished_at = time.time()
+                if self.active_by_village.get(job.village_id) is job:
+                    del self.active_by_village[job.village_id]
+                self._queue.task_done()
+
+    async def _run(self, job: InsightJob):
+        job.status, job.started_at = RUNNING, time.time()
+        snapshot = await self.repository.get_snapshot()
+        village = snapshot.get(job.village_id)
+        if village is None:
+            job.status, job.error = FAILED, "Village not found"
+            return
+
+        payload = village_ai_payload(village)
+        insights = None
+        while insights is None:
+            await self.bucket.acquire()
+            job.attempts += 1
+            try:
+                insights = await self.generate(payload)
+            except RateLimited as e:
+                self.bucket.on_throttle(e.retry_after)
+                if job.attempts >= MAX_ATTEMPTS:
+                    raise
+            except LLMConfigError:
+                raise
+            except Exception:
+                if job.attempts >= MAX_ATTEMPTS:
+                    raise
+                await asyncio.sleep(min(MAX_RETRY_WAIT_S, 2 ** job.attempts))
+        self.bucket.on_success()
+
+        job.analysis = await self._persist(village, insights)
+        job.status, job.finished_at = DONE, time.time()
+
+    async def _persist(self, village, insights: dict) -> AIAnalysis:
+        base = village.ai_analysis.model_copy() if village.ai_analysis else AIAnalysis()
+        analysis = apply_insights(base, insights)
+        if not await self.repository.save_ai_analysis(village.id, analysis):
+            raise RuntimeError("Village disappeared before the analysis was saved")
+        # Wait until /api/micro shows the result; jobs finishing together share one refresh
+        await self.repository.refresh_soon()
+        return analysis
+
+# Singleton instance
+insight_jobs = InsightJobQueue()
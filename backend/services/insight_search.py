@@ -0,0 +1,340 @@
+import hashlib
+import heapq
+import math
+import os
+import threading
+import zlib
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.services.search import fold
+
+# ==========================================
+# TEXT
+# ==========================================
+
+STOPWORDS = frozenset("""
+yang dan di ke dari untuk dengan dalam pada oleh sebagai ini itu atau juga akan masih sudah
+adalah agar bagi para serta secara lebih sangat karena dapat belum tidak ada desa warga
+the of and in on for to with a an is are that which village villages have has
+""".split())
+
+# Light Indonesian suffix stripping ("pertanian" / "pertani"), same on both sides
+_SUFFIXES = ("nya", "kan", "an")
+_MIN_STEM = 4
+
+# English / colloquial query words -> terms used in the (Indonesian) analyses
+SYNONYMS = {
+    "irrigation": ("irigasi", "pengairan"),
+    "water": ("air",),
+    "flood": ("banjir",),
+    "landslide": ("longsor",),
+    "drought": ("kekeringan",),
+    "disaster": ("bencana",),
+    "market": ("pasar",),
+    "tourism": ("wisata", "ekowisata"),
+    "farming": ("pertanian", "tani"),
+    "farmer": ("petani",),
+    "fishery": ("perikanan", "nelayan"),
+    "school": ("sekolah", "pendidikan"),
+    "education": ("pendidikan",),
+    "health": ("kesehatan",),
+    "road": ("jalan",),
+    "internet": ("internet", "digital", "sinyal"),
+    "signal": ("sinyal",),
+    "youth": ("pemuda",),
+    "problem": ("masalah", "kendala", "kurang", "minim", "terbatas", "rendah"),
+    "problems": ("masalah", "kendala", "kurang", "minim", "terbatas", "rendah"),
+    "masalah": ("kendala", "kurang", "minim", "terbatas", "rendah"),
+}
+SYNONYM_WEIGHT = 0.6
+
+
+def stem(token: str) -> str:
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= _MIN_STEM:
+            return token[: -len(suffix)]
+    return token
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return [stem(t) for t in fold(text).split() if t not in STOPWORDS and len(t) > 1]
+
+
+def query_terms(query: str) -> Dict[str, float]:
+    """
+    Stemmed query terms with their weights (synonyms count less than typed words).
+    """
+    terms: Dict[str, float] = {}
+    for word in fold(query).split():
+        if word not in STOPWORDS and len(word) > 1:
+            terms[stem(word)] = 1.0
+        for synonym in SYNONYMS.get(word, ()):
+            terms.setdefault(stem(synonym), SYNONYM_WEIGHT)
+    return terms
+
+# ==========================================
+# HASHED EMBEDDINGS
+# ==========================================
+
+class HashingEmbedder:
+    """
+    Dependency-free text vectors: signed feature hashing of stemmed words
+    and their character 4-grams into `dims` buckets, L2-normalized (sparse).
+    Catches partial and inflected matches ("irigasinya", "pengairan") that
+    exact BM25 terms miss.
+    """
+
+    def __init__(self, dims: int = 1024, ngram: int = 4):
+        self.dims = dims
+        self.ngram = ngram
+
+    def _features(self, tokens: Iterable[str]):
+        for token in tokens:
+            yield token, 1.0
+            padded = f"#{token}#"
+            for i in range(max(1, len(padded) - self.ngram + 1)):
+                yield padded[i:i + self.ngram], 0.5
+
+    def embed(self, tokens: Iterable[str]) -> Dict[int, float]:
+        vector: Dict[int, float] = {}
+        for feature, weight in self._features(tokens):
+            h = zlib.crc32(feature.encode("utf-8"))
+            dim = h % self.dims
+            sign = 1.0 if (h >> 31) & 1 else -1.0
+            vector[dim] = vector.get(dim, 0.0) + sign * weight
+        norm = math.sqrt(sum(v * v for v in vector.values()))
+        return {d: v / norm for d, v in vector.items() if v} if norm else {}
+
+
+def cosine(a: Dict[int, float], b: Dict[int, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(d, 0.0) for d, v in a.items())
+
+# ==========================================
+# INDEX
+# ==========================================
+
+def analysis_fields(analysis) -> List[Tuple[str, str]]:
+    """
+    (field, text) pairs of a stored AIAnalysis: persona, narrative, each SWOT
+    item and each recommendation.
+    """
+    if analysis is None:
+        return []
+    fields = []
+    if analysis.persona and analysis.persona != "Unknown":
+        fields.append(("persona", analysis.persona))
+    if analysis.social_capital_narrative:
+        fields.append(("social_capital_narrative", analysis.social_capital_narrative))
+    for section, items in (analysis.swot_analysis or {}).items():
+        for item in items if isinstance(items, list) else []:
+            fields.append((f"swot.{section}", str(item)))
+    recommendations = (analysis.recommendations or {}).get("recommendations", [])
+    for item in recommendations if isinstance(recommendations, list) else []:
+        fields.append(("recommendations", str(item)))
+    if analysis.investment_potential:
+        fields.append(("investment_potential", analysis.investment_potential))
+    return fields
+
+
+class _Doc:
+    __slots__ = ("id", "name", "district", "persona", "fields", "terms", "length", "vector", "digest")
+
+    def __init__(self, village_id: str, name: str, district: str, persona: Optional[str],
+                 fields: List[Tuple[str, str]], digest: str, embedder: Optional[HashingEmbedder]):
+        self.id = village_id
+        self.name = name
+        self.district = district
+        self.persona = persona
+        self.fields = fields
+        self.digest = digest
+        tokens = [t for _, text in fields for t in tokenize(text)]
+        self.terms: Dict[str, int] = {}
+        for token in tokens:
+            self.terms[token] = self.terms.get(token, 0) + 1
+        self.length = len(tokens)
+        self.vector = embedder.embed(tokens) if embedder else None
+
+
+class InsightSearchIndex:
+    """
+    In-memory full-text index over the AI analyses (persona, narrative,
+    SWOT items, recommendations).
+
+    - BM25 over an inverted index of folded, lightly stemmed terms; English
+      query words are expanded to the Indonesian terms of the analyses,
+    - optional hashed embeddings (HashingEmbedder, no external service)
+      rerank the BM25 candidates ("hybrid", which falls back to a vector
+      scan when no term matches) or scan every document ("vector"),
+    - `sync(snapshot)` is incremental: only villages whose analysis text
+      changed (by digest) are re-indexed, so a snapshot swap after one
+      insight job costs one document.
+    """
+
+    K1 = 1.2
+    B = 0.75
+    # BM25 candidates reranked by vector similarity in hybrid mode
+    RERANK_CANDIDATES = 200
+    VECTOR_WEIGHT = 0.35
+    VECTOR_MIN_SIMILARITY = 0.1
+    MODES = ("bm25", "hybrid", "vector")
+
+    def __init__(self, vectors: bool = True):
+        self.embedder = HashingEmbedder() if vectors else None
+        self._lock = threading.Lock()
+        self._docs: Dict[str, _Doc] = {}
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._docs)
+
+    # ---------- maintenance ----------
+
+    @staticmethod
+    def _digest(fields: List[Tuple[str, str]]) -> str:
+        digest = hashlib.sha1()
+        for field, text in fields:
+            digest.update(f"{field}\x1f{text}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    def _remove(self, village_id: str):
+        doc = self._docs.pop(village_id, None)
+        if doc is None:
+            return
+        for term in doc.terms:
+            posting = self._postings.get(term)
+            if posting is not None:
+                posting.pop(village_id, None)
+                if not posting:
+                    del self._postings[term]
+        self._total_length -= doc.length
+
+    def upsert(self, village) -> bool:
+        """
+        (Re)indexes one village; returns False when its analysis text is unchanged.
+        """
+        fields = analysis_fields(village.ai_analysis)
+        digest = self._digest(fields)
+        with self._lock:
+            current = self._docs.get(village.id)
+            if current is not None and current.digest == digest:
+                return False
+            self._remove(village.id)
+            if not fields:
+                return current is not None
+            doc = _Doc(village.id, village.name, village.district, village.ai_analysis.persona,
+                       fields, digest, self.embedder)
+            self._docs[village.id] = doc
+            for term, tf in doc.terms.items():
+                self._postings.setdefault(term, {})[village.id] = tf
+            self._total_length += doc.length
+        return True
+
+    def remove(self, village_id: str):
+        with self._lock:
+            self._remove(village_id)
+
+    def sync(self, snapshot) -> int:
+        """
+        Brings the index in line with a VillageSnapshot; returns the number of
+        villages (re)indexed or dropped. Uses snapshot.changed_ids when set.
+        """
+        changed = 0
+        if snapshot.changed_ids is not None:
+            for village_id in snapshot.changed_ids:
+                village = snapshot.get(village_id)
+                if village is None:
+                    if village_id in self._docs:
+                        self.remove(village_id)
+                        changed += 1
+                elif self.upsert(village):
+                    changed += 1
+            return changed
+
+        for village in snapshot.villages:
+            changed += self.upsert(village)
+        for village_id in [i for i in self._docs if snapshot.get(i) is None]:
+            self.remove(village_id)
+            changed += 1
+        return changed
+
+    # ---------- querying ----------
+
+    def _bm25(self, terms: Dict[str, float], district: Optional[str]) -> Dict[str, float]:
+        n = len(self._docs)
+        avg_length = self._total_length / n if n else 0.0
+        scores: Dict[str, float] = {}
+        for term, weight in terms.items():
+            posting = self._postings.get(term)
+            if not posting:
+                continue
+            idf = math.log(1 + (n - len(posting) + 0.5) / (len(posting) + 0.5))
+            for village_id, tf in posting.items():
+                doc = self._docs[village_id]
+                if district and doc.district != district:
+                    continue
+                norm = tf + self.K1 * (1 - self.B + self.B * doc.length / avg_length)
+                scores[village_id] = scores.get(village_id, 0.0) + weight * idf * tf * (self.K1 + 1) / norm
+        return scores
+
+    def _matches(self, doc: _Doc, terms: Dict[str, float], query_vector, limit: int = 3) -> List[Dict]:
+        """
+        Passages of `doc` containing query terms; for vector-only hits, the most similar ones.
+        """
+        scored = []
+        for order, (field, text) in enumerate(doc.fields):
+            tokens = tokenize(text)
+            weight = sum(w for t, w in terms.items() if t in tokens)
+            if not weight and query_vector:
+                weight = cosine(query_vector, self.embedder.embed(tokens)) - self.VECTOR_MIN_SIMILARITY
+            if weight > 0:
+                scored.append((weight, -order, field, text))
+        return [{"field": field, "text": text} for _, _, field, text in heapq.nlargest(limit, scored)]
+
+    def search(self, query: str, limit: int = 10, district: Optional[str] = None, mode: str = "hybrid") -> List[Dict]:
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown search mode '{mode}' (expected one of {self.MODES})")
+        terms = query_terms(query)
+        if not terms:
+            return []
+        with self._lock:
+            use_vectors = mode != "bm25" and self.embedder is not None
+            query_vector = self.embedder.embed(list(terms)) if use_vectors else None
+            scores = self._bm25(terms, district) if mode != "vector" else {}
+
+            if query_vector and not scores:
+                # Pure vector mode, or no exact term in any analysis: nearest texts
+                scores = {
+                    village_id: similarity
+                    for village_id, doc in self._docs.items()
+                    if (not district or doc.district == district)
+                    and (similarity := cosine(query_vector, doc.vector)) >= self.VECTOR_MIN_SIMILARITY
+                }
+            elif query_vector:
+                candidates = heapq.nlargest(self.RERANK_CANDIDATES, scores.items(), key=lambda kv: kv[1])
+                top = candidates[0][1]
+                scores = {
+                    i: (1 - self.VECTOR_WEIGHT) * s / top
+                    + self.VECTOR_WEIGHT * max(0.0, cosine(query_vector, self._docs[i].vector))
+                    for i, s in candidates
+                }
+
+            best = heapq.nlargest(limit, scores.items(), key=lambda kv: (kv[1], kv[0]))
+            return [
+                {
+                    "id": doc.id,
+                    "name": doc.name,
+                    "district": doc.district,
+                    "persona": doc.persona,
+                    "score": round(score, 4),
+                    "matches": self._matches(doc, terms, query_vector),
+                }
+                for doc, score in ((self._docs[i], s) for i, s in best)
+            ]
+
+
+# Singleton instance
+# INSIGHT_SEARCH_VECTORS=0 keeps BM25 only (less memory, no vector rerank)
+insight_search_index = InsightSearchIndex(vectors=os.getenv("INSIGHT_SEARCH_VECTORS", "1") != "0")
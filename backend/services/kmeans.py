@@ -0,0 +1,135 @@
+"""
+k-means in plain numpy (no sklearn).
+
+- k-means++ seeding (on a sample for large inputs),
+- Lloyd iterations for small inputs, mini-batch updates (Sculley, 2010)
+  above `mini_batch_above` rows,
+- the best of `n_init` seedings by inertia over the full input.
+
+Distances are computed in chunks, so memory stays bounded at national
+scale. numpy is only needed here, for training (services/clustering.py,
+scripts/train_clusters.py); the API only loads the trained centroids.
+"""
+from typing import NamedTuple
+
+import numpy as np
+
+CHUNK_ROWS = 65536
+SEED_SAMPLE = 20000
+
+
+class KMeansResult(NamedTuple):
+    centroids: np.ndarray
+    labels: np.ndarray
+    inertia: float
+    iterations: int
+    mini_batch: bool
+
+
+def standardize(X: np.ndarray):
+    """
+    Column means and scales (std, 1 for constant columns) and the scaled matrix.
+    """
+    mean = X.mean(axis=0)
+    scale = X.std(axis=0)
+    scale[scale == 0] = 1.0
+    return mean, scale, (X - mean) / scale
+
+
+def assign(X: np.ndarray, centroids: np.ndarray):
+    """
+    Nearest centroid of every row and the squared distance to it.
+    """
+    labels = np.empty(len(X), dtype=np.int64)
+    distances = np.empty(len(X))
+    c_norms = (centroids ** 2).sum(axis=1)
+    for start in range(0, len(X), CHUNK_ROWS):
+        chunk = X[start:start + CHUNK_ROWS]
+        d = (chunk ** 2).sum(axis=1)[:, None] - 2 * chunk @ centroids.T + c_norms[None, :]
+        labels[start:start + len(chunk)] = d.argmin(axis=1)
+        distances[start:start + len(chunk)] = np.maximum(d.min(axis=1), 0.0)
+    return labels, distances
+
+
+def _cluster_sums(X: np.ndarray, labels: np.ndarray, k: int) -> np.ndarray:
+    # Per-cluster column sums; bincount is much faster than np.add.at
+    return np.stack([np.bincount(labels, weights=X[:, j], minlength=k) for j in range(X.shape[1])], axis=1)
+
+
+def kmeans_plus_plus(X: np.ndarray, k: int, rng: np.random.Generator) -> np.ndarray:
+    if len(X) > SEED_SAMPLE:
+        X = X[rng.choice(len(X), SEED_SAMPLE, replace=False)]
+    centroids = [X[rng.integers(len(X))]]
+    closest = ((X - centroids[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        total = closest.sum()
+        i = rng.choice(len(X), p=closest / total) if total > 0 else rng.integers(len(X))
+        centroids.append(X[i])
+        closest = np.minimum(closest, ((X - X[i]) ** 2).sum(axis=1))
+    return np.array(centroids, dtype=float)
+
+
+def _lloyd(X: np.ndarray, centroids: np.ndarray, max_iter: int, tol: float):
+    k = len(centroids)
+    for iteration in range(1, max_iter + 1):
+        labels, distances = assign(X, centroids)
+        counts = np.bincount(labels, minlength=k)
+        sums = _cluster_sums(X, labels, k)
+        updated = centroids.copy()
+        filled = counts > 0
+        updated[filled] = sums[filled] / counts[filled, None]
+        # Empty cluster: restart it at the point farthest from its centroid
+        for c in np.flatnonzero(~filled):
+            far = distances.argmax()
+            updated[c], distances[far] = X[far], 0.0
+        shift = ((updated - centroids) ** 2).sum()
+        centroids = updated
+        if shift <= tol:
+            break
+    labels, distances = assign(X, centroids)
+    return centroids, labels, float(distances.sum()), iteration
+
+
+def _mini_batch(X: np.ndarray, centroids: np.ndarray, rng: np.random.Generator,
+                batch_size: int, max_iter: int, tol: float):
+    k = len(centroids)
+    counts = np.zeros(k)
+    for iteration in range(1, max_iter + 1):
+        batch = X[rng.integers(len(X), size=batch_size)]
+        labels, _ = assign(batch, centroids)
+        batch_counts = np.bincount(labels, minlength=k)
+        sums = _cluster_sums(batch, labels, k)
+        # Per-centre learning rate 1/count, applied to the whole batch at once
+        filled = batch_counts > 0
+        updated = centroids.copy()
+        updated[filled] = ((centroids[filled] * counts[filled, None] + sums[filled])
+                           / (counts[filled] + batch_counts[filled])[:, None])
+        counts += batch_counts
+        shift = ((updated - centroids) ** 2).sum()
+        centroids = updated
+        if shift <= tol:
+            break
+    labels, distances = assign(X, centroids)
+    return centroids, labels, float(distances.sum()), iteration
+
+
+def fit_kmeans(X: np.ndarray, k: int, seed: int = 0, n_init: int = 4, max_iter: int = 100, tol: float = 1e-6,
+               batch_size: int = 1024, mini_batch_above: int = 20000) -> KMeansResult:
+    """
+    Clusters the (already scaled) rows of X; clusters are numbered by size, largest first.
+    """
+    X = np.asarray(X, dtype=float)
+    k = min(k, len(X))
+    rng = np.random.default_rng(seed)
+    mini_batch = len(X) > mini_batch_above
+    if mini_batch:
+        runs = (_mini_batch(X, kmeans_plus_plus(X, k, rng), rng, batch_size, max_iter * 5, tol) for _ in range(n_init))
+    else:
+        runs = (_lloyd(X, kmeans_plus_plus(X, k, rng), max_iter, tol) for _ in range(n_init))
+    best = min(runs, key=lambda run: run[2])
+    centroids, labels, inertia, iterations = best
+
+    order = np.argsort(-np.bincount(labels, minlength=k), kind="stable")
+    remap = np.empty(k, dtype=np.int64)
+    remap[order] = np.arange(k)
+    return KMeansResult(centroids[order], remap[labels], inertia, iterations, mini_batch)
@@ -0,0 +1,314 @@
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import AsyncIterator, Dict, Optional
+
+from backend.services.rate_limit import RateLimited, is_rate_limit_error, parse_retry_after
+
+DEFAULT_PROVIDER = "gemini"
+DEFAULT_GEMINI_MODEL = "gemini-2.5-flash"
+DEFAULT_TIMEOUT_S = 60.0
+
+
+class LLMConfigError(RuntimeError):
+    """
+    The provider cannot be used (missing API key / SDK). Raised on first use,
+    never at import.
+    """
+
+
+@dataclass
+class LLMResponse:
+    text: str
+    prompt_tokens: Optional[int] = None
+    output_tokens: Optional[int] = None
+
+
+class LLMProvider:
+    """
+    Text generation backend used by ai_service. Implementations raise
+    RateLimited on 429 and let other errors propagate; `timeout_s` bounds
+    every call.
+    """
+
+    name = "base"
+
+    def __init__(self, model: str, timeout_s: float = DEFAULT_TIMEOUT_S):
+        self.model = model
+        self.timeout_s = timeout_s
+
+    def check(self):
+        """
+        Raises LLMConfigError now instead of on the first call (no request is made).
+        """
+
+    async def generate(self, prompt: str, config: Dict) -> LLMResponse:
+        return await asyncio.wait_for(self._generate(prompt, config), timeout=self.timeout_s)
+
+    async def _generate(self, prompt: str, config: Dict) -> LLMResponse:
+        raise NotImplementedError
+
+    def generate_sync(self, prompt: str, config: Dict) -> LLMResponse:
+        raise NotImplementedError
+
+    async def stream(self, prompt: str, config: Dict) -> AsyncIterator[LLMResponse]:
+        """
+        Incremental output: one LLMResponse per chunk, `text` being the new
+        text only. Token counts are set on the chunks that report them (the
+        last one for Gemini). `timeout_s` bounds the wait for each chunk.
+        """
+        chunks = self._stream(prompt, config).__aiter__()
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout_s)
+            except StopAsyncIteration:
+                return
+            yield chunk
+
+    async def _stream(self, prompt: str, config: Dict) -> AsyncIterator[LLMResponse]:
+        # Providers without native streaming answer in one chunk
+        yield await self._generate(prompt, config)
+
+# ==========================================
+# GEMINI
+# ==========================================
+
+class GeminiProvider(LLMProvider):
+    """
+    google-genai client, created on first use (GEMINI_API_KEY checked then).
+    """
+
+    name = "gemini"
+
+    def __init__(self, model: str, timeout_s: float = DEFAULT_TIMEOUT_S, api_key: Optional[str] = None):
+        super().__init__(model, timeout_s)
+        self._api_key = api_key
+        self._client = None
+        self._lock = threading.Lock()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    api_key = self._api_key or os.getenv("GEMINI_API_KEY")
+                    if not api_key:
+                        raise LLMConfigError("GEMINI_API_KEY not found in environment variables")
+                    try:
+                        from google import genai
+                    except ImportError as e:
+                        raise LLMConfigError(f"google-genai is not installed ({e})")
+                    self._client = genai.Client(api_key=api_key, http_options={"timeout": int(self.timeout_s * 1000)})
+        return self._client
+
+    def check(self):
+        self.client
+
+    @staticmethod
+    def _response(response) -> LLMResponse:
+        usage = getattr(response, "usage_metadata", None)
+        return LLMResponse(
+            text=response.text or "",
+            prompt_tokens=getattr(usage, "prompt_token_count", None),
+            output_tokens=getattr(usage, "candidates_token_count", None),
+        )
+
+    async def _generate(self, prompt: str, config: Dict) -> LLMResponse:
+        try:
+            response = await self.client.aio.models.generate_content(model=self.model, contents=prompt, config=config)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise RateLimited(str(e), parse_retry_after(e)) from e
+            raise
+        return self._response(response)
+
+    async def _stream(self, prompt: str, config: Dict) -> AsyncIterator[LLMResponse]:
+        try:
+            chunks = await self.client.aio.models.generate_content_stream(model=self.model, contents=prompt, config=config)
+            async for chunk in chunks:
+                yield self._response(chunk)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise RateLimited(str(e), parse_retry_after(e)) from e
+            raise
+
+    def generate_sync(self, prompt: str, config: Dict) -> LLMResponse:
+        try:
+            response = self.client.models.generate_content(model=self.model, contents=prompt, config=config)
+        except Exception as e:
+            if is_rate_limit_error(e):
+                raise RateLimited(str(e), parse_retry_after(e)) from e
+            raise
+        return self._response(response)
+
+# ==========================================
+# OFFLINE STUB
+# ==========================================
+
+PERSONAS = ("Desa Agraris", "Desa Nelayan", "Desa Wisata", "Desa Industri Kecil", "Desa Perdagangan", "Desa Hutan")
+PACKED_MARKER = "keyed by village_id"
+
+
+class StubProvider(LLMProvider):
+    """
+    Deterministic offline provider for tests, load tests and benchmarks.
+
+    The answer depends only on the prompt: insights are derived from the
+    input JSON embedded in it (single or packed template). Simulated faults
+    are decided per (prompt, attempt), so runs are reproducible whatever the
+    concurrency, and retries eventually succeed:
+    - LLM_STUB_LATENCY_MS: mean latency (+/- 50%),
+    - LLM_STUB_429_RATE: share of calls answered with RateLimited
+      (retry_after LLM_STUB_RETRY_AFTER_S),
+    - LLM_STUB_MALFORMED_RATE: share of calls returning truncated JSON.
+    `stream` sends the same answer in STREAM_CHUNKS pieces spread over the latency.
+    """
+
+    STREAM_CHUNKS = 8
+
+    name = "stub"
+
+    def __init__(self, model: str = "stub", timeout_s: float = DEFAULT_TIMEOUT_S, latency_ms: float = 200,
+                 throttle_rate: float = 0.0, malformed_rate: float = 0.0, retry_after_s: float = 1.0):
+        super().__init__(model, timeout_s)
+        self.latency_ms = latency_ms
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.retry_after_s = retry_after_s
+        self.calls = 0
+        self._attempts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, timeout_s: float) -> "StubProvider":
+        return cls(
+            timeout_s=timeout_s,
+            latency_ms=float(os.getenv("LLM_STUB_LATENCY_MS", "200")),
+            throttle_rate=float(os.getenv("LLM_STUB_429_RATE", "0")),
+            malformed_rate=float(os.getenv("LLM_STUB_MALFORMED_RATE", "0")),
+            retry_after_s=float(os.getenv("LLM_STUB_RETRY_AFTER_S", "1")),
+        )
+
+    @staticmethod
+    def _fraction(*parts) -> float:
+        digest = hashlib.sha256("|".join(str(p) for p in parts).encode("utf-8")).digest()
+        return int.from_bytes(digest[:8], "big") / 2 ** 64
+
+    def _plan(self, prompt: str):
+        """
+        (latency seconds, outcome) for this call: "429", "malformed" or "ok".
+        """
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            self.calls += 1
+            attempt = self._attempts.get(key, 0)
+            self._attempts[key] = attempt + 1
+        latency = self.latency_ms / 1000 * (0.5 + self._fraction(key, "latency", attempt))
+        if self._fraction(key, "429", attempt) < self.throttle_rate:
+            return latency * 0.1, "429"
+        if self._fraction(key, "malformed", attempt) < self.malformed_rate:
+            return latency, "malformed"
+        return latency, "ok"
+
+    @staticmethod
+    def _input(prompt: str):
+        start = prompt.find("{", prompt.find("Input Data"))
+        if start < 0:
+            return {}
+        try:
+            value, _ = json.JSONDecoder().raw_decode(prompt, start)
+            return value
+        except ValueError:
+            return {}
+
+    def _insights(self, data: Dict) -> Dict:
+        name = data.get("name", "Desa")
+        district = data.get("district", "-")
+        # Same village -> same persona whatever the prompt mode
+        persona = PERSONAS[int(self._fraction(name, district, "persona") * len(PERSONAS))]
+        return {
+            "swot": {
+                "strengths": [f"Potensi lokal {name}"],
+                "weaknesses": [f"Akses layanan dasar di {district} terbatas"],
+                "opportunities": ["Penguatan BUMDes"],
+                "threats": ["Risiko bencana musiman"],
+            },
+            "persona": persona,
+            "local_hero": f"Tokoh masyarakat {name}",
+            "recommendations": [f"Prioritaskan program {persona.lower()} di {name}"],
+        }
+
+    def _answer(self, prompt: str, outcome: str) -> LLMResponse:
+        if outcome == "429":
+            raise RateLimited("stub: 429 RESOURCE_EXHAUSTED", self.retry_after_s)
+        data = self._input(prompt)
+        if PACKED_MARKER in prompt:
+            body = [dict(village_id=village_id, **self._insights(d)) for village_id, d in data.items()]
+        else:
+            body = self._insights(data)
+        text = json.dumps(body, ensure_ascii=False)
+        if outcome == "malformed":
+            text = text[: len(text) * 2 // 3]
+        return LLMResponse(text=text, prompt_tokens=max(1, len(prompt) // 4), output_tokens=max(1, len(text) // 4))
+
+    async def _generate(self, prompt: str, config: Dict) -> LLMResponse:
+        latency, outcome = self._plan(prompt)
+        await asyncio.sleep(latency)
+        return self._answer(prompt, outcome)
+
+    async def _stream(self, prompt: str, config: Dict) -> AsyncIterator[LLMResponse]:
+        latency, outcome = self._plan(prompt)
+        answer = self._answer(prompt, outcome)
+        size = -(-len(answer.text) // self.STREAM_CHUNKS)
+        pieces = [answer.text[i:i + size] for i in range(0, len(answer.text), size)] or [""]
+        for n, piece in enumerate(pieces, 1):
+            await asyncio.sleep(latency / len(pieces))
+            last = n == len(pieces)
+            yield LLMResponse(
+                text=piece,
+                prompt_tokens=answer.prompt_tokens if last else None,
+                output_tokens=answer.output_tokens if last else None,
+            )
+
+    def generate_sync(self, prompt: str, config: Dict) -> LLMResponse:
+        latency, outcome = self._plan(prompt)
+        time.sleep(latency)
+        return self._answer(prompt, outcome)
+
+# ==========================================
+# FACTORY
+# ==========================================
+
+_provider: Optional[LLMProvider] = None
+
+
+def create_provider(name: Optional[str] = None) -> LLMProvider:
+    """
+    LLM_PROVIDER=gemini (default) or stub; LLM_TIMEOUT_S bounds every call.
+    """
+    name = (name or os.getenv("LLM_PROVIDER", DEFAULT_PROVIDER)).lower()
+    timeout_s = float(os.getenv("LLM_TIMEOUT_S", DEFAULT_TIMEOUT_S))
+    if name == "stub":
+        return StubProvider.from_env(timeout_s)
+    if name == "gemini":
+        return GeminiProvider(os.getenv("GEMINI_MODEL", DEFAULT_GEMINI_MODEL), timeout_s)
+    raise LLMConfigError(f"Unknown LLM_PROVIDER '{name}' (expected 'gemini' or 'stub')")
+
+
+def get_provider() -> LLMProvider:
+    global _provider
+    if _provider is None:
+        _provider = create_provider()
+    return _provider
+
+
+def set_provider(provider: Optional[LLMProvider]):
+    """
+    Replaces the process-wide provider (None: re-read the environment on next use).
+    """
+    global _provider
+    _provider = provider
@@ -0,0 +1,230 @@
+"""
+Rule-based village personas, evaluated on whole columns.
+
+The rules of the old per-village `generate_smart_persona` (identity from the
+main income and topography, a digital / advanced modifier, a social-capital
+narrative and a templated SWOT) run here as numpy expressions over columns
+built from raw Mongo documents. No model calls; regenerating a regency is a
+single projection query, one pass of the rules and one bulk write
+(scripts/generate_smart_personas.py).
+
+"Advanced" is the independence index grade "Maju", taken from the active
+scoring config (services/scoring.py): the columns are turned into
+ScoringFeatures and graded by `active_scoring.evaluate`, so personas follow
+SCORING_CONFIG_PATH like /api/micro does.
+
+numpy is only needed here; the API itself never imports this module.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from backend.services.scoring import (
+    ELECTRICITY_PLN, FUEL_CLEAN, SIGNAL_STRONG, SIGNAL_WEAK, WATER_IMPROVED,
+    CompiledScoring, ScoringFeatures, active_scoring,
+)
+
+# ==========================================
+# COLUMNS
+# ==========================================
+
+# column -> document path(s); the first non-empty path wins
+TEXT_COLUMNS = {
+    "name": ("name",),
+    "topography": ("topography",),
+    "income": ("economy.primary_income",),
+    "signal_strength": ("digital.signal_strength",),
+    "signal_type": ("digital.signal_type",),
+    "water": ("infrastructure.water_source", "infrastructure.water_drink_source"),
+    "electricity": ("infrastructure.electricity", "infrastructure.electricity_source"),
+    "cooking_fuel": ("infrastructure.cooking_fuel",),
+}
+
+INT_COLUMNS = {
+    "markets": "economy.markets",
+    "banks": "economy.banks",
+    "bank": "economy.bank",
+    "cooperatives": "economy.cooperatives",
+    "bumdes": "economy.bumdes",
+    "bts_count": "digital.bts_count",
+    "community_health": "health.jumlah_faskes_masyarakat",
+    "universities": "education.universities",
+}
+
+# The independence index is "Incomplete Data" (score 0) without these sections
+INDEX_SECTIONS = ("digital", "infrastructure", "economy")
+
+PERSONA_PROJECTION = {
+    "name": 1, "topography": 1, "ai_analysis": 1,
+    "economy": 1, "digital": 1, "infrastructure": 1,
+    "health.jumlah_faskes_masyarakat": 1, "education.universities": 1,
+}
+
+# Poskesdes + polindes in the village (the old rule counted posyandu, no longer imported)
+COMMUNITY_HEALTH_MIN = 2
+
+
+def _lookup(doc: Dict, path: str):
+    value = doc
+    for key in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(key)
+    return value
+
+
+def columns_from_documents(docs: Sequence[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Raw village documents (Mongo projection or Village.model_dump) -> columns.
+    Text columns are lower-cased except `name`; missing numbers are 0.
+    """
+    columns = {"_id": np.array([str(d.get("_id", d.get("id"))) for d in docs], dtype=object)}
+    for column, paths in TEXT_COLUMNS.items():
+        values = [next((v for v in (_lookup(d, p) for p in paths) if v), "") for d in docs]
+        text = np.array([str(v) for v in values], dtype=str) if docs else np.array([], dtype=str)
+        columns[column] = text if column == "name" else np.char.lower(text)
+    for column, path in INT_COLUMNS.items():
+        columns[column] = np.array([_lookup(d, path) or 0 for d in docs], dtype=np.int64)
+    columns["complete"] = np.array(
+        [all(d.get(section) for section in INDEX_SECTIONS) for d in docs], dtype=bool
+    )
+    return columns
+
+
+def _contains(column: np.ndarray, *needles: str) -> np.ndarray:
+    found = np.zeros(column.shape, dtype=bool)
+    for needle in needles:
+        found |= np.char.find(column, needle) >= 0
+    return found
+
+# ==========================================
+# RULES
+# ==========================================
+
+def index_features(c: Dict[str, np.ndarray]) -> List[ScoringFeatures]:
+    """
+    ScoringFeatures of every village, as far as the independence index needs
+    them (same text matching as scoring.extract_features).
+    """
+    signal = np.where(_contains(c["signal_strength"], SIGNAL_STRONG), 2, np.where(_contains(c["signal_strength"], SIGNAL_WEAK), 1, 0))
+    water = _contains(c["water"], *WATER_IMPROVED)
+    electricity = _contains(c["electricity"], ELECTRICITY_PLN)
+    fuel = _contains(c["cooking_fuel"], *FUEL_CLEAN)
+    banks = c["banks"] + c["bank"]
+    return [
+        ScoringFeatures(
+            has_health=False, doctors=0, midwives=0, puskesmas=0, infectious=0, has_disease=False,
+            has_education=False, sd=0, smp_sma=0, complete=complete, signal=sig, bts=bts,
+            water_improved=w, electricity_pln=e, fuel_clean=f, has_economy=complete, has_digital=complete,
+            markets=m, banks=b, cooperatives=co, bumdes=bu,
+        )
+        for complete, sig, bts, w, e, f, m, b, co, bu in zip(
+            c["complete"].tolist(), signal.tolist(), c["bts_count"].tolist(), water.tolist(),
+            electricity.tolist(), fuel.tolist(), c["markets"].tolist(), banks.tolist(),
+            c["cooperatives"].tolist(), c["bumdes"].tolist(),
+        )
+    ]
+
+
+def independence_scores(c: Dict[str, np.ndarray], scoring: Optional[CompiledScoring] = None) -> np.ndarray:
+    """
+    Independence index score for every village (unrounded, 0 when incomplete).
+    """
+    return np.array((scoring or active_scoring).evaluate(index_features(c)).score, dtype=float)
+
+
+def persona_columns(c: Dict[str, np.ndarray], scoring: Optional[CompiledScoring] = None) -> Dict[str, np.ndarray]:
+    """
+    Per-village rule outcomes: persona, narrative strength, income label, digital flag.
+    """
+    income = np.where(c["income"] == "", "umum", c["income"])
+    topography = np.where(c["topography"] == "", "dataran", c["topography"])
+
+    farming = _contains(income, "pertanian")
+    fishing = _contains(income, "perikanan")
+    identity = np.select(
+        [
+            farming & _contains(topography, "lereng", "puncak"),
+            farming,
+            _contains(income, "perkebunan"),
+            fishing & _contains(topography, "laut"),
+            fishing,
+            _contains(income, "perdagangan") | (c["markets"] > 0),
+            _contains(income, "industri"),
+        ],
+        [
+            "Agrowisata Pegunungan",
+            "Lumbung Pangan Lestari",
+            "Sentra Perkebunan Rakyat",
+            "Kampung Nelayan Modern",
+            "Minapolitan Darat",
+            "Simpul Perniagaan",
+            "Desa Kreatif-Produktif",
+        ],
+        default="Desa Mandiri",
+    )
+
+    digital = _contains(c["signal_type"], "4g", "5g")
+    grades = (scoring or active_scoring).evaluate(index_features(c)).grade
+    advanced = np.array([grade == "Maju" for grade in grades], dtype=bool)
+    modifier = np.select([digital & advanced, advanced, digital], ["Digital", "Unggulan", "Terkoneksi"], default="")
+    persona = np.char.strip(np.char.add(np.char.add(identity, " "), modifier))
+
+    strength = np.select(
+        [c["universities"] > 0, c["community_health"] >= COMMUNITY_HEALTH_MIN],
+        ["fokus pendidikan", "kepedulian kesehatan"],
+        default="semangat gotong royong",
+    )
+    return {"persona": persona, "strength": strength, "income": income, "topography": topography, "digital": digital}
+
+# ==========================================
+# INSIGHTS
+# ==========================================
+
+def build_insights(c: Dict[str, np.ndarray]) -> List[Dict]:
+    """
+    AIAnalysis fields for every village, in column order.
+    """
+    rules = persona_columns(c)
+    insights = []
+    for name, persona, strength, income, topography, digital in zip(
+        c["name"].tolist(), rules["persona"].tolist(), rules["strength"].tolist(),
+        rules["income"].tolist(), rules["topography"].tolist(), rules["digital"].tolist(),
+    ):
+        swot = {
+            "strengths": [f"Potensi {income} yang melimpah", "Modal sosial warga yang kuat"],
+            "weaknesses": ["Keterbatasan akses pasar global", "Perlu peningkatan infrastruktur"],
+            "opportunities": ["Digitalisasi produk desa", "Pengembangan ekowisata"],
+            "threats": ["Fluktuasi harga komoditas", "Perubahan iklim"],
+        }
+        if digital:
+            swot["strengths"].append("Konektivitas internet yang baik")
+            swot["opportunities"].append("Pemasaran online via marketplace")
+        else:
+            swot["weaknesses"].append("Sinyal komunikasi belum merata")
+
+        insights.append({
+            "persona": persona,
+            "social_capital_narrative": (
+                f"Masyarakat {name} yang terletak di wilayah {topography} memiliki {strength} yang kuat. "
+                f"Mereka bahu-membahu mengembangkan potensi {income} sebagai pilar ekonomi utama, "
+                f"menjadikan desa ini sebagai {persona} yang tangguh."
+            ),
+            "swot_analysis": swot,
+            "recommendations": {"recommendations": ["Optimalisasi BUMDes", "Pelatihan SDM"]},
+        })
+    return insights
+
+
+def generate_smart_persona(village) -> Dict:
+    """
+    Insights for a single Village (same rules as the batch engine).
+    """
+    return build_insights(columns_from_documents([village.model_dump()]))[0]
+
+
+def persona_counts(insights: Iterable[Dict]) -> Dict[str, int]:
+    counts: Dict[str, int] = {}
+    for item in insights:
+        counts[item["persona"]] = counts.get(item["persona"], 0) + 1
+    return dict(sorted(counts.items(), key=lambda kv: -kv[1]))
@@ -0,0 +1,323 @@
+import csv
+import hashlib
+import json
+import os
+from typing import Dict, Iterator
+
+from backend.models import (
+    Village, Health, Education, Economy, Infrastructure, Digital, Disaster, AIAnalysis, Disease, Criminal,
+    Social, Security, Sanitasi
+)
+
+# Default PODES extract shipped with the repo
+CSV_FILE_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data", "podes_dashboard_data.csv")
+
+# PODES wave of the shipped extract (its disaster columns refer to 2024)
+CURRENT_PODES_YEAR = int(os.getenv("PODES_YEAR", "2024"))
+
+def parse_int(value):
+    try:
+        return int(float(value)) if value else 0
+    except (ValueError, TypeError):
+        return 0
+
+def parse_decimal(value):
+    try:
+        return float(value) # MongoDB stores as double usually, or Decimal128 if mapped. Pydantic float is safer for now.
+    except (ValueError, TypeError):
+        return 0.0
+
+# ==========================================
+# MAPPING (single source for row_to_village and podes_columnar.py)
+# ==========================================
+
+class Int:
+    """Sum of one or more integer columns (parse_int: blank/invalid -> 0, truncated)."""
+    def __init__(self, *columns: str):
+        self.columns = columns
+
+class Text:
+    """Stripped string column (missing -> "")."""
+    def __init__(self, column: str):
+        self.column = column
+
+class Float:
+    """Float column (parse_decimal: invalid -> 0.0)."""
+    def __init__(self, column: str):
+        self.column = column
+
+
+VILLAGE_FIELDS = {
+    "id": Text('IDDESA'),
+    "name": Text('NAMA_DESA'),
+    "district": Text('NAMA_KEC'),
+    "latitude": Float('latitude'),
+    "longitude": Float('longitude'),
+    "topography": Text('Topografi sebagian besar wilayah desa/kelurahan'),
+    "forest_location": Text('Lokasi wilayah desa/kelurahan terhadap kawasan hutan/hutan:'),
+    "status": Text('Status pemerintahan desa/kelurahan (Desa/Kelurahan/UPT-SPT/Nagari)'),
+}
+
+SECTION_FIELDS = {
+    "health": {
+        "jumlah_rumah_sakit": Int('jumlah Rumah sakit', 'jumlah Rumah Sakit Bersalin'),
+        "jumlah_puskesmas": Int('jumlah Puskesmas dengan rawat inap', 'jumlah Puskesmas tanpa rawat inap', 'Jumlah Puskesmas Pembantu'),
+        "jumlah_klinik": Int('Jumlah poliklinik/balai pengobatan', 'Jumlah Rumah Bersalin'),
+        "jumlah_faskes_masyarakat": Int('Jumlah poskesdes', 'Jumlah polindes'),
+        "jumlah_farmasi": Int('Jumlah apotek', 'Jumlah toko jamu'),
+        "jumlah_dokter": Int('Jumlah Praktik Dokter', 'Jumlah dokter gigi spesialis yang tinggal/menetap di desa'),
+        "jumlah_bidan": Int('Jumlah Tempat Praktik Bidan', 'Jumlah bidan yang tinggal/menetap di desa'),
+        "jumlah_tenaga_kesehatan_lain": Int('Jumlah tenaga kesehatan lainnya (apoteker, perawat, tenaga gizi, dll.)'),
+    },
+    "education": {
+        "sd_negeri": Int('Jumlah sarana pendidikan negeri didesa : SD'),
+        "sd_swasta": Int('Jumlah sarana pendidikan swasta didesa : SD'),
+        "mi_negeri": Int('Jumlah sarana pendidikan negeri didesa: MI'),
+        "mi_swasta": Int('Jumlah sarana pendidikan swasta didesa: MI'),
+        "smp_negeri": Int('Jumlah sarana pendidikan negeri didesa: SMP'),
+        "smp_swasta": Int('Jumlah sarana pendidikan swasta didesa: SMP'),
+        "mts_negeri": Int('Jumlah sarana pendidikan negeri didesa: MTS'),
+        "mts_swasta": Int('Jumlah sarana pendidikan swasta didesa: MTS'),
+        "sma_negeri": Int('Jumlah sarana pendidikan negeri didesa: SMA'),
+        "sma_swasta": Int('Jumlah sarana pendidikan swasta didesa: SMA'),
+        "ma_negeri": Int('Jumlah sarana pendidikan negeri didesa: MA'),
+        "ma_swasta": Int('Jumlah sarana pendidikan swasta didesa: MA'),
+        "smk_negeri": Int('Jumlah sarana pendidikan negeri didesa: SMK'),
+        "smk_swasta": Int('Jumlah sarana pendidikan swasta didesa: SMK'),
+        "universities_negeri": Int('Jumlah sarana pendidikan negeri didesa: Perguruan Tinggi'),
+        "universities_swasta": Int('Jumlah sarana pendidikan swasta didesa: Perguruan Tinggi'),
+    },
+    "economy": {
+        "primary_income": Text('Sumber penghasilan utama sebagian besar penduduk desa/kelurahan berasal dari lapangan usaha:'),
+        "markets": Int('Jumlah pasar dengan bangunan permanen', 'Jumlah pasar dengan bangunan semi permanen', 'Jumlah pasar tanpa bangunan'),
+        "cooperatives": Int(
+            'Jumlah Koperasi Unit Desa (KUD) di desa/kelurahan yang masih aktif',
+            'Jumlah Koperasi Industri Kecil dan Kerajinan Rakyat (Kopinkra)/Usaha mikro di desa/kelurahan yang masih aktif',
+            'Jumlah Koperasi Simpan Pinjam (KSP) di desa/kelurahan yang masih aktif',
+            'Jumlah Koperasi lainnya di desa/kelurahan yang masih aktif',
+        ),
+        "bumdes": Int('Jumlah unit usaha BUMDes'),
+        "grocery": Int('Jumlah toko/warung kelontong'),
+        "eatery": Int('Jumlah warung/kedai makanan minuman'),
+        "restaurant": Int('Jumlah restoran/rumah makan'),
+        "supermarket": Int('Jumlah minimarket/swalayan/supermarket'),
+        "hotels": Int('Jumlah penginapan (hostel/motel/losmen/wisma)'),
+        "bank": Int('Keberadaan sarana penunjang ekonomi Agen Bank'),
+        "non_metallic_mining_industry": Int('Jumlah industri barang galian bukan logam/industri gerabah/keramik/batu bata (ggenteng, batu bata, porselin, tegel, keramik, kaca patri, cangkir, guci, dll)'),
+        "paper_and_pulp_industry": Int('Jumlah industri kertas dan barang dari kertas (kantong kertas, post card, kardus, rak semen)'),
+        "printing_industry": Int('Jumlah industri percetakan dan reproduksi media rekaman (buku, brosur, kartu nama, kalender, spanduk, dll)'),
+    },
+    "infrastructure": {
+        "State_electricity_company": Int('Jumlah keluarga pengguna listrik PLN'),
+        "Non_state_electricity_company": Int('Jumlah keluarga pengguna listrik NON-PLN'),
+        "non_electricity": Int('Jumlah keluarga bukan pengguna listrik'),
+        "rural_solar_street_lights": Text('Penerangan jalan desa dengan lampu tenaga surya'),
+        "rural_main_street_lights": Text('Penerangan di jalan utama desa/kelurahan'),
+        "water_drink_source": Text('Sumber air minum sebagian besar keluarga'),
+        "cooking_fuel": Text('Bahan bakar memasak sebagian besar keluarga'),
+    },
+    "digital": {
+        "signal_strength": Text('Sinyal telepon seluler/handphone di sebagian besar wilayah desa/kelurahan (sinyal sangat kuat, sinyal kuat, sinyal lemah, tidak ada sinyal)'),
+        "signal_type": Text('Jenis_sinyal_internet'),
+        "bts_count": Int('Jumlah menara telepon seluler atau Base Transceiver Station (BTS)'),
+        "village_information_system": Text('Keberadaan sistem informasi desa'),
+    },
+    "disaster": {
+        "drought_exist": Text('kekeringan (kejadian bencana alam)'),
+        "drought_victim": Int('Kekeringan (jumlah korban meninggal tahun 2024)'),
+        "flood_exist": Text('Banjir(kejadian bencana alam)'),
+        "flood_victim": Int('Banjir (jumlah korban meninggal tahun 2024)'),
+        "landslide_exist": Text('Tanah longsor (kejadian bencana alam)'),
+        "landslide_victim": Int('Tanah longsor (jumlah korban meninggal tahun 2024)'),
+        "sea_waves_exist": Text('Gelombang air laut (kejadian bencana alam)'),
+        "sea_waves_victim": Int('Gelombang air laut (jumlah korban meninggal tahun 2024)'),
+        "hurricane_exist": Text('topan (kejadian bencana alam)'),
+        "hurricane_victim": Int('topan (jumlah korban meninggal tahun 2024)'),
+        "earthquake_exist": Text('gempa bumi (kejadian bencana alam)'),
+        "earthquake_victim": Int('gempa bumi (jumlah korban meninggal tahun 2024)'),
+        "flash_flood_exist": Text('Banjir Bandang (kejadian bencana alam)'),
+        "flash_flood_victim": Int('Banjir Bandang (jumlah korban meninggal tahun 2024)'),
+        "tsunami_exist": Text('tsunami (kejadian bencana alam)'),
+        "tsunami_victim": Int('tsunami (jumlah korban meninggal tahun 2024)'),
+        "volcanic_eruption_exist": Text('gunung meletus (kejadian bencana alam)'),
+        "volcanic_eruption_victim": Int('gunung meletus (jumlah korban meninggal tahun 2024)'),
+        "warning_system": Text('Keberadaan sistem peringatan dini bencana alam'),
+    },
+    "disease": {
+        "muntaber_cases": Int('Jumlah penderita Muntaber selama setahun terakhir'),
+        "muntaber_deaths": Int('Jumlah penderita meninggal Muntaber selama setahun terakhir'),
+        "dbd_cases": Int('Jumlah penderita Demam Berdarah selama setahun terakhir'),
+        "dbd_deaths": Int('Jumlah penderita meninggal Demam Berdarah selama setahun terakhir'),
+        "campak_cases": Int('Jumlah penderita Campak selama setahun terakhir'),
+        "campak_deaths": Int('Jumlah penderita meninggal Campak selama setahun terakhir'),
+        "malaria_cases": Int('Jumlah penderita Malaria selama setahun terakhir'),
+        "malaria_deaths": Int('Jumlah penderita meninggal Malaria selama setahun terakhir'),
+        "sars_cases": Int('Jumlah penderita SARS/Flu Burung selama setahun terakhir'),
+        "sars_deaths": Int('Jumlah penderita meninggal SARS/Flu Burung selama setahun terakhir'),
+        "hepatitis_e_cases": Int('Jumlah penderita Hepatitis E selama setahun terakhir'),
+        "hepatitis_e_deaths": Int('Jumlah penderita meninggal Hepatitis E selama setahun terakhir'),
+        "difteri_cases": Int('Jumlah penderita Difteri selama setahun terakhir'),
+        "difteri_deaths": Int('Jumlah penderita meninggal Difteri selama setahun terakhir'),
+        "covid_cases": Int('Jumlah penderita COVID-19 selama setahun terakhir'),
+        "covid_deaths": Int('Jumlah penderita meninggal COVID-19 selama setahun terakhir'),
+        "disability_population": Int(
+            'Jumlah penyandang tuna netra (buta)',
+            'Jumlah penyandang tuna rungu (tuli)',
+            'Jumlah penyandang tuna wicara (bisu)',
+            'Jumlah penyandang tuna rungu-wicara (tuli-bisu)',
+            'Jumlah penyandang tuna daksa (disabilitas tubuh) : kelumpuhan/kelainan/ketidaklengkapan anggota gerak',
+            'Jumlah penyandang tuna grahita (keterbelakangan mental)',
+            'Jumlah penyandang tuna laras (eks-sakit jiwa, mengalami hambatan/gangguan dalam mengendalikan emosi dan kontrol sosial)',
+            'Jumlah penyandang tuna eks-sakit kusta : pernah mengalami sakit kusta dan telah dinyatakan sembuh oleh dokter',
+            'Jumlah penyandang tuna ganda (fisik-mental): fisik(buta, tuli, bisu, bisu-tuli atau tubuh) dan mental (tunagrahita atau tunalaras)',
+        ),
+    },
+    "criminal": {
+        "suicide_count_man": Int('Jumlah korban bunuh diri (termasuk percobaan bunuh diri) selama setahun terakhir - laki-laki'),
+        "suicide_count_woman": Int('Jumlah korban bunuh diri (termasuk percobaan bunuh diri) selama setahun terakhir - perempuan'),
+        "murderer_case_man": Int('Jumlah pembunuhan selama setahun terakhir - laki-laki'),
+        "murderer_case_woman": Int('Jumlah pembunuhan selama setahun terakhir - perempuan'),
+    },
+    "social": {
+        "religion": Int('Agama/kepercayaan utama yang dianut olwh sebagian besar warga di desa/kelurahan'),
+        "mosque": Int('Jumlah tempat ibadah di desa/kelurahan - masjid'),
+        "musala": Int('Jumlah tempat ibadah di desa/kelurahan - surau/langgar/musala'),
+        "church_christian": Int('Jumlah tempat ibadah di desa/kelurahan - gereja Kristen'),
+        "church_catholic": Int('Jumlah tempat ibadah di desa/kelurahan - gereja Katolik'),
+        "migran_man": Int('Jumlah warga laki laki desa/kelurahan yang sedang bekerja sebagai Pekerja Migran Indonesia/TKI '),
+        "migran_woman": Int('Jumlah warga perempuan desa/kelurahan yang sedang bekerja sebagai Pekerja Migran Indonesia/TKI '),
+        "pub": Text('Keberadaan pub/diskotek/tempat karaoke yang masih berfungsi di desa/kelurahan'),
+    },
+    "security": {
+        "maintenance": Text('Pembangunan/pemeliharaan pos keamanan lingkungan'),
+        "security_group": Text('Pembentukan/pengaturan regu keamanan'),
+        "pelaporan": Text('Pelaporan tamu menginap >24 jam ke aparat'),
+        "security_system": Text('Pengaktifan sistem keamanan lingkungan oleh warga'),
+        "linmas": Int('Jumlah anggota linmas/hansip'),
+    },
+    "sanitasi": {
+        "sampah": Text('Tempat buang sampah sebagian besar keluarga'),
+        "tiga_r": Text('Keberadaan TPS3R (Reduce, Reuse, Recycle)'),
+        "bank_sampah": Text('Keberadaan bank sampah di desa/kelurahan'),
+        "pemilahan": Text('Pemilahan sampah membusuk dan sampah kering'),
+        "toilet": Text('Penggunaan fasilitas buang air besar sebagian besar keluarga'),
+        "limbah_cair": Text('Saluran pembuangan limbah cair dari air mandi/cuci Sebagian besar keluarga'),
+        "slum": Text('Keberadaan permukiman kumuh di desa/kelurahan'),
+        "pencemaran_air": Text('Jenis pencemaran lingkungan hidup - Air'),
+        "pencemaran_udara": Text('Jenis pencemaran lingkungan hidup - Udara'),
+        "pencemaran_lingkungan": Text('Jenis pencemaran lingkungan hidup - Tanah'),
+    },
+}
+
+SECTION_MODELS = {
+    "health": Health, "education": Education, "economy": Economy, "infrastructure": Infrastructure,
+    "digital": Digital, "disaster": Disaster, "disease": Disease, "criminal": Criminal,
+    "social": Social, "security": Security, "sanitasi": Sanitasi,
+}
+
+# Disease label per *_cases column; ties go to the first one listed
+MOST_CASES_LABELS = [
+    ("muntaber_cases", 'Muntaber'), ("dbd_cases", 'Demam Berdarah'), ("campak_cases", 'Campak'),
+    ("malaria_cases", 'Malaria'), ("sars_cases", 'SARS/Flu Burung'), ("hepatitis_e_cases", 'Hepatitis E'),
+    ("difteri_cases", 'Difteri'), ("covid_cases", 'COVID-19'),
+]
+
+
+# Fields computed from the mapped fields of the same section
+class Sum:
+    """Sum of other fields of the section."""
+    def __init__(self, *fields: str):
+        self.fields = fields
+
+class Greater:
+    """`if_true` where field `a` > field `b`, else `if_false`."""
+    def __init__(self, a: str, b: str, if_true: str, if_false: str):
+        self.a, self.b, self.if_true, self.if_false = a, b, if_true, if_false
+
+class Argmax:
+    """Label of the largest of several fields (the first one on ties)."""
+    def __init__(self, labels):
+        self.labels = labels
+
+
+DERIVED_FIELDS = {
+    "health": {
+        "total_fasilitas_kesehatan": Sum("jumlah_rumah_sakit", "jumlah_puskesmas", "jumlah_klinik",
+                                         "jumlah_faskes_masyarakat", "jumlah_farmasi"),
+        "total_tenaga_kesehatan": Sum("jumlah_dokter", "jumlah_bidan", "jumlah_tenaga_kesehatan_lain"),
+    },
+    "education": {
+        "sd_counts": Sum("sd_negeri", "sd_swasta", "mi_negeri", "mi_swasta"),
+        "smp_counts": Sum("smp_negeri", "smp_swasta", "mts_negeri", "mts_swasta"),
+        "sma_counts": Sum("sma_negeri", "sma_swasta", "ma_negeri", "ma_swasta"),
+        "smk_counts": Sum("smk_negeri", "smk_swasta"),
+        "universities": Sum("universities_negeri", "universities_swasta"),
+    },
+    "infrastructure": {
+        "electricity_source": Greater("State_electricity_company", "Non_state_electricity_company", "PLN", "Non-PLN"),
+    },
+    "disease": {
+        "infectious_cases": Sum(*(f for f, _ in MOST_CASES_LABELS)),
+        "infectious_deaths": Sum(*(f.replace("_cases", "_deaths") for f, _ in MOST_CASES_LABELS)),
+        "most_cases_disease": Argmax(MOST_CASES_LABELS),
+    },
+}
+
+# ==========================================
+# ROW CONVERSION
+# ==========================================
+
+def row_value(row: Dict[str, str], spec):
+    if isinstance(spec, Text):
+        return (row.get(spec.column) or '').strip()
+    if isinstance(spec, Float):
+        return parse_decimal(row.get(spec.column, 0))
+    return sum(parse_int(row.get(column, 0)) for column in spec.columns)
+
+def derived_value(values: Dict, spec):
+    if isinstance(spec, Sum):
+        return sum(values[f] for f in spec.fields)
+    if isinstance(spec, Greater):
+        return spec.if_true if values[spec.a] > values[spec.b] else spec.if_false
+    # max() keeps the first of equal values
+    return max(spec.labels, key=lambda item: values[item[0]])[1]
+
+def row_to_village(row: Dict[str, str]) -> Village:
+    """
+    Maps one PODES CSV row (BPS column names) onto a Village document,
+    following VILLAGE_FIELDS / SECTION_FIELDS / DERIVED_FIELDS.
+    Shared by scripts/import_csv_to_mongo.py and the embedded storage backend.
+    """
+    fields = {name: row_value(row, spec) for name, spec in VILLAGE_FIELDS.items()}
+    for section, specs in SECTION_FIELDS.items():
+        values = {name: row_value(row, spec) for name, spec in specs.items()}
+        for name, spec in DERIVED_FIELDS.get(section, {}).items():
+            values[name] = derived_value(values, spec)
+        fields[section] = SECTION_MODELS[section](**values)
+
+    village = Village(**fields, ai_analysis=AIAnalysis())
+    village.content_hash = compute_content_hash(village)
+    return village
+
+# Not part of the PODES content: written by other processes or bookkeeping
+HASH_EXCLUDED_FIELDS = {"ai_analysis", "updated_at", "content_hash", "revision_id", "podes_years"}
+
+def compute_content_hash(village: Village) -> str:
+    """
+    Stable SHA-256 of the mapped document (canonical JSON, sorted keys).
+    Identical CSV rows always hash the same, across runs and machines.
+    """
+    return compute_document_hash(village.model_dump(by_alias=True))
+
+def compute_document_hash(doc: Dict) -> str:
+    """
+    Same hash from a raw document (Village.model_dump(by_alias=True) shape).
+    """
+    content = {k: v for k, v in doc.items() if k not in HASH_EXCLUDED_FIELDS}
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+def read_villages(csv_path: str = CSV_FILE_PATH) -> Iterator[Village]:
+    with open(csv_path, mode='r', encoding='utf-8') as csvfile:
+        for row in csv.DictReader(csvfile):
+            yield row_to_village(row)
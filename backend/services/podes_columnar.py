@@ -0,0 +1,125 @@
+"""
+Columnar PODES mapping for national-scale files.
+
+`row_to_village` (podes.py) maps one CSV row at a time through pydantic. This
+module applies the same declarative mapping (podes.VILLAGE_FIELDS,
+SECTION_FIELDS and DERIVED_FIELDS) to whole columns with pandas/numpy and
+emits plain Mongo documents, ready for a bulk writer. Both paths produce the
+same `content_hash` for the same row (tests/test_podes_columnar.py).
+
+pandas (and optionally pyarrow, for the CSV reader) are only needed here;
+the API itself never imports this module.
+"""
+import time
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+from backend.services.podes import (
+    DERIVED_FIELDS, SECTION_FIELDS, SECTION_MODELS, VILLAGE_FIELDS, Float, Greater, Sum, Text,
+    compute_document_hash,
+)
+
+try:
+    import pyarrow  # noqa: F401
+    CSV_ENGINE = "pyarrow"
+except ImportError:
+    CSV_ENGINE = "c"
+
+# ==========================================
+# VECTORIZED CONVERSIONS
+# ==========================================
+
+def read_frame(csv_path: str) -> pd.DataFrame:
+    """
+    Whole CSV as strings; blanks stay "" (conversions decide what they mean).
+    """
+    return pd.read_csv(csv_path, dtype=str, keep_default_na=False, engine=CSV_ENGINE)
+
+def _column(frame: pd.DataFrame, name: str) -> pd.Series:
+    if name in frame.columns:
+        return frame[name].str.strip()
+    return pd.Series("", index=frame.index)
+
+def _numbers(frame: pd.DataFrame, name: str) -> np.ndarray:
+    values = pd.to_numeric(_column(frame, name), errors="coerce").to_numpy(dtype="float64")
+    return np.nan_to_num(values, nan=0.0, posinf=0.0, neginf=0.0)
+
+def convert(frame: pd.DataFrame, spec):
+    if isinstance(spec, Text):
+        return _column(frame, spec.column).to_numpy(dtype=object)
+    if isinstance(spec, Float):
+        return _numbers(frame, spec.column)
+    return sum(np.trunc(_numbers(frame, col)).astype("int64") for col in spec.columns)
+
+def derive(columns: Dict, spec):
+    if isinstance(spec, Sum):
+        return sum(columns[f] for f in spec.fields)
+    if isinstance(spec, Greater):
+        return np.where(columns[spec.a] > columns[spec.b], spec.if_true, spec.if_false).astype(object)
+    # argmax returns the first maximum, like max() in podes.derived_value
+    labels = np.array([label for _, label in spec.labels], dtype=object)
+    return labels[np.column_stack([columns[f] for f, _ in spec.labels]).argmax(axis=1)]
+
+def map_frame(frame: pd.DataFrame) -> Tuple[Dict, Dict[str, Dict]]:
+    """
+    Applies the mapping: (top-level columns, {section: {field: column}}).
+    """
+    top = {"_id" if field == "id" else field: convert(frame, spec) for field, spec in VILLAGE_FIELDS.items()}
+    sections = {}
+    for section, fields in SECTION_FIELDS.items():
+        columns = {field: convert(frame, spec) for field, spec in fields.items()}
+        for field, spec in DERIVED_FIELDS.get(section, {}).items():
+            columns[field] = derive(columns, spec)
+        sections[section] = columns
+    return top, sections
+
+def _records(columns: Dict, defaults: Dict = None) -> List[Dict]:
+    # tolist() turns numpy scalars into plain int/float/str
+    names = list(columns)
+    defaults = defaults or {}
+    return [{**defaults, **dict(zip(names, values))} for values in zip(*(columns[n].tolist() for n in names))]
+
+def build_documents(top: Dict, sections: Dict[str, Dict]) -> List[Dict]:
+    """
+    Mongo documents shaped like Village.model_dump(by_alias=True), with
+    content_hash filled in. updated_at / ai_analysis are left to the writer.
+    """
+    lat, lon = top["latitude"], top["longitude"]
+    has_location = ((lat != 0) | (lon != 0)) & (lat >= -90) & (lat <= 90) & (lon >= -180) & (lon <= 180)
+
+    rows = _records(top)
+    # Model defaults first, so unmapped fields match what pydantic would dump
+    section_rows = {
+        name: _records(columns, SECTION_MODELS[name]().model_dump())
+        for name, columns in sections.items()
+    }
+    for i, doc in enumerate(rows):
+        doc["location"] = {"type": "Point", "coordinates": [doc["longitude"], doc["latitude"]]} if has_location[i] else None
+        for name, records in section_rows.items():
+            doc[name] = records[i]
+        doc["content_hash"] = compute_document_hash(doc)
+    return rows
+
+# ==========================================
+# PIPELINE STAGE (one file, runs in a worker process)
+# ==========================================
+
+def map_file(csv_path: str) -> Tuple[str, List[Dict], Dict[str, float]]:
+    """
+    Reads and maps one PODES file. Returns (path, documents, stage timings in seconds).
+    """
+    timings = {}
+    t0 = time.perf_counter()
+    frame = read_frame(csv_path)
+    timings["read"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    top, sections = map_frame(frame)
+    timings["map"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    documents = build_documents(top, sections)
+    timings["build"] = time.perf_counter() - t0
+    return csv_path, documents, timings
@@ -0,0 +1,244 @@
+import math
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from backend.services.scoring import ScoringFeatures, active_scoring, extract_features, snapshot_features
+
+# ==========================================
+# METRICS
+# ==========================================
+
+# name -> (label, value(scoring features)); None = not ranked (no data)
+METRICS: Dict[str, Tuple[str, Callable[[ScoringFeatures], Optional[float]]]] = {
+    "independence_score": ("Independence index",
+                           lambda f: round(active_scoring.score(f), 2) if f.complete else None),
+    "health_supply": ("Health supply (weighted staff and facilities)",
+                      lambda f: float(int(active_scoring.supply(f))) if f.has_health else None),
+    "doctors": ("Doctors", lambda f: float(f.doctors) if f.has_health else None),
+    "infectious_cases": ("Infectious disease cases", lambda f: float(f.infectious) if f.has_disease else None),
+    "education_ratio": ("(SMP + SMA) / SD ratio",
+                        lambda f: active_scoring.education_funnel(f)["ratio"] if f.has_education else None),
+    "bumdes": ("BUMDes", lambda f: float(f.bumdes) if f.has_economy else None),
+    "markets": ("Markets", lambda f: float(f.markets) if f.has_economy else None),
+    "cooperatives": ("Cooperatives", lambda f: float(f.cooperatives) if f.has_economy else None),
+    "bts_count": ("BTS towers", lambda f: float(f.bts) if f.has_digital else None),
+}
+METRIC_NAMES = tuple(METRICS)
+QUANTILES = (25, 50, 75, 90, 99)
+
+_VALUES = tuple(value for _, value in METRICS.values())
+
+
+def metric_values(features: ScoringFeatures) -> Tuple[Optional[float], ...]:
+    return tuple([value(features) for value in _VALUES])
+
+# ==========================================
+# SORTED ARRAYS
+# ==========================================
+
+class _Ranking:
+    """
+    Villages of one metric (and scope) sorted by value, highest first: `keys`
+    holds the negated values (ascending, so bisect works), `ids` the village
+    ids in the same order, ties by id. Upserts are a bisect plus an insert.
+    """
+
+    __slots__ = ("keys", "ids")
+
+    def __init__(self):
+        self.keys = array("d")
+        self.ids: List[str] = []
+
+    @classmethod
+    def build(cls, keys: List[Optional[float]], ids: List[str], positions: Iterable[int]) -> "_Ranking":
+        """
+        Ranking of `positions` (ascending by id) in the columns `keys` / `ids`.
+        Sorting positions rather than tuples keeps ties in id order.
+        """
+        ranked = [p for p in positions if keys[p] is not None]
+        ranked.sort(key=keys.__getitem__)
+        ranking = cls()
+        ranking.keys = array("d", [keys[p] for p in ranked])
+        ranking.ids = [ids[p] for p in ranked]
+        return ranking
+
+    def __len__(self):
+        return len(self.ids)
+
+    def _slot(self, key: float, village_id: str) -> int:
+        lo, hi = bisect_left(self.keys, key), bisect_right(self.keys, key)
+        return bisect_left(self.ids, village_id, lo, hi)
+
+    def insert(self, key: float, village_id: str):
+        i = self._slot(key, village_id)
+        self.keys.insert(i, key)
+        self.ids.insert(i, village_id)
+
+    def remove(self, key: float, village_id: str):
+        i = self._slot(key, village_id)
+        if i < len(self.ids) and self.ids[i] == village_id:
+            del self.keys[i]
+            del self.ids[i]
+
+    def rank(self, key: float) -> int:
+        # Competition rank: 1 + villages with a strictly higher value
+        return bisect_left(self.keys, key) + 1
+
+    def percentile(self, key: float) -> float:
+        # Share of villages with the same or a lower value
+        n = len(self.ids)
+        return round(100.0 * (n - self.rank(key) + 1) / n, 1)
+
+    def quantile(self, q: float) -> float:
+        # Nearest-rank value at the q-th percentile (ascending)
+        n = len(self.ids)
+        k = max(1, math.ceil(q / 100 * n))
+        return -self.keys[n - k]
+
+# ==========================================
+# INDEX
+# ==========================================
+
+class RankingIndex:
+    """
+    Precomputed rankings of every village per metric, region-wide and per
+    district, answering top-k, rank and percentile queries in O(log n + k).
+
+    - a full load sorts each metric once (region-wide),
+    - `sync(snapshot)` re-slots only the villages in snapshot.changed_ids,
+    - district rankings are built from the district's members on first use
+      and dropped when one of them changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # village_id -> (name, district, metric values)
+        self._rows: Dict[str, Tuple[str, str, Tuple[Optional[float], ...]]] = {}
+        self._members: Dict[str, set] = {}
+        self._region: Dict[str, _Ranking] = {m: _Ranking() for m in METRIC_NAMES}
+        self._districts: Dict[Tuple[str, str], _Ranking] = {}
+
+    def __len__(self):
+        return len(self._rows)
+
+    # ---------- maintenance ----------
+
+    def _rebuild(self, snapshot):
+        villages = snapshot.villages  # sorted by id
+        ids = [v.id for v in villages]
+        values = [metric_values(f) for f in snapshot_features(snapshot)]
+        region = {}
+        for m, metric in enumerate(METRIC_NAMES):
+            keys = [None if row[m] is None else -row[m] for row in values]
+            region[metric] = _Ranking.build(keys, ids, range(len(ids)))
+        rows = {v.id: (v.name, v.district, row) for v, row in zip(villages, values)}
+        members = {d: set(district_ids) for d, district_ids in snapshot.by_district.items()}
+        with self._lock:
+            self._rows, self._members, self._region, self._districts = rows, members, region, {}
+
+    def _reslot(self, village_id: str, district: str, values, insert: bool):
+        for metric, value in zip(METRIC_NAMES, values):
+            if value is not None:
+                ranking = self._region[metric]
+                (ranking.insert if insert else ranking.remove)(-value, village_id)
+            self._districts.pop((metric, district), None)
+
+    def sync(self, snapshot) -> int:
+        """
+        Brings the rankings in line with a VillageSnapshot; returns the number
+        of villages re-ranked. Uses snapshot.changed_ids when set.
+        """
+        if snapshot.changed_ids is None:
+            self._rebuild(snapshot)
+            return len(self._rows)
+
+        changed = 0
+        with self._lock:
+            for village_id in snapshot.changed_ids:
+                village = snapshot.get(village_id)
+                row = (village.name, village.district, metric_values(extract_features(village))) if village else None
+                old = self._rows.get(village_id)
+                if old == row:
+                    continue
+                if old is not None:
+                    self._reslot(village_id, old[1], old[2], insert=False)
+                    self._members[old[1]].discard(village_id)
+                    del self._rows[village_id]
+                if row is not None:
+                    self._reslot(village_id, row[1], row[2], insert=True)
+                    self._members.setdefault(row[1], set()).add(village_id)
+                    self._rows[village_id] = row
+                changed += 1
+        return changed
+
+    # ---------- querying ----------
+
+    def _ranking(self, metric: str, district: Optional[str]) -> _Ranking:
+        if metric not in self._region:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {METRIC_NAMES})")
+        if not district:
+            return self._region[metric]
+        ranking = self._districts.get((metric, district))
+        if ranking is None:
+            m = METRIC_NAMES.index(metric)
+            ids = sorted(self._members.get(district, ()))
+            keys = [None if self._rows[i][2][m] is None else -self._rows[i][2][m] for i in ids]
+            ranking = self._districts[(metric, district)] = _Ranking.build(keys, ids, range(len(ids)))
+        return ranking
+
+    def top(self, metric: str, k: int = 10, district: Optional[str] = None) -> List[Dict]:
+        with self._lock:
+            ranking = self._ranking(metric, district)
+            entries = []
+            for key, village_id in zip(ranking.keys[:k], ranking.ids[:k]):
+                name, village_district, _ = self._rows[village_id]
+                entries.append({"rank": ranking.rank(key), "id": village_id, "name": name,
+                                "district": village_district, "value": -key})
+            return entries
+
+    def summary(self, metric: str, district: Optional[str] = None) -> Dict:
+        with self._lock:
+            ranking = self._ranking(metric, district)
+            quantiles = {f"p{q}": ranking.quantile(q) for q in QUANTILES} if len(ranking) else {}
+            return {"ranked": len(ranking), "quantiles": quantiles}
+
+    def position(self, metric: str, village_id: str) -> Optional[Dict]:
+        """
+        Rank and percentile of one village, region-wide and in its district
+        (None when the village has no value for the metric).
+        """
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric '{metric}' (expected one of {METRIC_NAMES})")
+        with self._lock:
+            row = self._rows.get(village_id)
+            value = row[2][METRIC_NAMES.index(metric)] if row else None
+            return self._position(metric, row[1], value) if value is not None else None
+
+    def _position(self, metric: str, district: str, value: float) -> Dict:
+        region, local = self._region[metric], self._ranking(metric, district)
+        return {
+            "value": value,
+            "rank": region.rank(-value),
+            "of": len(region),
+            "percentile": region.percentile(-value),
+            "district_rank": local.rank(-value),
+            "district_of": len(local),
+            "district_percentile": local.percentile(-value),
+        }
+
+    def positions(self, village_id: str) -> Dict[str, Dict]:
+        """
+        position() for every metric the village has a value for.
+        """
+        with self._lock:
+            row = self._rows.get(village_id)
+            if row is None:
+                return {}
+            return {metric: self._position(metric, row[1], value)
+                    for metric, value in zip(METRIC_NAMES, row[2]) if value is not None}
+
+
+# Singleton instance
+ranking_index = RankingIndex()
@@ -0,0 +1,100 @@
+import asyncio
+import re
+import time
+from typing import Optional
+
+# ==========================================
+# ERRORS
+# ==========================================
+
+class RateLimited(Exception):
+    """
+    The model API answered 429 / RESOURCE_EXHAUSTED.
+    `retry_after` is the server's hint in seconds, when it gave one.
+    """
+
+    def __init__(self, message: str = "rate limited", retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+_RETRY_DELAY = re.compile(r"retryDelay['\"]?\s*[:=]\s*['\"]?(\d+(?:\.\d+)?)s")
+
+def parse_retry_after(error: Exception) -> Optional[float]:
+    """
+    Retry hint of an API error: the Retry-After header, or the RetryInfo
+    retryDelay ("37s") that Gemini puts in the error details.
+    """
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    value = headers.get("retry-after") or headers.get("Retry-After")
+    if value:
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+    match = _RETRY_DELAY.search(str(getattr(error, "details", None) or error))
+    return float(match.group(1)) if match else None
+
+def is_rate_limit_error(error: Exception) -> bool:
+    code = getattr(error, "code", None) or getattr(error, "status_code", None)
+    return code == 429 or "RESOURCE_EXHAUSTED" in str(getattr(error, "status", "") or error)
+
+# ==========================================
+# TOKEN BUCKET
+# ==========================================
+
+class TokenBucket:
+    """
+    Async token bucket with additive-increase / multiplicative-decrease:
+    every 429 halves the rate (and pauses all callers for Retry-After),
+    every `recover_after` successes give back `rate_step` requests/s,
+    never above the configured `max_rate`.
+    """
+
+    def __init__(self, rate: float, burst: int = 1, min_rate: float = 0.05,
+                 rate_step: float = 0.1, recover_after: int = 20):
+        self.max_rate = rate
+        self.rate = rate
+        self.min_rate = min(min_rate, rate)
+        self.burst = max(1, burst)
+        self.rate_step = rate_step
+        self.recover_after = recover_after
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        self.successes = 0
+        self.throttled = 0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + max(0.0, now - self.updated) * self.rate)
+        self.updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+    def on_success(self):
+        self.successes += 1
+        if self.successes >= self.recover_after and self.rate < self.max_rate:
+            self.rate = min(self.max_rate, self.rate + self.rate_step)
+            self.successes = 0
+
+    def on_throttle(self, retry_after: Optional[float] = None):
+        self.throttled += 1
+        self.successes = 0
+        self.rate = max(self.min_rate, self.rate / 2)
+        self.tokens = 0.0
+        pause = retry_after if retry_after is not None else 1 / self.rate
+        self.paused_until = max(self.paused_until, time.monotonic() + pause)
+        # Tokens accrue from the end of the pause, not across it
+        self.updated = self.paused_until
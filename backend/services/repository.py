@@ -0,0 +1,417 @@
+import asyncio
+import bisect
+import math
+import os
+import time
+from array import array
+from datetime import datetime
+from types import MappingProxyType
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from backend.models import Village, AIAnalysis
+from backend.services.geofencing import haversine
+
+# Seconds between cheap version checks. Requests never wait on them:
+# a due check runs in the background while the current snapshot is served.
+REFRESH_INTERVAL = float(os.getenv("REPOSITORY_REFRESH_SECONDS", "30"))
+
+# Grid cell size (degrees) for the nearest-centroid lookup, ~5.5 km
+GRID_CELL_DEG = 0.05
+MAX_GRID_RINGS = 20
+
+# Seconds refresh_soon() waits so that writes landing together share one refresh
+REFRESH_BATCH_WINDOW = 0.05
+
+# Fields written by AI jobs; changing only these leaves the indicator data as is
+AI_FIELDS = ("ai_analysis", "updated_at")
+
+
+# ==========================================
+# SNAPSHOT
+# ==========================================
+
+class VillageSnapshot:
+    """
+    Immutable view of every village at one data version.
+
+    Built once per version and shared by all requests; derived artefacts
+    (macro payload, search rows, ...) are memoized on the snapshot so they
+    are computed at most once per version. A memo entry registered with a
+    `patch` is carried over to the snapshots `with_changes` derives from it.
+    """
+
+    __slots__ = ("version", "loaded_at", "villages", "by_id", "by_district", "changed_ids",
+                 "data_changed_ids", "same_positions", "_lat", "_lon", "_grid", "_memo", "_patches")
+
+    def __init__(self, villages: Iterable[Village], version: Tuple,
+                 changed_ids: Optional[frozenset] = None):
+        self._set_villages(tuple(sorted(villages, key=lambda v: v.id)), version, changed_ids)
+        self._index_districts()
+        self._index_locations()
+        # After a full load nothing is known about what changed
+        self.data_changed_ids = changed_ids
+        self.same_positions = False
+
+    def _set_villages(self, ordered: Tuple[Village, ...], version: Tuple, changed_ids: Optional[frozenset],
+                      by_id: Optional[Dict[str, Village]] = None):
+        self.version = version
+        self.loaded_at = time.time()
+        self.villages = ordered
+        self.by_id: Mapping[str, Village] = MappingProxyType(by_id if by_id is not None else {v.id: v for v in ordered})
+        self._memo: Dict[str, object] = {}
+        self._patches: Dict[str, Callable] = {}
+        # Ids inserted/updated/deleted since the previous snapshot, None after a full load
+        self.changed_ids = changed_ids
+
+    def _index_districts(self):
+        by_district: Dict[str, List[str]] = {}
+        for v in self.villages:
+            by_district.setdefault(v.district, []).append(v.id)
+        self.by_district: Mapping[str, Tuple[str, ...]] = MappingProxyType(
+            {d: tuple(ids) for d, ids in by_district.items()}
+        )
+
+    def _index_locations(self):
+        grid: Dict[Tuple[int, int], List[int]] = {}
+        lat = array("d")
+        lon = array("d")
+        for pos, v in enumerate(self.villages):
+            lat.append(float(v.latitude or 0.0))
+            lon.append(float(v.longitude or 0.0))
+            if v.latitude or v.longitude:
+                grid.setdefault(self._cell(lat[pos], lon[pos]), []).append(pos)
+        self._lat, self._lon = lat, lon
+        self._grid = MappingProxyType({k: tuple(v) for k, v in grid.items()})
+
+    def with_changes(self, changed: Iterable[Village], deleted_ids: Iterable[str], version: Tuple) -> "VillageSnapshot":
+        """
+        New snapshot with `changed` upserted and `deleted_ids` removed;
+        every other Village object is shared with this snapshot.
+
+        When no village is inserted or deleted the positions stay the same:
+        only the changed slots are replaced, the district and location
+        indexes are reused unless a changed village moved, and memo entries
+        are patched instead of rebuilt (see `memo`).
+        """
+        changed = {v.id: v for v in changed}
+        deleted = {i for i in deleted_ids if i in self.by_id and i not in changed}
+        changed_ids = frozenset(deleted | set(changed))
+        data_changed = set(deleted)
+        moved = False
+        for village in changed.values():
+            old = self.by_id.get(village.id)
+            if old is None or _data_differs(old, village):
+                data_changed.add(village.id)
+                if old is not None and (old.district, old.latitude, old.longitude) != (
+                        village.district, village.latitude, village.longitude):
+                    moved = True
+
+        if deleted or any(i not in self.by_id for i in changed):
+            merged = {i: v for i, v in self.by_id.items() if i not in deleted}
+            merged.update(changed)
+            snapshot = VillageSnapshot(merged.values(), version, changed_ids)
+        else:
+            villages = list(self.villages)
+            for village_id, village in changed.items():
+                villages[self.position(village_id)] = village
+            by_id = dict(self.by_id)
+            by_id.update(changed)
+            snapshot = VillageSnapshot.__new__(VillageSnapshot)
+            snapshot._set_villages(tuple(villages), version, changed_ids, by_id)
+            if moved:
+                snapshot._index_districts()
+                snapshot._index_locations()
+            else:
+                snapshot.by_district = self.by_district
+                snapshot._lat, snapshot._lon, snapshot._grid = self._lat, self._lon, self._grid
+            snapshot.same_positions = True
+        snapshot.data_changed_ids = frozenset(data_changed)
+
+        # In registration order, so a patch can rely on the entries memoized before it
+        for key, patch in self._patches.items():
+            value = patch(self._memo[key], snapshot)
+            if value is not None:
+                snapshot._memo[key] = value
+                snapshot._patches[key] = patch
+        return snapshot
+
+    def __len__(self):
+        return len(self.villages)
+
+    @staticmethod
+    def _cell(lat: float, lon: float) -> Tuple[int, int]:
+        return (math.floor(lat / GRID_CELL_DEG), math.floor(lon / GRID_CELL_DEG))
+
+    def get(self, village_id: str) -> Optional[Village]:
+        return self.by_id.get(village_id)
+
+    def position(self, village_id: str) -> Optional[int]:
+        """
+        Index of the village in `villages` (sorted by id).
+        """
+        pos = bisect.bisect_left(self.villages, village_id, key=lambda v: v.id)
+        if pos < len(self.villages) and self.villages[pos].id == village_id:
+            return pos
+        return None
+
+    def in_district(self, district: str) -> List[Village]:
+        return [self.by_id[i] for i in self.by_district.get(district, ())]
+
+    def memo(self, key: str, builder: Callable[["VillageSnapshot"], object],
+             patch: Optional[Callable[[object, "VillageSnapshot"], object]] = None):
+        """
+        Returns builder(self), computed once per snapshot.
+
+        patch(value, next_snapshot) carries the value over to the snapshots
+        derived with `with_changes`; returning None drops it there (it is
+        rebuilt on first use). See keep_unless_data_changed / patch_per_village.
+        """
+        if key not in self._memo:
+            self._memo[key] = builder(self)
+            if patch is not None:
+                self._patches[key] = patch
+        return self._memo[key]
+
+    def search_rows(self) -> List[Tuple[str, str, str]]:
+        return [(v.id, v.name, v.district) for v in self.villages]
+
+    def nearest(self, lat: float, lon: float) -> Optional[Tuple[Village, float]]:
+        """
+        Nearest village centroid (haversine km), searching grid rings outward.
+        """
+        if not self._grid:
+            return None
+
+        row, col = self._cell(lat, lon)
+        # Lower bound (km) for the distance covered by one grid ring
+        km_per_ring = GRID_CELL_DEG * 111.32 * max(math.cos(math.radians(lat)), 0.01)
+        best_pos, best_dist = None, float("inf")
+        for ring in range(MAX_GRID_RINGS + 1):
+            for r in range(row - ring, row + ring + 1):
+                for c in range(col - ring, col + ring + 1):
+                    if max(abs(r - row), abs(c - col)) != ring:
+                        continue
+                    for pos in self._grid.get((r, c), ()):
+                        dist = haversine(lat, lon, self._lat[pos], self._lon[pos])
+                        if dist < best_dist:
+                            best_pos, best_dist = pos, dist
+            # Anything outside the rings visited so far is at least ring * km_per_ring away
+            if best_pos is not None and best_dist <= ring * km_per_ring:
+                return self.villages[best_pos], best_dist
+
+        # Far outside the region: plain scan
+        for cell in self._grid.values():
+            for pos in cell:
+                dist = haversine(lat, lon, self._lat[pos], self._lon[pos])
+                if dist < best_dist:
+                    best_pos, best_dist = pos, dist
+        return self.villages[best_pos], best_dist
+
+
+def _data_differs(old: Village, new: Village) -> bool:
+    # Anything besides the AI fields (a re-import, a patch script)
+    return any(value != getattr(new, name, None) for name, value in vars(old).items() if name not in AI_FIELDS)
+
+
+def keep_unless_data_changed(value, snapshot: VillageSnapshot):
+    """
+    Memo patch for values that do not read the AI fields: kept across AI writes.
+    """
+    return value if not snapshot.data_changed_ids else None
+
+
+def patch_per_village(values: List, snapshot: VillageSnapshot, compute: Callable[[Village], object]) -> Optional[List]:
+    """
+    Memo patch for lists aligned with `snapshot.villages`: recomputes only the
+    villages whose data changed (None when positions shifted).
+    """
+    if not snapshot.same_positions:
+        return None
+    if not snapshot.data_changed_ids:
+        return values
+    values = list(values)
+    for village_id in snapshot.data_changed_ids:
+        pos = snapshot.position(village_id)
+        values[pos] = compute(snapshot.villages[pos])
+    return values
+
+
+# ==========================================
+# STORES
+# ==========================================
+
+class MongoVillageStore:
+    """
+    Reads villages from MongoDB through Beanie. The version is
+    (document count, newest updated_at) and costs two indexed round trips.
+
+    `load_changes` fetches only documents written since the previous version
+    (the importer skips unchanged villages, so their updated_at stays put).
+    """
+
+    async def version(self) -> Tuple:
+        collection = Village.get_motor_collection()
+        count = await collection.estimated_document_count()
+        newest = await collection.find_one({}, {"updated_at": 1}, sort=[("updated_at", -1)])
+        return (count, newest.get("updated_at") if newest else None)
+
+    async def load_all(self) -> List[Village]:
+        return await Village.find_all().to_list()
+
+    async def load_changes(self, snapshot: VillageSnapshot, version: Tuple) -> Optional[Tuple[List[Village], List[str]]]:
+        """
+        (changed villages, deleted ids) between `snapshot` and `version`,
+        or None when a full load is needed.
+        """
+        count, _ = version
+        _, since = snapshot.version
+        if since is None:
+            return None
+        changed = await Village.find({"updated_at": {"$gte": since}}).to_list()
+        expected = len(snapshot) + sum(1 for v in changed if v.id not in snapshot.by_id)
+        if expected == count:
+            return changed, []
+        # Some documents were removed: compare ids (covered by the _id index)
+        stored_ids = set(await Village.get_motor_collection().distinct("_id"))
+        return changed, [i for i in snapshot.by_id if i not in stored_ids]
+
+    async def save_ai_analysis(self, village_id: str, analysis: AIAnalysis) -> bool:
+        result = await Village.get_motor_collection().update_one(
+            {"_id": village_id},
+            {"$set": {"ai_analysis": analysis.model_dump(), "updated_at": datetime.utcnow()}},
+        )
+        return result.matched_count > 0
+
+
+def create_village_store():
+    """
+    MongoDB by default, the in-memory CSV store with INDEST_STORAGE=embedded.
+    """
+    from backend.database import is_embedded
+    if is_embedded():
+        from backend.services.embedded_store import EmbeddedVillageStore
+        return EmbeddedVillageStore()
+    return MongoVillageStore()
+
+
+# ==========================================
+# REPOSITORY
+# ==========================================
+
+class VillageRepository:
+    """
+    Process-wide holder of the current VillageSnapshot.
+
+    - the first call loads everything,
+    - afterwards `get_snapshot()` returns immediately; every REFRESH_INTERVAL
+      seconds a background task compares the store version and, if it
+      changed, builds a new snapshot and swaps it in atomically,
+    - stores with `load_changes` are read incrementally; the new snapshot
+      carries `changed_ids` so listeners can invalidate just those villages,
+    - `refresh_soon()` lets writers (insight jobs) wait until their write is
+      visible; writes arriving together share a single refresh,
+    - listeners are notified after each swap (search index, caches).
+    """
+
+    def __init__(self, store=None, refresh_interval: float = REFRESH_INTERVAL):
+        self.store = store or create_village_store()
+        self.refresh_interval = refresh_interval
+        self._snapshot: Optional[VillageSnapshot] = None
+        self._next_check = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._batch_task: Optional[asyncio.Task] = None
+        self._batch_open = False
+        self._listeners: List[Callable[[Optional[VillageSnapshot], VillageSnapshot], None]] = []
+
+    def subscribe(self, listener: Callable[[Optional[VillageSnapshot], VillageSnapshot], None]):
+        self._listeners.append(listener)
+
+    @property
+    def snapshot(self) -> Optional[VillageSnapshot]:
+        return self._snapshot
+
+    def _get_lock(self) -> asyncio.Lock:
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        return self._lock
+
+    def _swap(self, snapshot: VillageSnapshot):
+        previous, self._snapshot = self._snapshot, snapshot
+        for listener in self._listeners:
+            try:
+                listener(previous, snapshot)
+            except Exception as e:
+                print(f"Repository listener failed: {e}")
+
+    async def refresh(self, force: bool = False) -> VillageSnapshot:
+        """
+        Checks the store version and reloads if it changed (or if forced).
+        """
+        async with self._get_lock():
+            self._next_check = time.monotonic() + self.refresh_interval
+            version = await self.store.version()
+            if force or self._snapshot is None or version != self._snapshot.version:
+                t0 = time.perf_counter()
+                delta = None
+                if not force and self._snapshot is not None and hasattr(self.store, "load_changes"):
+                    delta = await self.store.load_changes(self._snapshot, version)
+                if delta is not None:
+                    changed, deleted = delta
+                    self._swap(self._snapshot.with_changes(changed, deleted, version))
+                    print(f"Repository: applied {len(changed)} changed / {len(deleted)} deleted villages (version {version}) in {time.perf_counter() - t0:.3f}s")
+                else:
+                    villages = await self.store.load_all()
+                    self._swap(VillageSnapshot(villages, version))
+                    print(f"Repository: loaded {len(villages)} villages (version {version}) in {time.perf_counter() - t0:.3f}s")
+            return self._snapshot
+
+    async def refresh_soon(self) -> VillageSnapshot:
+        """
+        A refresh covering every write made before the call. Callers within
+        REFRESH_BATCH_WINDOW of each other share one refresh.
+        """
+        if self._batch_task is None or not self._batch_open:
+            self._batch_open = True
+            self._batch_task = asyncio.create_task(self._batched_refresh())
+        return await asyncio.shield(self._batch_task)
+
+    async def _batched_refresh(self) -> VillageSnapshot:
+        await asyncio.sleep(REFRESH_BATCH_WINDOW)
+        # Later writers start a new batch: this one may have checked the version already
+        self._batch_open = False
+        return await self.refresh()
+
+    def invalidate(self):
+        """
+        Forces a version check on the next get_snapshot() call.
+        """
+        self._next_check = 0.0
+
+    async def save_ai_analysis(self, village_id: str, analysis: AIAnalysis) -> bool:
+        """
+        Persists an analysis through the active store; the next snapshot picks it up.
+        """
+        saved = await self.store.save_ai_analysis(village_id, analysis)
+        if saved:
+            self.invalidate()
+        return saved
+
+    async def get_snapshot(self) -> VillageSnapshot:
+        if self._snapshot is None:
+            return await self.refresh()
+        if time.monotonic() >= self._next_check and (self._refresh_task is None or self._refresh_task.done()):
+            self._next_check = time.monotonic() + self.refresh_interval
+            self._refresh_task = asyncio.create_task(self._background_refresh())
+        return self._snapshot
+
+    async def _background_refresh(self):
+        try:
+            await self.refresh()
+        except Exception as e:
+            # Keep serving the last good snapshot
+            print(f"Repository refresh failed: {e}")
+
+
+# Singleton instance
+village_repository = VillageRepository()
@@ -0,0 +1,362 @@
+import json
+import os
+import time
+from typing import Dict, List, NamedTuple, Optional
+
+from pydantic import BaseModel, ConfigDict, model_validator
+
+from backend.services.repository import keep_unless_data_changed, patch_per_village
+
+# ==========================================
+# CONFIG (backend/scoring_config.json)
+# ==========================================
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "scoring_config.json")
+
+# Text matching stays fixed; only the numbers are configurable
+SIGNAL_STRONG, SIGNAL_WEAK = "kuat", "lemah"
+WATER_IMPROVED = ("leding", "pompa", "bor")
+ELECTRICITY_PLN = "pln"
+FUEL_CLEAN = ("gas", "listrik")
+
+
+class _Rules(BaseModel):
+    # Typos in a what-if payload must fail, not be ignored
+    model_config = ConfigDict(extra="forbid")
+
+
+class HealthRules(_Rules):
+    doctor_weight: float = 3
+    midwife_weight: float = 1
+    puskesmas_weight: float = 5
+
+
+class EducationRules(_Rules):
+    # (SMP + SMA) / SD below this -> "Dropout Risk Zone"
+    dropout_ratio: float = 0.2
+
+
+class DigitalRules(_Rules):
+    signal_strong: float = 100
+    signal_weak: float = 50
+    signal_none: float = 0
+    bts_points: float = 20
+    cap: float = 100
+
+
+class LivingRules(_Rules):
+    water_improved: float = 100
+    water_other: float = 50
+    electricity_pln: float = 100
+    electricity_other: float = 0
+    fuel_clean: float = 100
+    fuel_other: float = 50
+
+
+class EconomyRules(_Rules):
+    market_points: float = 20
+    bank_points: float = 50
+    cooperative_points: float = 20
+    bumdes_points: float = 50
+    cap: float = 100
+
+
+class IndependenceRules(_Rules):
+    digital_weight: float = 1
+    living_weight: float = 1
+    economy_weight: float = 1
+    maju_above: float = 80
+    berkembang_above: float = 50
+
+    @model_validator(mode="after")
+    def check(self):
+        if self.digital_weight + self.living_weight + self.economy_weight <= 0:
+            raise ValueError("independence weights must sum to a positive number")
+        if self.berkembang_above > self.maju_above:
+            raise ValueError("berkembang_above must not exceed maju_above")
+        return self
+
+
+class ScoringConfig(_Rules):
+    version: str
+    health: HealthRules = HealthRules()
+    education: EducationRules = EducationRules()
+    digital: DigitalRules = DigitalRules()
+    living: LivingRules = LivingRules()
+    economy: EconomyRules = EconomyRules()
+    independence: IndependenceRules = IndependenceRules()
+
+
+def load_scoring_config(path: Optional[str] = None) -> ScoringConfig:
+    """
+    SCORING_CONFIG_PATH (default backend/scoring_config.json).
+    """
+    path = path or os.getenv("SCORING_CONFIG_PATH") or DEFAULT_CONFIG_PATH
+    with open(path, encoding="utf-8") as f:
+        return ScoringConfig.model_validate(json.load(f))
+
+
+def _deep_merge(base: Dict, overrides: Dict) -> Dict:
+    merged = dict(base)
+    for key, value in overrides.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _deep_merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def apply_overrides(config: ScoringConfig, overrides: Dict) -> ScoringConfig:
+    """
+    Copy of `config` with a partial config merged in (raises pydantic.ValidationError).
+    """
+    merged = _deep_merge(config.model_dump(), overrides)
+    if "version" not in overrides:
+        merged["version"] = f"{config.version}+what-if"
+    return ScoringConfig.model_validate(merged)
+
+# ==========================================
+# FEATURES (config independent, once per village)
+# ==========================================
+
+class ScoringFeatures(NamedTuple):
+    has_health: bool
+    doctors: int
+    midwives: int
+    puskesmas: int
+    infectious: int
+    has_disease: bool
+    has_education: bool
+    sd: int
+    smp_sma: int
+    complete: bool
+    signal: int  # 2 strong, 1 weak, 0 none
+    bts: int
+    water_improved: bool
+    electricity_pln: bool
+    fuel_clean: bool
+    has_economy: bool
+    has_digital: bool
+    markets: int
+    banks: int
+    cooperatives: int
+    bumdes: int
+
+
+def extract_features(village) -> ScoringFeatures:
+    h, e, d, i, ec = village.health, village.education, village.digital, village.infrastructure, village.economy
+    disease = village.disease
+    signal = (d.signal_strength or "").lower() if d else ""
+    water = ((i.water_source or i.water_drink_source or "") if i else "").lower()
+    electricity = ((i.electricity or i.electricity_source or "") if i else "").lower()
+    fuel = ((i.cooking_fuel or "") if i else "").lower()
+    return ScoringFeatures(
+        has_health=bool(h),
+        doctors=(h.jumlah_dokter or 0) if h else 0,
+        midwives=(h.jumlah_bidan or 0) if h else 0,
+        puskesmas=(h.jumlah_puskesmas or 0) if h else 0,
+        infectious=(disease.infectious_cases or 0) if disease else 0,
+        has_disease=bool(disease),
+        has_education=bool(e),
+        sd=(e.sd_counts or 0) if e else 0,
+        smp_sma=((e.smp_counts or 0) + (e.sma_counts or 0)) if e else 0,
+        complete=bool(d and i and ec),
+        signal=2 if SIGNAL_STRONG in signal else (1 if SIGNAL_WEAK in signal else 0),
+        bts=(d.bts_count or 0) if d else 0,
+        water_improved=any(k in water for k in WATER_IMPROVED),
+        electricity_pln=ELECTRICITY_PLN in electricity,
+        fuel_clean=any(k in fuel for k in FUEL_CLEAN),
+        has_economy=bool(ec),
+        has_digital=bool(d),
+        markets=(ec.markets or 0) if ec else 0,
+        banks=((ec.banks or 0) + (ec.bank or 0)) if ec else 0,
+        cooperatives=(ec.cooperatives or 0) if ec else 0,
+        bumdes=(ec.bumdes or 0) if ec else 0,
+    )
+
+# ==========================================
+# COMPILED EVALUATOR
+# ==========================================
+
+class ScoreColumns(NamedTuple):
+    health_status: List[str]
+    education_status: List[str]
+    score: List[float]
+    grade: List[str]
+
+
+class CompiledScoring:
+    """
+    A ScoringConfig flattened into plain numbers. The per-village methods
+    return the API shapes (health radar, education funnel, independence
+    index); `evaluate` scores a whole column of features in one loop.
+    """
+
+    def __init__(self, config: ScoringConfig):
+        self.config = config
+        self.version = config.version
+        c = config
+        self._health = (c.health.doctor_weight, c.health.midwife_weight, c.health.puskesmas_weight)
+        self._dropout = c.education.dropout_ratio
+        self._signal = (c.digital.signal_none, c.digital.signal_weak, c.digital.signal_strong)
+        self._bts = (c.digital.bts_points, c.digital.cap)
+        self._water = (c.living.water_other, c.living.water_improved)
+        self._electricity = (c.living.electricity_other, c.living.electricity_pln)
+        self._fuel = (c.living.fuel_other, c.living.fuel_clean)
+        self._economy = (c.economy.market_points, c.economy.bank_points, c.economy.cooperative_points,
+                         c.economy.bumdes_points, c.economy.cap)
+        w = c.independence
+        self._weights = (w.digital_weight, w.living_weight, w.economy_weight,
+                         w.digital_weight + w.living_weight + w.economy_weight)
+        self._grades = (w.maju_above, w.berkembang_above)
+
+    # ---------- single village ----------
+
+    def supply(self, f: ScoringFeatures) -> float:
+        doctor, midwife, puskesmas = self._health
+        return (f.doctors * doctor) + (f.midwives * midwife) + (f.puskesmas * puskesmas)
+
+    def indices(self, f: ScoringFeatures):
+        # (digital, living, economy, total), unrounded
+        bts_points, digital_cap = self._bts
+        market, bank, cooperative, bumdes, economy_cap = self._economy
+        digital = (self._signal[f.signal] + min(f.bts * bts_points, digital_cap)) / 2
+        living = (self._water[f.water_improved] + self._electricity[f.electricity_pln] + self._fuel[f.fuel_clean]) / 3
+        economy = (min(f.markets * market, economy_cap) + min(f.banks * bank, economy_cap)
+                   + min(f.cooperatives * cooperative, economy_cap) + min(f.bumdes * bumdes, economy_cap)) / 4
+        wd, wl, we, total = self._weights
+        return digital, living, economy, (digital * wd + living * wl + economy * we) / total
+
+    def score(self, f: ScoringFeatures) -> float:
+        # Unrounded independence score (complete features only)
+        return self.indices(f)[3]
+
+    def _grade(self, score: float) -> str:
+        maju, berkembang = self._grades
+        return "Maju" if score > maju else ("Berkembang" if score > berkembang else "Tertinggal")
+
+    def health_radar(self, f: ScoringFeatures) -> Dict:
+        if not f.has_health:
+            return {"supply": 0, "demand": 0, "status": "Unknown"}
+        supply = self.supply(f)
+        return {"supply": int(supply), "demand": int(f.infectious), "status": "High Risk" if f.infectious > supply else "Safe"}
+
+    def education_funnel(self, f: ScoringFeatures) -> Dict:
+        if not f.has_education:
+            return {"ratio": 0.0, "status": "Unknown"}
+        if f.sd == 0:
+            return {"ratio": 0.0, "status": "Dropout Risk Zone"}  # Assume risk if no SD
+        ratio = f.smp_sma / f.sd
+        return {"ratio": float(round(ratio, 2)), "status": "Dropout Risk Zone" if ratio < self._dropout else "Stable"}
+
+    def independence_index(self, f: ScoringFeatures) -> Dict:
+        if not f.complete:
+            return {"score": 0.0, "grade": "Incomplete Data", "details": {"digital": 0.0, "living": 0.0, "economy": 0.0}}
+        digital, living, economy, total = self.indices(f)
+        return {
+            "score": float(round(total, 2)),
+            "grade": self._grade(total),
+            "details": {
+                "digital": float(round(digital, 2)),
+                "living": float(round(living, 2)),
+                "economy": float(round(economy, 2)),
+            },
+        }
+
+    # ---------- batch ----------
+
+    def evaluate(self, features: List[ScoringFeatures]) -> ScoreColumns:
+        supply, indices, grade, dropout = self.supply, self.indices, self._grade, self._dropout
+        health, education, scores, grades = [], [], [], []
+        for f in features:
+            health.append(("High Risk" if f.infectious > supply(f) else "Safe") if f.has_health else "Unknown")
+            if not f.has_education:
+                education.append("Unknown")
+            elif f.sd == 0 or f.smp_sma / f.sd < dropout:
+                education.append("Dropout Risk Zone")
+            else:
+                education.append("Stable")
+            if f.complete:
+                total = indices(f)[3]
+                scores.append(total)
+                grades.append(grade(total))
+            else:
+                scores.append(0.0)
+                grades.append("Incomplete Data")
+        return ScoreColumns(health, education, scores, grades)
+
+# ==========================================
+# WHAT-IF
+# ==========================================
+
+INDICATORS = (("health_status", "health_status"), ("education_status", "education_status"), ("independence_grade", "grade"))
+
+
+def snapshot_features(snapshot) -> List[ScoringFeatures]:
+    return snapshot.memo(
+        "scoring_features",
+        lambda s: [extract_features(v) for v in s.villages],
+        lambda features, s: patch_per_village(features, s, extract_features),
+    )
+
+
+def what_if(snapshot, overrides: Dict, district: Optional[str] = None, top: int = 20) -> Dict:
+    """
+    Rescores every village of `snapshot` with `overrides` merged into the
+    active config and compares with the active scores. Nothing is stored and
+    the active config is untouched. Raises pydantic.ValidationError on an
+    invalid config.
+    """
+    t0 = time.perf_counter()
+    candidate = CompiledScoring(apply_overrides(active_scoring.config, overrides))
+    features = snapshot_features(snapshot)
+    before = snapshot.memo(f"scoring_base:{active_scoring.version}", lambda s: active_scoring.evaluate(features),
+                           keep_unless_data_changed)
+    after = candidate.evaluate(features)
+
+    positions = range(len(features))
+    if district:
+        positions = [p for p in positions if snapshot.villages[p].district == district]
+
+    indicators = {}
+    for name, column in INDICATORS:
+        old, new = getattr(before, column), getattr(after, column)
+        counts_before: Dict[str, int] = {}
+        counts_after: Dict[str, int] = {}
+        transitions: Dict[str, Dict[str, int]] = {}
+        changed = 0
+        for p in positions:
+            counts_before[old[p]] = counts_before.get(old[p], 0) + 1
+            counts_after[new[p]] = counts_after.get(new[p], 0) + 1
+            if old[p] != new[p]:
+                changed += 1
+                row = transitions.setdefault(old[p], {})
+                row[new[p]] = row.get(new[p], 0) + 1
+        indicators[name] = {"before": counts_before, "after": counts_after, "changed": changed, "transitions": transitions}
+
+    moved = [p for p in positions if before.grade[p] != after.grade[p] or before.score[p] != after.score[p]]
+    moved.sort(key=lambda p: (before.grade[p] == after.grade[p], -abs(after.score[p] - before.score[p])))
+    villages = snapshot.villages
+    return {
+        "base_version": active_scoring.version,
+        "version": candidate.version,
+        "config": candidate.config.model_dump(),
+        "villages": len(positions),
+        "indicators": indicators,
+        "top_changes": [
+            {
+                "id": villages[p].id,
+                "name": villages[p].name,
+                "district": villages[p].district,
+                "score_before": round(before.score[p], 2),
+                "score_after": round(after.score[p], 2),
+                "grade_before": before.grade[p],
+                "grade_after": after.grade[p],
+            }
+            for p in moved[:top]
+        ],
+        "took_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+# Singleton instance (active config)
+active_scoring = CompiledScoring(load_scoring_config())
@@ -0,0 +1,255 @@
+import hashlib
+import heapq
+import re
+import threading
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ==========================================
+# NORMALIZATION
+# ==========================================
+
+# Old (Van Ophuijsen / Soewandi) spellings and Javanese transliteration
+# variants that show up in village names, mapped to a single form.
+# Applied in order (as regexes), on already folded text.
+_SPELLING_RULES = [(re.compile(pattern), repl) for pattern, repl in [
+    (r"oe", "u"),              # Soerabaja -> Surabaja
+    (r"dj", "j"),              # Djati -> Jati
+    (r"tj", "c"),              # Tjepu -> Cepu
+    (r"\bnj", "ny"),           # Njamplung -> Nyamplung; Banjar stays (inside a word nj is n + j)
+    (r"sj", "sy"),
+    (r"ch", "kh"),
+    (r"dh", "d"),              # Kedhung -> Kedung
+    (r"th", "t"),              # Kethek -> Ketek
+    (r"\bsido", "sida"),       # Sidoarjo / Sidaarja
+    (r"([jy])o\b", r"\1a"),    # Rejo / Reja, Mulyo / Mulya; Bono and Bana stay apart
+]]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9 ]+")
+_DOUBLE = re.compile(r"(.)\1+")
+
+
+def fold(text: Optional[str]) -> str:
+    """
+    Case and accent folding: "Kedung Réjo" -> "kedung rejo".
+    """
+    if not text:
+        return ""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    cleaned = _NON_ALNUM.sub(" ", stripped.lower())
+    return " ".join(cleaned.split())
+
+
+def phonetic(text: Optional[str]) -> str:
+    """
+    Folded text with spelling variants collapsed. Used as the key for both
+    the trie and the n-gram index so queries and names meet in the same form.
+    """
+    key = fold(text)
+    for pattern, repl in _SPELLING_RULES:
+        key = pattern.sub(repl, key)
+    # "Banggle" / "Bangle", "Kemlagi" typed as "Kemmlagi"
+    return _DOUBLE.sub(r"\1", key)
+
+
+def trigrams(key: str) -> set:
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_levenshtein(a: str, b: str, max_dist: int) -> int:
+    """
+    Edit distance, giving up (returns max_dist + 1) once it cannot stay within max_dist.
+    """
+    if abs(len(a) - len(b)) > max_dist:
+        return max_dist + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, 1):
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb))
+            row_min = min(row_min, current[j])
+        if row_min > max_dist:
+            return max_dist + 1
+        previous = current
+    return previous[-1]
+
+# ==========================================
+# INDEX
+# ==========================================
+
+class _Entry:
+    __slots__ = ("id", "name", "district", "name_key", "district_key", "name_tokens", "district_tokens", "gram_count")
+
+    def __init__(self, village_id: str, name: str, district: str):
+        self.id = village_id
+        self.name = name
+        self.district = district
+        self.name_key = phonetic(name)
+        self.district_key = phonetic(district)
+        self.name_tokens = tuple(self.name_key.split())
+        self.district_tokens = tuple(self.district_key.split())
+        self.gram_count = len(trigrams(self.name_key))
+
+
+class VillageSearchIndex:
+    """
+    In-memory typeahead index over village and district names.
+
+    - a prefix trie over every name/district token answers "as you type" queries,
+    - a trigram index catches misspellings and spelling variants,
+    - both work on `phonetic()` keys so case, accents and old spellings don't matter.
+
+    The index is immutable once built; `rebuild_if_changed` swaps in a new one
+    only when the (id, name, district) set differs.
+    """
+
+    # Upper bound of trie candidates scored per query token; node lists are
+    # sorted shortest-name first, so the best prefix matches come early.
+    PREFIX_SCAN_LIMIT = 256
+    FUZZY_MIN_SIMILARITY = 0.3
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries: List[_Entry] = []
+        self._trie: Dict = {}
+        self._grams: Dict[str, List[int]] = {}
+        self._districts: Dict[str, List[int]] = {}
+        self.signature: Optional[str] = None
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def compute_signature(rows: Iterable[Tuple[str, str, str]]) -> str:
+        digest = hashlib.sha1()
+        for village_id, name, district in sorted(rows):
+            digest.update(f"{village_id}\x1f{name}\x1f{district}\x1e".encode("utf-8"))
+        return digest.hexdigest()
+
+    def rebuild_if_changed(self, rows: Iterable[Tuple[str, str, str]]) -> bool:
+        """
+        rows: (id, name, district) tuples. Returns True if the index was rebuilt.
+        """
+        rows = list(rows)
+        signature = self.compute_signature(rows)
+        if signature == self.signature:
+            return False
+        self.build(rows, signature)
+        return True
+
+    def build(self, rows: Iterable[Tuple[str, str, str]], signature: Optional[str] = None):
+        entries = [_Entry(i, n or "", d or "") for i, n, d in rows]
+        entries.sort(key=lambda e: (len(e.name_key), e.name_key))
+
+        trie: Dict = {}
+        grams: Dict[str, List[int]] = {}
+        districts: Dict[str, List[int]] = {}
+        for pos, entry in enumerate(entries):
+            for token in set(entry.name_tokens + entry.district_tokens):
+                node = trie
+                for ch in token:
+                    node = node.setdefault(ch, {})
+                    ids = node.setdefault("", [])
+                    if not ids or ids[-1] != pos:
+                        ids.append(pos)
+            for gram in trigrams(entry.name_key):
+                grams.setdefault(gram, []).append(pos)
+            districts.setdefault(entry.district_key, []).append(pos)
+
+        # Swap atomically so concurrent readers see either the old or the new index
+        with self._lock:
+            self._entries, self._trie, self._grams, self._districts = entries, trie, grams, districts
+            self.signature = signature or self.compute_signature((e.id, e.name, e.district) for e in entries)
+
+    # ---------- querying ----------
+
+    def _prefix_ids(self, trie: Dict, token: str) -> List[int]:
+        node = trie
+        for ch in token:
+            node = node.get(ch)
+            if node is None:
+                return []
+        return node.get("", [])
+
+    @staticmethod
+    def _prefix_score(entry: _Entry, key: str, tokens: List[str]) -> Optional[Tuple[float, str]]:
+        def covers(entry_tokens):
+            return all(any(t.startswith(q) for t in entry_tokens) for q in tokens)
+
+        if entry.name_key == key:
+            return 1.0, "name"
+        if entry.name_key.startswith(key):
+            return 0.9 - 0.001 * (len(entry.name_key) - len(key)), "name"
+        if covers(entry.name_tokens):
+            return 0.8 - 0.001 * (len(entry.name_key) - len(key)), "name"
+        if covers(entry.name_tokens + entry.district_tokens):
+            return 0.6, "district"
+        return None
+
+    def _fuzzy(self, key: str, limit: int, entries, grams, districts, scored: Dict[int, Tuple[float, str]]):
+        query_grams = trigrams(key)
+        max_edits = max(1, len(key) // 4)
+
+        # Village names: Dice similarity on shared trigrams, confirmed by edit distance
+        overlap: Dict[int, int] = {}
+        for gram in query_grams:
+            for pos in grams.get(gram, ()):
+                overlap[pos] = overlap.get(pos, 0) + 1
+        for pos, shared in heapq.nlargest(limit * 3, overlap.items(), key=lambda kv: kv[1]):
+            if pos in scored:
+                continue
+            entry = entries[pos]
+            similarity = 2 * shared / (len(query_grams) + entry.gram_count)
+            if similarity < self.FUZZY_MIN_SIMILARITY:
+                continue
+            if bounded_levenshtein(key, entry.name_key, max_edits) <= max_edits:
+                similarity = max(similarity, 0.9)
+            scored[pos] = (0.75 * similarity, "fuzzy_name")
+
+        # Districts: few distinct values, compare directly
+        for district_key, positions in districts.items():
+            if bounded_levenshtein(key, district_key, max_edits) > max_edits:
+                continue
+            for pos in positions[:limit]:
+                scored.setdefault(pos, (0.5, "fuzzy_district"))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        key = phonetic(query)
+        if not key:
+            return []
+        with self._lock:
+            entries, trie, grams, districts = self._entries, self._trie, self._grams, self._districts
+
+        tokens = key.split()
+        scored: Dict[int, Tuple[float, str]] = {}
+
+        # 1. Prefix matches: scan the shortest posting list among query tokens
+        postings = [self._prefix_ids(trie, t) for t in tokens]
+        if all(postings):
+            for pos in min(postings, key=len)[:self.PREFIX_SCAN_LIMIT]:
+                hit = self._prefix_score(entries[pos], key, tokens)
+                if hit:
+                    scored[pos] = hit
+
+        # 2. Fuzzy matches only when prefixes didn't fill the page
+        if len(scored) < limit:
+            self._fuzzy(key, limit, entries, grams, districts, scored)
+
+        top = heapq.nlargest(limit, scored.items(), key=lambda kv: (kv[1][0], -kv[0]))
+        return [
+            {
+                "id": entries[pos].id,
+                "name": entries[pos].name,
+                "district": entries[pos].district,
+                "score": round(score, 3),
+                "match": match,
+            }
+            for pos, (score, match) in top
+        ]
+
+
+# Singleton instance
+village_search_index = VillageSearchIndex()
@@ -0,0 +1,262 @@
+import asyncio
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.models import IndicatorVersion, RegionalTrend, Village
+from backend.services.podes import CURRENT_PODES_YEAR, compute_document_hash
+from backend.services.repository import keep_unless_data_changed
+
+# Indicator subdocuments versioned per PODES wave
+TRACKED_SECTIONS = (
+    "health", "education", "economy", "infrastructure", "digital", "disaster",
+    "disease", "criminal", "social", "security", "sanitasi",
+)
+
+# Trend chart metrics: name -> (section, field)
+TREND_METRICS = {
+    "health_facilities": ("health", "total_fasilitas_kesehatan"),
+    "health_workers": ("health", "total_tenaga_kesehatan"),
+    "primary_schools": ("education", "sd_counts"),
+    "junior_high_schools": ("education", "smp_counts"),
+    "senior_high_schools": ("education", "sma_counts"),
+    "markets": ("economy", "markets"),
+    "cooperatives": ("economy", "cooperatives"),
+    "bumdes": ("economy", "bumdes"),
+    "pln_households": ("infrastructure", "State_electricity_company"),
+    "bts_count": ("digital", "bts_count"),
+    "infectious_cases": ("disease", "infectious_cases"),
+    "disability_population": ("disease", "disability_population"),
+}
+
+ALL_REGIONS = "__all__"
+
+# ==========================================
+# VERSIONING (pure, no database)
+# ==========================================
+
+def section_hash(data: Optional[Dict]) -> str:
+    return compute_document_hash(data or {})
+
+def plan_section_version(existing: List[Tuple[int, str, object]], year: int, content_hash: str) -> Tuple[bool, List[object]]:
+    """
+    existing: (year, content_hash, id) versions of one village section, any order.
+    Returns (insert a version for `year`?, ids of versions made redundant).
+
+    Waves can be imported out of order (2018 after 2024): a version is only
+    inserted when it differs from the one in effect at `year`, and the next
+    version is dropped if it now repeats the inserted content.
+    """
+    ordered = sorted(existing, key=lambda v: v[0])
+    previous = next((v for v in reversed(ordered) if v[0] < year), None)
+    same_year = next((v for v in ordered if v[0] == year), None)
+    following = next((v for v in ordered if v[0] > year), None)
+
+    if same_year is not None and same_year[1] == content_hash:
+        return False, []
+    redundant = [same_year[2]] if same_year is not None else []
+    insert = previous is None or previous[1] != content_hash
+    # Content now in effect from `year` already covers the next version
+    if following is not None and following[1] == content_hash:
+        redundant.append(following[2])
+    return insert, redundant
+
+def sections_at(versions: Iterable, year: int) -> Dict[str, Dict]:
+    """
+    Section data in effect at `year` (latest version with version.year <= year).
+    """
+    effective: Dict[str, Tuple[int, Dict]] = {}
+    for v in versions:
+        if v.year <= year and (v.section not in effective or v.year > effective[v.section][0]):
+            effective[v.section] = (v.year, v.data)
+    return {section: data for section, (_, data) in effective.items()}
+
+def metric_values(sections: Dict[str, Optional[Dict]]) -> Dict[str, float]:
+    values = {}
+    for metric, (section, field) in TREND_METRICS.items():
+        data = sections.get(section) or {}
+        values[metric] = float(data.get(field) or 0)
+    return values
+
+def village_sections(village: Village) -> Dict[str, Optional[Dict]]:
+    return {s: (getattr(village, s).model_dump() if getattr(village, s) is not None else None) for s in TRACKED_SECTIONS}
+
+def yoy_deltas(series: List[float]) -> List[Optional[float]]:
+    return [None] + [round(b - a, 4) for a, b in zip(series, series[1:])]
+
+def build_series(points: Dict[int, Dict[str, float]]) -> Dict:
+    """
+    {year: {metric: value}} -> {"years", "metrics", "deltas"} with lists aligned to years.
+    """
+    years = sorted(points)
+    metrics = {m: [points[y].get(m, 0.0) for y in years] for m in TREND_METRICS}
+    return {"years": years, "metrics": metrics, "deltas": {m: yoy_deltas(v) for m, v in metrics.items()}}
+
+def compute_regional_trends(entries: Iterable[Tuple[str, int, Dict[str, float]]]) -> Dict[str, Dict]:
+    """
+    entries: (district, year, metric values) per village and wave.
+    Returns {district or ALL_REGIONS: series + village_counts}.
+    """
+    totals: Dict[str, Dict[int, Dict[str, float]]] = {}
+    counts: Dict[str, Dict[int, int]] = {}
+    for district, year, values in entries:
+        for region in (district, ALL_REGIONS):
+            bucket = totals.setdefault(region, {}).setdefault(year, dict.fromkeys(TREND_METRICS, 0.0))
+            for metric, value in values.items():
+                bucket[metric] += value
+            counts.setdefault(region, {})[year] = counts.get(region, {}).get(year, 0) + 1
+
+    trends = {}
+    for region, points in totals.items():
+        series = build_series(points)
+        series["village_counts"] = [counts[region][y] for y in series["years"]]
+        trends[region] = series
+    return trends
+
+# ==========================================
+# MONGO (importer)
+# ==========================================
+
+async def record_year_versions(villages: List[Village], year: int) -> Dict[str, int]:
+    """
+    Writes the indicator versions of `villages` for one PODES wave.
+    Only sections whose content differs from the version in effect are stored.
+    """
+    collection = IndicatorVersion.get_motor_collection()
+    ids = [v.id for v in villages]
+    existing: Dict[Tuple[str, str], List] = {}
+    async for doc in collection.find({"village_id": {"$in": ids}}, {"data": 0}):
+        existing.setdefault((doc["village_id"], doc["section"]), []).append((doc["year"], doc["content_hash"], doc["_id"]))
+
+    inserts, redundant = [], []
+    for village in villages:
+        for section, data in village_sections(village).items():
+            if data is None:
+                continue
+            content_hash = section_hash(data)
+            insert, drop = plan_section_version(existing.get((village.id, section), []), year, content_hash)
+            redundant.extend(drop)
+            if insert:
+                inserts.append({"village_id": village.id, "section": section, "year": year,
+                                "content_hash": content_hash, "data": data})
+
+    if redundant:
+        await collection.delete_many({"_id": {"$in": redundant}})
+    if inserts:
+        await collection.insert_many(inserts, ordered=False)
+    # Bump updated_at like BulkPatcher so incremental snapshot refreshes see the
+    # new year; villages that already list it are left alone
+    await Village.get_motor_collection().update_many(
+        {"_id": {"$in": ids}, "podes_years": {"$ne": year}},
+        {"$addToSet": {"podes_years": year}, "$set": {"updated_at": datetime.utcnow()}},
+    )
+    return {"versions_written": len(inserts), "versions_dropped": len(redundant)}
+
+async def latest_recorded_year() -> Optional[int]:
+    doc = await IndicatorVersion.get_motor_collection().find_one({}, {"year": 1}, sort=[("year", -1)])
+    return doc["year"] if doc else None
+
+async def load_metric_versions() -> Dict[str, List[IndicatorVersion]]:
+    """
+    Every stored version of the trend sections, metric fields only, by village id.
+    """
+    sections = {section for section, _ in TREND_METRICS.values()}
+    projection = {"village_id": 1, "section": 1, "year": 1}
+    projection.update({f"data.{field}": 1 for _, field in TREND_METRICS.values()})
+    per_village: Dict[str, List[IndicatorVersion]] = {}
+    async for doc in IndicatorVersion.get_motor_collection().find({"section": {"$in": list(sections)}}, projection):
+        per_village.setdefault(doc["village_id"], []).append(
+            IndicatorVersion.model_construct(section=doc["section"], year=doc["year"], data=doc.get("data", {}))
+        )
+    return per_village
+
+async def rebuild_regional_trends() -> int:
+    """
+    Recomputes every RegionalTrend from the stored versions (run after an import).
+    Only the metric fields are fetched.
+    """
+    districts: Dict[str, Tuple[str, List[int]]] = {}
+    async for doc in Village.get_motor_collection().find({}, {"district": 1, "podes_years": 1}):
+        districts[doc["_id"]] = (doc.get("district"), doc.get("podes_years") or [])
+    per_village = await load_metric_versions()
+
+    def entries():
+        for village_id, (district, years) in districts.items():
+            versions = per_village.get(village_id, [])
+            for year in years:
+                yield district, year, metric_values(sections_at(versions, year))
+
+    trends = compute_regional_trends(entries())
+    collection = RegionalTrend.get_motor_collection()
+    await collection.delete_many({"_id": {"$nin": list(trends)}})
+    for region, series in trends.items():
+        doc = RegionalTrend(id=region, **series).model_dump(by_alias=True)
+        await collection.replace_one({"_id": region}, doc, upsert=True)
+    return len(trends)
+
+# ==========================================
+# API (served from memory, once per snapshot)
+# ==========================================
+
+def village_points(village: Village, versions: Optional[List]) -> Dict[int, Dict[str, float]]:
+    """
+    {year: metric values} of one village. Villages never imported with
+    --year have a single point, the current wave.
+    """
+    if not versions or not village.podes_years:
+        return {CURRENT_PODES_YEAR: metric_values(village_sections(village))}
+    return {year: metric_values(sections_at(versions, year)) for year in village.podes_years}
+
+class TrendData:
+    """
+    Stored versions by village id plus the district / regional series of
+    one snapshot, computed from the same data as the village series.
+    """
+
+    def __init__(self, snapshot, versions: Dict[str, List]):
+        self.versions = versions
+        # Same villages as rebuild_regional_trends; the current wave of all of
+        # them when nothing was imported with --year
+        waved = [v for v in snapshot.villages if v.podes_years and v.id in versions]
+        self.regional = compute_regional_trends(
+            (v.district, year, values)
+            for v in (waved or snapshot.villages)
+            for year, values in village_points(v, versions.get(v.id)).items()
+        )
+
+    def village_series(self, village: Village) -> Dict:
+        return build_series(village_points(village, self.versions.get(village.id)))
+
+class _TrendLoader:
+    # Memo value: the first request loads, concurrent ones wait for it; a failed load is retried
+    def __init__(self):
+        self._task: Optional[asyncio.Future] = None
+
+    async def get(self, snapshot) -> TrendData:
+        task = self._task
+        if task is None or (task.done() and (task.cancelled() or task.exception() is not None)):
+            task = self._task = asyncio.ensure_future(self._load(snapshot))
+        return await asyncio.shield(task)
+
+    @staticmethod
+    async def _load(snapshot) -> TrendData:
+        from backend.database import is_embedded
+        # Embedded storage has no stored waves: one-year trends from the snapshot
+        versions = {} if is_embedded() else await load_metric_versions()
+        return TrendData(snapshot, versions)
+
+async def get_trend(snapshot, village: Village) -> Dict:
+    """
+    Payload of /api/micro/{id}/trend: the village series plus its district
+    and regional series. The stored versions are read once per snapshot
+    (kept across AI-only writes), requests are answered from memory.
+    """
+    loader = snapshot.memo("trends", lambda s: _TrendLoader(), keep_unless_data_changed)
+    data = await loader.get(snapshot)
+    return {
+        "village_id": village.id,
+        "name": village.name,
+        "district": village.district,
+        "village": data.village_series(village),
+        "district_trend": data.regional.get(village.district),
+        "region_trend": data.regional.get(ALL_REGIONS),
+    }
@@ -2,41 +2,37 @@ import React, { useState, useEffect, useRef } from 'react';
 import { Search } from 'lucide-react';
 import axios from 'axios';
 
-const VillageSearch = ({ onSelect, initialVillages = [], placeholder = "Cari Desa..." }) => {
+const VillageSearch = ({ onSelect, placeholder = "Cari Desa..." }) => {
     const [query, setQuery] = useState('');
     const [results, setResults] = useState([]);
     const [isOpen, setIsOpen] = useState(false);
-    const [villages, setVillages] = useState(initialVillages);
     const wrapperRef = useRef(null);
 
-    // Fetch villages if not provided
+    // Server-side typeahead (/api/search), debounced while typing
     useEffect(() => {
-        if (initialVillages.length === 0) {
-            const fetchVillages = async () => {
-                try {
-                    const res = await axios.get('/api/macro');
-                    setVillages(res.data.data);
-                } catch (error) {
-                    console.error("Failed to fetch villages for search:", error);
-                }
-            };
-            fetchVillages();
-        } else {
-            setVillages(initialVillages);
-        }
-    }, [initialVillages]);
-
-    // Filter logic
-    useEffect(() => {
-        if (!query) {
+        if (!query.trim()) {
             setResults([]);
             return;
         }
-        const filtered = villages.filter(v =>
-            v.name.toLowerCase().includes(query.toLowerCase())
-        ).slice(0, 10); // Limit to 10 results
-        setResults(filtered);
-    }, [query, villages]);
+        const controller = new AbortController();
+        const timer = setTimeout(async () => {
+            try {
+                const res = await axios.get('/api/search', {
+                    params: { q: query, limit: 10 },
+                    signal: controller.signal
+                });
+                setResults(res.data.results);
+            } catch (error) {
+                if (!axios.isCancel(error)) {
+                    console.error("Failed to search villages:", error);
+                }
+            }
+        }, 150);
+        return () => {
+            clearTimeout(timer);
+            controller.abort();
+        };
+    }, [query]);
 
     // Handle outside click to close dropdown (supports touch devices)
     useEffect(() => {
@@ -328,17 +328,31 @@ const MacroDashboard = ({ onSelectVillage, userLocation, onManualUpdate }) => {
     };
 
     // --- Leaderboards ---
+    // Precomputed on the server (/api/rankings); sort locally only if that fails
+    const [leaderboards, setLeaderboards] = useState(null);
+    useEffect(() => {
+        const top = (metric) => axios.get('/api/rankings', { params: { metric, top: 5 } })
+            .then(res => res.data.top.map(e => e.id));
+        Promise.all([top('infectious_cases'), top('bumdes')])
+            .then(([risk, economy]) => setLeaderboards({ risk, economy }))
+            .catch(error => console.error("Failed to fetch rankings:", error));
+    }, []);
+
+    const byId = useMemo(() => new Map(villages.map(v => [v.id, v])), [villages]);
+
     const topRiskVillages = useMemo(() => {
+        if (leaderboards) return leaderboards.risk.map(id => byId.get(id)).filter(Boolean);
         return [...villages]
             .sort((a, b) => (b.disease?.infectious_cases || 0) - (a.disease?.infectious_cases || 0))
             .slice(0, 5);
-    }, [villages]);
+    }, [villages, byId, leaderboards]);
 
     const topEconomyVillages = useMemo(() => {
+        if (leaderboards) return leaderboards.economy.map(id => byId.get(id)).filter(Boolean);
         return [...villages]
             .sort((a, b) => (b.economy?.bumdes || 0) - (a.economy?.bumdes || 0))
             .slice(0, 5);
-    }, [villages]);
+    }, [villages, byId, leaderboards]);
 
     // --- Charts Data ---
     const incomeData = useMemo(() => {
@@ -402,7 +416,7 @@ const MacroDashboard = ({ onSelectVillage, userLocation, onManualUpdate }) => {
                     <p className="text-gray-500 dark:text-gray-400">Pemantauan situasi wilayah secara real-time.</p>
                 </div>
                 <div className="w-full md:w-72 z-50">
-                    <VillageSearch onSelect={onSelectVillage} initialVillages={villages} />
+                    <VillageSearch onSelect={onSelectVillage} />
                 </div>
             </div>
 
@@ -1,73 +1,425 @@
-import time
-import sys
+"""
+Concurrent, rate-limited, resumable AI insight generation.
+
+Villages are streamed from the Mongo `Village` collection, `--concurrency`
+requests are kept in flight under a token bucket (--rpm) that halves its
+rate on 429s and honours Retry-After, and results are written with unordered
+bulk updates. Every written batch is appended to a checkpoint, so a crashed
+or interrupted run resumes where it stopped. Responses are cached by input
+(backend/services/ai_cache.py): after a small data fix, --all only calls the
+model for villages whose prompt input changed. --pack N sends N villages per
+request with a keyed array output; invalid entries are retried on their own.
+The report includes token / latency usage per prompt mode and district
+(scripts/compare_prompt_modes.py compares the modes on a sample).
+
+    python scripts/batch_generate_ai.py                       # villages without insights
+    python scripts/batch_generate_ai.py --prefix 3515 --all   # regenerate one regency
+    python scripts/batch_generate_ai.py --district KREMBUNG --rpm 300 --concurrency 16
+    python scripts/batch_generate_ai.py --pack 8 --rpm 15    # 8 villages per request (free tier quota)
+"""
+import argparse
+import asyncio
+import json
 import os
+import random
+import sys
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
 
-# Ensure backend module is found
-sys.path.append(os.getcwd())
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
 
-from sqlmodel import Session, select
-from backend.database import get_session, engine
+from backend.database import init_db
 from backend.models import Village, AIAnalysis
-from backend.services.ai_service import generate_village_insights
-
-def batch_generate_ai():
-    with Session(engine) as session:
-        # Fetch all villages
-        villages = session.exec(select(Village)).all()
-        total = len(villages)
-        print(f"Starting batch AI generation for {total} villages...")
-
-        for index, village in enumerate(villages):
-            print(f"[{index+1}/{total}] Processing {village.name} ({village.id})...")
-            
-            # Prepare data for AI
-            village_data = {
-                "name": village.name,
-                "district": village.district,
-                "topography": village.topography,
-                "primary_income": village.economy.primary_income if village.economy else "Unknown",
-                "health_status": "High Risk" if village.health and (village.health.dengue_cases > 0 or village.health.malnutrition_cases > 0) else "Safe", # Simplified
-                "education_level": "High" if village.education and village.education.universities > 0 else "Standard",
-                "digital_access": village.digital.signal_strength if village.digital else "None"
-            }
+from backend.services.ai_cache import insight_cache
+from backend.services.ai_service import (
+    PROMPT_MODE,
+    PROMPT_MODES,
+    acached_packed_insights,
+    acached_village_insights,
+    packing_savings,
+    request_packed_insights,
+    request_village_insights,
+)
+from backend.services.ai_usage import usage_tracker
+from backend.services.db_service import MISSING_INSIGHTS, apply_insights, village_ai_payload
+from backend.services.podes import CSV_FILE_PATH
+from backend.services.llm import LLMConfigError, get_provider
+from backend.services.rate_limit import RateLimited, TokenBucket
+
+DEFAULT_CHECKPOINT = os.path.join(os.path.dirname(CSV_FILE_PATH), ".ai_batch_checkpoint.jsonl")
+DEFAULT_RPM = 60
+DEFAULT_CONCURRENCY = 8
+DEFAULT_BATCH_SIZE = 50
+MAX_ATTEMPTS = 4          # per village, for errors other than 429
+MAX_THROTTLES = 20        # per village, 429s before giving up on it
+MAX_BACKOFF_S = 60
+
+# ==========================================
+# CHECKPOINT (append-only, one line per written batch)
+# ==========================================
+
+class Checkpoint:
+    """
+    JSONL file: a header with the selection, then {"done": [...]} lines.
+    A different selection (or --restart) starts from scratch; a torn
+    last line from a crash is ignored.
+    """
+
+    def __init__(self, path: str, selection: dict, restart: bool):
+        self.path = path
+        self.done = set()
+        header = json.dumps({"selection": selection}, sort_keys=True)
+        if not restart and os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+            if lines and lines[0] == header:
+                for line in lines[1:]:
+                    try:
+                        self.done.update(json.loads(line)["done"])
+                    except (ValueError, KeyError):
+                        continue
+        if not self.done:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(header + "\n")
+
+    def record(self, ids):
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps({"done": ids}) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self.done.update(ids)
+
+# ==========================================
+# RESULT WRITER
+# ==========================================
+
+class ResultWriter:
+    """
+    Buffers generated analyses and writes them as unordered bulk updates,
+    recording the written ids in the checkpoint.
+    """
+
+    def __init__(self, collection, checkpoint: Checkpoint, batch_size: int):
+        self.collection = collection
+        self.checkpoint = checkpoint
+        self.batch_size = batch_size
+        self.pending = []
+        self.written = 0
+        self.failed = 0
+        self._lock = asyncio.Lock()
+
+    async def add(self, village_id: str, analysis: AIAnalysis):
+        self.pending.append((village_id, analysis))
+        if len(self.pending) >= self.batch_size:
+            await self.flush()
 
+    async def flush(self):
+        async with self._lock:
+            batch, self.pending = self.pending, []
+            if not batch:
+                return
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne({"_id": village_id}, {"$set": {"ai_analysis": analysis.model_dump(), "updated_at": now}})
+                for village_id, analysis in batch
+            ]
+            failed_indexes = set()
             try:
-                # Call Gemini API
-                insights = generate_village_insights(village_data)
-                
-                # Check if we got valid unique data (not fallback)
-                if insights.get("persona") == "Unknown" or insights.get("local_hero") == "Analysis failed.":
-                     print(f"  -> Failed to get valid AI response for {village.name}. Retrying or skipping.")
-                     # Optional: Retry logic could go here
-                
-                # Update/Create Analysis Record
-                if not village.ai_analysis:
-                    analysis = AIAnalysis(
-                        village_id=village.id,
-                        persona=insights.get("persona", "Unknown"),
-                        social_capital_narrative=insights.get("local_hero", ""),
-                        swot_analysis=insights.get("swot", {}),
-                        recommendations=insights.get("recommendations", {})
-                    )
-                    session.add(analysis)
-                else:
-                    aa = village.ai_analysis
-                    aa.persona = insights.get("persona", "Unknown")
-                    aa.social_capital_narrative = insights.get("local_hero", "")
-                    aa.swot_analysis = insights.get("swot", {})
-                    aa.recommendations = insights.get("recommendations", {})
-                    session.add(aa)
-                
-                session.commit()
-                print(f"  -> Success!")
-                
-                # Sleep to respect rate limits (e.g. 15 requests/min for free tier?)
-                # Let's be safe with 4 seconds
-                time.sleep(4) 
-
-            except Exception as e:
-                print(f"  -> Error: {e}")
-                session.rollback()
+                await self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                failed_indexes = {error["index"] for error in errors}
+                for error in errors[:5]:
+                    print(f"  - write error: {error.get('errmsg')}")
+            ids = [village_id for i, (village_id, _) in enumerate(batch) if i not in failed_indexes]
+            self.checkpoint.record(ids)
+            self.written += len(ids)
+            self.failed += len(failed_indexes)
+
+# ==========================================
+# PIPELINE
+# ==========================================
+
+async def generate_one(payload: dict, bucket: TokenBucket, stats: dict, use_cache: bool = True, mode: str = None):
+    """
+    Insights for one village, or None once retries are exhausted.
+    Cached responses for an unchanged input cost neither a request nor a token;
+    429s slow the shared bucket down; other errors back off exponentially.
+    """
+    if use_cache:
+        cached = await acached_village_insights(payload, mode)
+        if cached is not None:
+            stats["cached"] += 1
+            return cached
+    attempts = throttles = 0
+    last_error = None
+    while attempts < MAX_ATTEMPTS and throttles < MAX_THROTTLES:
+        await bucket.acquire()
+        stats["requests"] += 1
+        try:
+            insights = await request_village_insights(payload, use_cache=False, mode=mode)
+        except RateLimited as e:
+            throttles += 1
+            stats["throttled"] += 1
+            bucket.on_throttle(e.retry_after)
+            continue
+        except LLMConfigError:
+            raise
+        except Exception as e:
+            attempts += 1
+            stats["errors"] += 1
+            if attempts < MAX_ATTEMPTS:
+                await asyncio.sleep(min(MAX_BACKOFF_S, 2 ** attempts) * random.uniform(0.5, 1.5))
+            last_error = e
+            continue
+        bucket.on_success()
+        return insights
+    if attempts >= MAX_ATTEMPTS:
+        print(f"  -> giving up after {attempts} errors: {last_error}")
+    return None
+
+async def generate_packed(payloads: dict, bucket: TokenBucket, stats: dict, use_cache: bool = True, mode: str = None) -> dict:
+    """
+    Insights for several villages ({village_id: payload}) with one request per
+    attempt. Each village's entry is validated on its own and only the
+    villages without a valid result are sent again.
+    """
+    results = {}
+    if use_cache:
+        for village_id, payload in payloads.items():
+            cached = await acached_packed_insights(payload, mode)
+            if cached is not None:
+                results[village_id] = cached
+        stats["cached"] += len(results)
+    pending = {i: p for i, p in payloads.items() if i not in results}
+
+    attempts = throttles = 0
+    last_error = None
+    while pending and attempts < MAX_ATTEMPTS and throttles < MAX_THROTTLES:
+        await bucket.acquire()
+        stats["requests"] += 1
+        try:
+            parsed, failed = await request_packed_insights(pending, use_cache=False, mode=mode)
+        except RateLimited as e:
+            throttles += 1
+            stats["throttled"] += 1
+            bucket.on_throttle(e.retry_after)
+            continue
+        except LLMConfigError:
+            raise
+        except Exception as e:
+            attempts += 1
+            stats["errors"] += 1
+            if attempts < MAX_ATTEMPTS:
+                await asyncio.sleep(min(MAX_BACKOFF_S, 2 ** attempts) * random.uniform(0.5, 1.5))
+            last_error = e
+            continue
+        bucket.on_success()
+        for key, tokens in packing_savings(pending, mode).items():
+            stats[key] += tokens
+        results.update(parsed)
+        if failed:
+            # Missing or invalid entries: retry just those villages
+            attempts += 1
+            stats["village_retries"] += len(failed)
+            last_error = f"{len(failed)} invalid entries"
+        pending = {i: pending[i] for i in failed}
+    if pending and attempts >= MAX_ATTEMPTS:
+        print(f"  -> giving up on {len(pending)} villages after {attempts} attempts: {last_error}")
+    return results
+
+class Abort:
+    """
+    First fatal worker error (bad LLM configuration, failed Mongo write):
+    the producer stops feeding the queue and the run ends with that error.
+    """
+
+    def __init__(self):
+        self.event = asyncio.Event()
+        self.error = None
+
+    def fail(self, error: BaseException):
+        if self.error is None:
+            self.error = error
+        self.event.set()
+
+async def put_or_abort(queue: asyncio.Queue, item, abort: Abort) -> bool:
+    """
+    queue.put that gives up (False) once a worker has failed, so a full queue
+    with no live consumer cannot block the producer forever.
+    """
+    if abort.event.is_set():
+        return False
+    put = asyncio.ensure_future(queue.put(item))
+    aborted = asyncio.ensure_future(abort.event.wait())
+    await asyncio.wait({put, aborted}, return_when=asyncio.FIRST_COMPLETED)
+    aborted.cancel()
+    if put.done():
+        return True
+    put.cancel()
+    return False
+
+async def worker(queue: asyncio.Queue, bucket: TokenBucket, writer: ResultWriter, stats: dict, total: int,
+                 use_cache: bool, mode: str, abort: Abort):
+    while True:
+        chunk = await queue.get()
+        try:
+            if chunk is None:
+                return
+            if len(chunk) == 1:
+                insights = await generate_one(village_ai_payload(chunk[0]), bucket, stats, use_cache, mode)
+                results = {chunk[0].id: insights} if insights is not None else {}
+            else:
+                results = await generate_packed({v.id: village_ai_payload(v) for v in chunk}, bucket, stats, use_cache, mode)
+            stats["gave_up"] += len(chunk) - len(results)
+            for village in chunk:
+                if village.id not in results:
+                    continue
+                analysis = apply_insights(village.ai_analysis or AIAnalysis(), results[village.id])
+                await writer.add(village.id, analysis)
+                stats["generated"] += 1
+                if stats["generated"] % 25 == 0:
+                    elapsed = time.perf_counter() - stats["started"]
+                    print(f"[{stats['generated']}/{total}] {stats['generated'] / elapsed * 60:.0f} villages/min, "
+                          f"rate {bucket.rate * 60:.0f} rpm, {stats['cached']} cached, {stats['throttled']} throttled")
+        except Exception as e:
+            # generate_* handle per-village errors; anything escaping them is fatal for the run
+            abort.fail(e)
+            return
+        finally:
+            queue.task_done()
+
+def selection_query(args) -> dict:
+    query = {} if args.all else dict(MISSING_INSIGHTS)
+    if args.district:
+        query["district"] = args.district
+    if args.prefix:
+        query["_id"] = {"$regex": f"^{args.prefix}"}
+    return query
+
+async def batch_generate_ai(args) -> dict:
+    await init_db()
+    collection = Village.get_motor_collection()
+
+    query = selection_query(args)
+    checkpoint = Checkpoint(args.checkpoint, {"query": query, "limit": args.limit}, args.restart)
+    if checkpoint.done:
+        print(f"Resuming: {len(checkpoint.done)} villages already done (checkpoint {args.checkpoint}).")
+
+    total = await collection.count_documents(query)
+    if args.limit:
+        total = min(total, args.limit)
+    provider = get_provider()
+    # Fail before any worker starts (missing key / SDK), not inside one
+    provider.check()
+    print(f"Generating AI insights for {total} villages with {provider.name}:{provider.model} "
+          f"({args.concurrency} in flight, {args.rpm} requests/min max, {args.pack} per request, "
+          f"{args.prompt_mode} prompts)...")
+    usage_tracker.reset()
+
+    bucket = TokenBucket(args.rpm / 60, burst=args.concurrency)
+    writer = ResultWriter(collection, checkpoint, args.batch_size)
+    stats = {"requests": 0, "cached": 0, "generated": 0, "gave_up": 0, "throttled": 0, "errors": 0,
+             "skipped": 0, "village_retries": 0, "single_prompt_tokens": 0, "packed_prompt_tokens": 0,
+             "started": time.perf_counter()}
+    queue = asyncio.Queue(maxsize=args.concurrency * 2)
+    abort = Abort()
+    workers = [
+        asyncio.create_task(worker(queue, bucket, writer, stats, total, not args.no_cache, args.prompt_mode, abort))
+        for _ in range(args.concurrency)
+    ]
+
+    # Stable order (by _id) keeps --limit and resumption deterministic
+    finder = Village.find(query).sort("+_id")
+    if args.limit:
+        finder = finder.limit(args.limit)
+    chunk = []
+    async for village in finder:
+        if village.id in checkpoint.done:
+            stats["skipped"] += 1
+            continue
+        chunk.append(village)
+        if len(chunk) >= args.pack:
+            if not await put_or_abort(queue, chunk, abort):
+                break
+            chunk = []
+    else:
+        if chunk:
+            await put_or_abort(queue, chunk, abort)
+    for _ in workers:
+        if not await put_or_abort(queue, None, abort):
+            break
+    if abort.event.is_set():
+        for task in workers:
+            task.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    if abort.error is not None:
+        # Keep what was generated before the failure (and its checkpoint)
+        try:
+            await writer.flush()
+        except Exception as e:
+            print(f"  - final write failed: {e}")
+        raise abort.error
+    await writer.flush()
+
+    elapsed = time.perf_counter() - stats.pop("started")
+    stats.update({
+        "written": writer.written,
+        "write_failures": writer.failed,
+        "elapsed_s": round(elapsed, 1),
+        "villages_per_min": round(stats["generated"] / elapsed * 60, 1) if elapsed else 0.0,
+        "final_rpm": round(bucket.rate * 60, 1),
+        "cache": insight_cache.stats(),
+        "usage": usage_tracker.report(),
+    })
+    if args.pack > 1:
+        single, packed = stats["single_prompt_tokens"], stats["packed_prompt_tokens"]
+        stats["packing"] = {
+            "villages_per_request": args.pack,
+            "estimated_prompt_tokens_single": single,
+            "estimated_prompt_tokens_packed": packed,
+            "estimated_savings": round(1 - packed / single, 4) if single else 0.0,
+        }
+    for key in ("single_prompt_tokens", "packed_prompt_tokens"):
+        stats.pop(key)
+    return stats
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate AI insights for villages in MongoDB.")
+    parser.add_argument("--all", action="store_true", help="Regenerate villages that already have insights")
+    parser.add_argument("--district", default=None, help="Only villages of this district")
+    parser.add_argument("--prefix", default=None, help="Only villages whose IDDESA starts with this (province/regency)")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--rpm", type=float, default=DEFAULT_RPM, help="Maximum requests per minute")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Requests in flight")
+    parser.add_argument("--pack", type=int, default=1, help="Villages per request (packed prompt); 1 = one village per request")
+    parser.add_argument("--prompt-mode", choices=PROMPT_MODES, default=PROMPT_MODE,
+                        help="compact: drop empty fields, compact JSON, per-village token budget")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Villages per bulk update")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--no-cache", action="store_true", help="Call the model even when a cached response exists")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint of a previous run")
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    batch_generate_ai()
+    args = parse_args()
+    if args.pack < 1:
+        sys.exit("--pack must be at least 1")
+    if args.prefix and not args.prefix.isdigit():
+        sys.exit("--prefix must be the leading digits of an IDDESA")
+    try:
+        result = asyncio.run(batch_generate_ai(args))
+    except LLMConfigError as e:
+        sys.exit(f"LLM configuration error: {e}")
+    print(json.dumps(result, indent=2))
+    sys.exit(1 if result["gave_up"] or result["write_failures"] else 0)
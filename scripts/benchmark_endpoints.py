@@ -0,0 +1,329 @@
+"""
+Endpoint benchmarks at several dataset sizes.
+
+For each scale the API runs in a fresh subprocess (so memory numbers are per
+scale) against either the in-memory embedded store (default, no server
+needed) or a local MongoDB loaded with the same data. Requests go through
+the ASGI app in-process, so numbers measure the API, not the network.
+
+Measured per scale:
+- /api/macro cold (first build after a new snapshot) and warm
+- /api/micro/{id}
+- /api/nearest-village: geofence hit, fuzzy polygon match, centroid fallback
+- /api/boundaries
+- the offline persona batch of scripts/generate_smart_personas.py (columns + insights)
+Each with p50/p90/p95/p99/max latency (ms), throughput (sequential req/s)
+and response size, plus startup time and RSS memory.
+
+    python scripts/benchmark_endpoints.py --scales real,1k,10k --out bench.json
+    python scripts/benchmark_endpoints.py --scales 1k --compare bench.json
+    python scripts/benchmark_endpoints.py --storage mongo --scales 10k   # needs MONGODB_URL
+
+Synthetic scales come from scripts/generate_synthetic_podes.py (cached in data/synthetic/).
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib.util
+import io
+import json
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+DEFAULT_REQUESTS = 200
+DEFAULT_COLD_RUNS = 5
+REAL_GEOJSON = os.path.join(ROOT, "data", "peta_desa_202513524.geojson")
+
+# ==========================================
+# STATS
+# ==========================================
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def summarize(latencies_s, sizes, statuses) -> dict:
+    ms = sorted(l * 1000 for l in latencies_s)
+    total = sum(latencies_s)
+    return {
+        "requests": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p90_ms": round(percentile(ms, 90), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "max_ms": round(ms[-1], 3) if ms else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 3) if ms else 0.0,
+        "throughput_rps": round(len(ms) / total, 1) if total else 0.0,
+        "response_bytes": int(sum(sizes) / len(sizes)) if sizes else 0,
+        "statuses": {str(s): statuses.count(s) for s in sorted(set(statuses))},
+    }
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            return round(int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20, 1)
+    except OSError:
+        return 0.0
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
+
+# ==========================================
+# WORKER (one scale, fresh process)
+# ==========================================
+
+async def run_scale(requests: int, cold_runs: int, seed: int) -> dict:
+    import httpx
+    from backend.main import app, on_startup, on_shutdown
+    from backend.services.repository import village_repository
+    from backend.services.geofencing import geofence_service
+
+    rng = random.Random(seed)
+    rss_before = rss_mb()
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        await on_startup()
+    startup_s = time.perf_counter() - t0
+    snapshot = await village_repository.get_snapshot()
+    villages = snapshot.villages
+
+    # Boundaries are loaded lazily; count them as part of startup cost separately
+    t0 = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        geofence_service.get_geojson()
+    boundaries_load_s = time.perf_counter() - t0
+
+    results = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+
+        async def measure(name, paths, before_each=None):
+            latencies, sizes, statuses = [], [], []
+            for path in paths:
+                if before_each:
+                    await before_each()
+                with contextlib.redirect_stdout(io.StringIO()):
+                    start = time.perf_counter()
+                    response = await client.get(path)
+                    latencies.append(time.perf_counter() - start)
+                sizes.append(len(response.content))
+                statuses.append(response.status_code)
+            results[name] = summarize(latencies, sizes, statuses)
+            return results[name]
+
+        async def new_snapshot():
+            with contextlib.redirect_stdout(io.StringIO()):
+                await village_repository.refresh(force=True)
+
+        await measure("macro_cold", ["/api/macro"] * cold_runs, before_each=new_snapshot)
+        await measure("macro_warm", ["/api/macro"] * requests)
+
+        ids = [rng.choice(villages).id for _ in range(requests)]
+        await measure("micro", [f"/api/micro/{i}" for i in ids])
+
+        # Points inside polygons (village centroids), just outside the mapped area
+        # (fuzzy polygon match) and far away (centroid fallback)
+        located = [v for v in villages if v.latitude or v.longitude]
+        sample = [rng.choice(located) for _ in range(requests)]
+        max_lon = max(v.longitude for v in located)
+        edge = [v for v in located if v.longitude > max_lon - 0.01] or located
+        await measure("nearest_geofence", [f"/api/nearest-village?lat={v.latitude}&long={v.longitude}" for v in sample])
+        await measure("nearest_fuzzy", [
+            f"/api/nearest-village?lat={v.latitude}&long={max_lon + 0.002}" for v in (rng.choice(edge) for _ in range(requests))
+        ])
+        await measure("nearest_centroid", [
+            f"/api/nearest-village?lat={v.latitude}&long={max_lon + 0.5}" for v in sample
+        ])
+        await measure("boundaries", ["/api/boundaries"] * max(10, requests // 10))
+
+        # Which lookup path actually answered (geofence data may be missing)
+        methods = {}
+        for name, lon_of in (("nearest_geofence", lambda v: v.longitude), ("nearest_fuzzy", lambda v: max_lon + 0.002),
+                             ("nearest_centroid", lambda v: max_lon + 0.5)):
+            v = edge[0] if name == "nearest_fuzzy" else sample[0]
+            with contextlib.redirect_stdout(io.StringIO()):
+                response = await client.get(f"/api/nearest-village?lat={v.latitude}&long={lon_of(v)}")
+            methods[name] = response.json().get("method") if response.status_code == 200 else None
+        for name, method in methods.items():
+            results[name]["method"] = method
+
+    # Offline job, timed here rather than asserted in the test suite
+    from backend.services.personas import build_insights, columns_from_documents
+    docs = [v.model_dump(by_alias=True) for v in villages]
+    latencies = []
+    for _ in range(cold_runs):
+        start = time.perf_counter()
+        build_insights(columns_from_documents(docs))
+        latencies.append(time.perf_counter() - start)
+    results["personas_batch"] = summarize(latencies, [], [])
+
+    await on_shutdown()
+
+    return {
+        "villages": len(villages),
+        "boundaries": len(geofence_service._features),
+        "startup_s": round(startup_s, 3),
+        "boundaries_load_s": round(boundaries_load_s, 3),
+        "rss_mb_before_startup": rss_before,
+        "rss_mb_after": rss_mb(),
+        "peak_rss_mb": peak_rss_mb(),
+        "endpoints": results,
+    }
+
+# ==========================================
+# ORCHESTRATION
+# ==========================================
+
+def dataset_for(scale: str, seed: int):
+    """
+    (csv_path, geojson_path) for a scale name: "real" or one of the generator scales / a number.
+    """
+    from backend.services.podes import CSV_FILE_PATH
+    if scale == "real":
+        return CSV_FILE_PATH, REAL_GEOJSON
+
+    spec = importlib.util.spec_from_file_location(
+        "generate_synthetic_podes", os.path.join(ROOT, "scripts", "generate_synthetic_podes.py"))
+    generator = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(generator)
+    n = generator.SCALES.get(scale) or int(scale)
+    csv_path = os.path.join(generator.DEFAULT_OUT_DIR, f"podes_synthetic_{n}.csv")
+    geojson_path = os.path.join(generator.DEFAULT_OUT_DIR, f"peta_desa_synthetic_{n}.geojson")
+    if not (os.path.exists(csv_path) and os.path.exists(geojson_path)):
+        print(f"Generating {n} synthetic villages...")
+        generator.generate(n, generator.DEFAULT_OUT_DIR, seed, per_regency=False)
+    return csv_path, geojson_path
+
+def prepare_mongo(scale: str, csv_path: str) -> str:
+    """
+    Loads the dataset into its own database (indest_bench_<scale>) and returns the name.
+    """
+    db_name = f"indest_bench_{scale}"
+    env = dict(os.environ, MONGODB_DB_NAME=db_name, INDEST_STORAGE="mongo")
+    subprocess.run([sys.executable, os.path.join(ROOT, "scripts", "import_csv_to_mongo.py"),
+                    "--csv", csv_path, "--restart", "--checkpoint", os.path.join(tempfile.gettempdir(), f"{db_name}.ckpt")],
+                   env=env, check=True, stdout=subprocess.DEVNULL)
+    return db_name
+
+def run_worker(scale: str, args) -> dict:
+    csv_path, geojson_path = dataset_for(scale, args.seed)
+    env = dict(os.environ, INDEST_GEOJSON_PATH=geojson_path, REPOSITORY_REFRESH_SECONDS="3600")
+    if args.storage == "embedded":
+        env.update(INDEST_STORAGE="embedded", INDEST_CSV_PATH=csv_path, INDEST_CACHE_PATH="")
+    else:
+        env.update(INDEST_STORAGE="mongo", MONGODB_DB_NAME=prepare_mongo(scale, csv_path))
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        result_path = f.name
+    try:
+        subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--worker", result_path,
+             "--requests", str(args.requests), "--cold-runs", str(args.cold_runs), "--seed", str(args.seed)],
+            env=env, cwd=ROOT, check=True,
+        )
+        with open(result_path, encoding="utf-8") as f:
+            result = json.load(f)
+    finally:
+        os.remove(result_path)
+    result["scale"] = scale
+    result["csv"] = os.path.relpath(csv_path, ROOT)
+    return result
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return ""
+
+def compare(previous: dict, current: dict, threshold: float):
+    """
+    Prints p50/p95 changes per scale and endpoint; returns the regressions above threshold.
+    """
+    regressions = []
+    old = {r["scale"]: r for r in previous.get("results", [])}
+    for result in current["results"]:
+        before = old.get(result["scale"])
+        if not before:
+            continue
+        for endpoint, stats in result["endpoints"].items():
+            prev = before["endpoints"].get(endpoint)
+            if not prev:
+                continue
+            for key in ("p50_ms", "p95_ms"):
+                if prev[key] <= 0:
+                    continue
+                change = (stats[key] - prev[key]) / prev[key]
+                marker = "  <-- regression" if change > threshold else ""
+                print(f"{result['scale']:>6} {endpoint:<18} {key}: {prev[key]:>9.3f} -> {stats[key]:>9.3f} ({change:+.0%}){marker}")
+                if marker:
+                    regressions.append((result["scale"], endpoint, key, change))
+    return regressions
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark API endpoints at several dataset sizes.")
+    parser.add_argument("--scales", default="real,1k,10k", help="Comma separated: real, 1k, 10k, 84k or a village count")
+    parser.add_argument("--storage", choices=["embedded", "mongo"], default="embedded")
+    parser.add_argument("--requests", type=int, default=DEFAULT_REQUESTS, help="Requests per endpoint")
+    parser.add_argument("--cold-runs", type=int, default=DEFAULT_COLD_RUNS)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--out", default=None, help="Write results as JSON to this path")
+    parser.add_argument("--compare", default=None, help="Previous results JSON to diff against")
+    parser.add_argument("--regression-threshold", type=float, default=0.25, help="Relative slowdown reported as a regression")
+    parser.add_argument("--worker", default=None, help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+
+    if args.worker:
+        result = asyncio.run(run_scale(args.requests, args.cold_runs, args.seed))
+        with open(args.worker, "w", encoding="utf-8") as f:
+            json.dump(result, f)
+        sys.exit(0)
+
+    report = {
+        "meta": {
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "storage": args.storage,
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "requests_per_endpoint": args.requests,
+        },
+        "results": [],
+    }
+    for scale in [s.strip() for s in args.scales.split(",") if s.strip()]:
+        print(f"== scale {scale} ({args.storage})")
+        result = run_worker(scale, args)
+        report["results"].append(result)
+        for name, stats in result["endpoints"].items():
+            print(f"  {name:<18} p50 {stats['p50_ms']:>9.3f} ms  p95 {stats['p95_ms']:>9.3f} ms  "
+                  f"{stats['throughput_rps']:>9.1f} req/s  {stats.get('method') or ''}")
+        print(f"  startup {result['startup_s']}s, peak RSS {result['peak_rss_mb']} MB")
+
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.out}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            regressions = compare(json.load(f), report, args.regression_threshold)
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,167 @@
+"""
+Cost / quality comparison of the AI prompt modes (full vs compact).
+
+A sample of villages from the PODES CSV is sent once per mode (response
+cache bypassed). Cost comes from the usage metadata of every call
+(backend/services/ai_usage.py), quality from the answers themselves:
+schema validity, how filled-in the SWOT and recommendations are, whether
+the answer is grounded in the village (mentions its name or district) and
+how often both modes agree on the persona.
+
+    python scripts/compare_prompt_modes.py --sample 50
+    LLM_PROVIDER=stub python scripts/compare_prompt_modes.py --sample 200 --out modes.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
+
+from backend.database import init_db
+from backend.services.ai_service import PROMPT_MODES, build_prompt, estimate_tokens, request_village_insights
+from backend.services.ai_usage import usage_tracker
+from backend.services.db_service import village_ai_payload
+from backend.services.llm import get_provider
+from backend.services.podes import CSV_FILE_PATH, read_villages
+from backend.services.rate_limit import RateLimited
+
+# USD per 1M tokens (gemini-2.5-flash list price; override for other models)
+DEFAULT_PRICE_IN = 0.30
+DEFAULT_PRICE_OUT = 2.50
+MAX_ATTEMPTS = 3
+SWOT_SECTIONS = ("strengths", "weaknesses", "opportunities", "threats")
+
+# ==========================================
+# QUALITY
+# ==========================================
+
+def answer_quality(insights: dict, payload: dict) -> dict:
+    swot = insights.get("swot") or {}
+    text = json.dumps(insights, ensure_ascii=False).lower()
+    grounded = any(str(payload.get(k) or "").lower() in text for k in ("name", "district") if payload.get(k))
+    return {
+        "swot_items": sum(len(swot.get(s) or []) for s in SWOT_SECTIONS),
+        "swot_sections_filled": sum(1 for s in SWOT_SECTIONS if swot.get(s)),
+        "recommendations": len(insights.get("recommendations") or []),
+        "grounded": grounded,
+        "persona": (insights.get("persona") or "").strip().lower(),
+    }
+
+def summarize_quality(answers: dict, sample: int) -> dict:
+    qualities = list(answers.values())
+    n = len(qualities) or 1
+    return {
+        "valid_rate": round(len(qualities) / sample, 4) if sample else 0.0,
+        "avg_swot_items": round(sum(q["swot_items"] for q in qualities) / n, 2),
+        "swot_sections_filled": round(sum(q["swot_sections_filled"] for q in qualities) / n / len(SWOT_SECTIONS), 4),
+        "avg_recommendations": round(sum(q["recommendations"] for q in qualities) / n, 2),
+        "grounded_rate": round(sum(q["grounded"] for q in qualities) / n, 4),
+    }
+
+# ==========================================
+# RUN
+# ==========================================
+
+async def generate(payload: dict, mode: str):
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        try:
+            return await request_village_insights(payload, use_cache=False, mode=mode)
+        except RateLimited as e:
+            await asyncio.sleep(e.retry_after or 2 ** attempt)
+        except ValueError:
+            continue
+    return None
+
+async def run_mode(payloads: dict, mode: str, concurrency: int) -> dict:
+    usage_tracker.reset()
+    semaphore = asyncio.Semaphore(concurrency)
+    answers = {}
+
+    async def one(village_id, payload):
+        async with semaphore:
+            insights = await generate(payload, mode)
+        if insights is not None:
+            answers[village_id] = answer_quality(insights, payload)
+
+    await asyncio.gather(*(one(i, p) for i, p in payloads.items()))
+    return {"answers": answers, "usage": usage_tracker.report(top_regions=0)["total"]}
+
+def cost_usd(usage: dict, price_in: float, price_out: float) -> float:
+    return (usage["prompt_tokens"] * price_in + usage["output_tokens"] * price_out) / 1_000_000
+
+async def compare(csv_path: str, sample: int, seed: int, concurrency: int, price_in: float, price_out: float) -> dict:
+    # Villages come straight from the CSV: no database needed
+    os.environ["INDEST_STORAGE"] = "embedded"
+    await init_db()
+    villages = list(read_villages(csv_path))
+    random.Random(seed).shuffle(villages)
+    payloads = {v.id: village_ai_payload(v) for v in villages[:sample]}
+    provider = get_provider()
+    print(f"Comparing {PROMPT_MODES} on {len(payloads)} villages with {provider.name}:{provider.model}...")
+
+    results = {}
+    for mode in PROMPT_MODES:
+        run = await run_mode(payloads, mode, concurrency)
+        usage = run["usage"]
+        results[mode] = {
+            "input_tokens_estimated": sum(estimate_tokens(build_prompt(p, mode)) for p in payloads.values()),
+            "usage": usage,
+            "cost_usd": round(cost_usd(usage, price_in, price_out), 6),
+            "cost_per_1k_villages_usd": round(cost_usd(usage, price_in, price_out) / max(1, len(payloads)) * 1000, 4),
+            "quality": summarize_quality(run["answers"], len(payloads)),
+            "_answers": run["answers"],
+        }
+
+    full, compact = (results[m].pop("_answers") for m in PROMPT_MODES)
+    both = [i for i in full if i in compact]
+    agreement = sum(full[i]["persona"] == compact[i]["persona"] for i in both) / len(both) if both else 0.0
+    full_tokens = results["full"]["usage"]["prompt_tokens"]
+    return {
+        "villages": len(payloads),
+        "provider": f"{provider.name}:{provider.model}",
+        "price_per_1m_tokens": {"input": price_in, "output": price_out},
+        "modes": results,
+        "persona_agreement": round(agreement, 4),
+        "prompt_token_savings": round(1 - results["compact"]["usage"]["prompt_tokens"] / full_tokens, 4) if full_tokens else 0.0,
+    }
+
+def print_table(report: dict):
+    print(f"\n{'mode':<9} {'prompt tok':>11} {'output tok':>11} {'tok/village':>12} {'p50 ms':>8} "
+          f"{'cost/1k $':>10} {'valid':>7} {'swot':>6} {'recs':>6} {'grounded':>9}")
+    for mode, r in report["modes"].items():
+        u, q = r["usage"], r["quality"]
+        print(f"{mode:<9} {u['prompt_tokens']:>11} {u['output_tokens']:>11} {u['tokens_per_village']:>12} "
+              f"{u['latency_ms']['p50']:>8} {r['cost_per_1k_villages_usd']:>10} {q['valid_rate']:>7.2%} "
+              f"{q['avg_swot_items']:>6} {q['avg_recommendations']:>6} {q['grounded_rate']:>9.2%}")
+    print(f"\nPrompt tokens saved by compact mode: {report['prompt_token_savings']:.1%}; "
+          f"persona agreement: {report['persona_agreement']:.1%}")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Compare cost and quality of the AI prompt modes.")
+    parser.add_argument("--csv", default=CSV_FILE_PATH)
+    parser.add_argument("--sample", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--price-in", type=float, default=DEFAULT_PRICE_IN, help="USD per 1M input tokens")
+    parser.add_argument("--price-out", type=float, default=DEFAULT_PRICE_OUT, help="USD per 1M output tokens")
+    parser.add_argument("--out", default=None, help="Write the report as JSON to this path")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(compare(args.csv, args.sample, args.seed, args.concurrency, args.price_in, args.price_out))
+    print_table(report)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.out}")
@@ -0,0 +1,75 @@
+import asyncio
+import os
+import sys
+
+# Add parent dir
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
+
+from backend.database import init_db, get_database
+from backend.models import Village
+
+def plan_stages(plan) -> list:
+    """
+    Flattens every `stage` name found in an explain() plan tree.
+    """
+    stages = []
+    if isinstance(plan, dict):
+        if "stage" in plan:
+            stages.append(plan["stage"])
+        for value in plan.values():
+            stages.extend(plan_stages(value))
+    elif isinstance(plan, list):
+        for item in plan:
+            stages.extend(plan_stages(item))
+    return stages
+
+def winning_plan(explain: dict) -> dict:
+    # find() explain vs aggregate() explain (first stage holds the cursor plan)
+    if "queryPlanner" in explain:
+        return explain["queryPlanner"]["winningPlan"]
+    for stage in explain.get("stages", []):
+        if "$cursor" in stage:
+            return stage["$cursor"]["queryPlanner"]["winningPlan"]
+    return explain
+
+async def explain_read_paths() -> bool:
+    """
+    Explains the queries the API still sends to Mongo (everything else is
+    served from the repository snapshot, trends included): MongoVillageStore's
+    version check and delta load.
+    """
+    await init_db()
+    db = get_database()
+    collection = Village.get_settings().name
+
+    sample = await Village.find_one({})
+    if not sample:
+        print("No villages found. Import data first.")
+        return False
+
+    checks = [
+        ("version check (newest updated_at)",
+         {"find": collection, "filter": {}, "sort": {"updated_at": -1}, "limit": 1}),
+        ("delta load (updated_at since)",
+         {"find": collection, "filter": {"updated_at": {"$gte": sample.updated_at}}}),
+    ]
+
+    all_ok = True
+    for label, query in checks:
+        result = await db.command({"explain": query, "verbosity": "queryPlanner"})
+        stages = plan_stages(winning_plan(result))
+        uses_index = any(s in ("IXSCAN", "EXPRESS_IXSCAN") for s in stages)
+        all_ok &= uses_index and "COLLSCAN" not in stages
+        print(f"[{'OK' if uses_index else 'SCAN'}] {label}: {' <- '.join(stages)}")
+
+    return all_ok
+
+if __name__ == "__main__":
+    ok = asyncio.run(explain_read_paths())
+    sys.exit(0 if ok else 1)
@@ -1,109 +1,87 @@
-from sqlmodel import Session, select
-from backend.database import get_session, engine
+"""
+Rule-based personas for every village, without any model call.
+
+One projection query over the Mongo `Village` collection, the rules of
+backend/services/personas.py evaluated on columns in a single pass, and one
+unordered bulk write of the resulting `ai_analysis` (persona, narrative,
+SWOT, recommendations; other analysis fields are kept).
+
+    python scripts/generate_smart_personas.py                 # every village
+    python scripts/generate_smart_personas.py --missing       # only villages without insights
+    python scripts/generate_smart_personas.py --prefix 3524 --dry-run
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from datetime import datetime
+
+from pymongo import UpdateOne
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
+
+from backend.database import init_db
 from backend.models import AIAnalysis, Village
-import random
-
-def generate_smart_persona(village: Village) -> dict:
-    # 1. Determine Base Identity from Economy & Topography
-    income = (village.economy.primary_income if village.economy else "Umum").lower()
-    topo = (village.topography or "Dataran").lower()
-    
-    identity = "Desa Mandiri"
-    if "pertanian" in income:
-        if "lereng" in topo or "puncak" in topo:
-            identity = "Agrowisata Pegunungan"
-        else:
-            identity = "Lumbung Pangan Lestari"
-    elif "perkebunan" in income:
-        identity = "Sentra Perkebunan Rakyat"
-    elif "perikanan" in income:
-        identity = "Kampung Nelayan Modern" if "laut" in topo else "Minapolitan Darat"
-    elif "perdagangan" in income or (village.economy and village.economy.markets > 0):
-        identity = "Simpul Perniagaan"
-    elif "industri" in income:
-        identity = "Desa Kreatif-Produktif"
-    
-    # 2. Add Modifier based on Status/Digital
-    modifier = ""
-    is_digital = village.digital and "4g" in (village.digital.signal_strength or "").lower()
-    is_advanced = village.status == "Mandiri"
-    
-    if is_digital and is_advanced:
-        modifier = "Digital"
-    elif is_advanced:
-        modifier = "Unggulan"
-    elif is_digital:
-        modifier = "Terkoneksi"
-    
-    final_persona = f"{identity} {modifier}".strip()
-    
-    # 3. Construct Narrative
-    geo_desc = f"di wilayah {topo}"
-    strength = "semangat gotong royong"
-    if village.health and village.health.posyandu > 5:
-        strength = "kepedulian kesehatan"
-    if village.education and village.education.universities > 0:
-        strength = "fokus pendidikan"
-        
-    narrative = (
-        f"Masyarakat {village.name} yang terletak {geo_desc} memiliki {strength} yang kuat. "
-        f"Mereka bahu-membahu mengembangkan potensi {income} sebagai pilar ekonomi utama, "
-        f"menjadikan desa ini sebagai {final_persona} yang tangguh."
-    )
-    
-    # 4. Synthesize SWOT (Simplified rules)
-    swot = {
-        "strengths": [f"Potensi {income} yang melimpah", "Modal sosial warga yang kuat"],
-        "weaknesses": ["Keterbatasan akses pasar global", "Perlu peningkatan infrastruktur"],
-        "opportunities": ["Digitalisasi produk desa", "Pengembangan ekowisata"],
-        "threats": ["Fluktuasi harga komoditas", "Perubahan iklim"]
-    }
-
-    if is_digital:
-        swot["strengths"].append("Konektivitas internet yang baik")
-        swot["opportunities"].append("Pemasaran online via marketplace")
-    else:
-        swot["weaknesses"].append("Sinyal komunikasi belum merata")
-
-    return {
-        "persona": final_persona,
-        "social_capital_narrative": narrative,
-        "swot_analysis": swot,
-        "recommendations": {"recommendations": ["Optimalisasi BUMDes", "Pelatihan SDM"]}
-    }
-
-def apply_smart_personas():
-    with Session(engine) as session:
-        villages = session.exec(select(Village)).all()
-        count = 0
-        
-        print(f"Analyzing {len(villages)} villages...")
-        
-        for v in villages:
-            # Generate tailored insights
-            insights = generate_smart_persona(v)
-            
-            if not v.ai_analysis:
-                analysis = AIAnalysis(
-                    village_id=v.id,
-                    persona=insights["persona"],
-                    social_capital_narrative=insights["social_capital_narrative"],
-                    swot_analysis=insights["swot_analysis"],
-                    recommendations=insights["recommendations"]
-                )
-                session.add(analysis)
-            else:
-                # Update existing
-                v.ai_analysis.persona = insights["persona"]
-                v.ai_analysis.social_capital_narrative = insights["social_capital_narrative"]
-                v.ai_analysis.swot_analysis = insights["swot_analysis"]
-                v.ai_analysis.recommendations = insights["recommendations"]
-                session.add(v.ai_analysis)
-            
-            count += 1
-            
-        session.commit()
-        print(f"Successfully synthesized unique personas for {count} villages.")
+from backend.services.db_service import MISSING_INSIGHTS
+from backend.services.personas import PERSONA_PROJECTION, build_insights, columns_from_documents, persona_counts
+
+
+def build_query(district=None, prefix=None, missing=False) -> dict:
+    query = dict(MISSING_INSIGHTS) if missing else {}
+    if district:
+        query["district"] = district
+    if prefix:
+        query["_id"] = {"$regex": f"^{prefix}"}
+    return query
+
+
+async def apply_smart_personas(district=None, prefix=None, missing=False, dry_run=False):
+    await init_db()
+    collection = Village.get_motor_collection()
+
+    t0 = time.perf_counter()
+    docs = await collection.find(build_query(district, prefix, missing), PERSONA_PROJECTION).to_list(None)
+    t1 = time.perf_counter()
+    insights = build_insights(columns_from_documents(docs))
+    t2 = time.perf_counter()
+    print(f"Analyzed {len(docs)} villages: load {t1 - t0:.3f}s, rules {t2 - t1:.3f}s")
+
+    for persona, count in persona_counts(insights).items():
+        print(f"  {count:>6}  {persona}")
+    if dry_run or not docs:
+        return
+
+    now = datetime.utcnow()
+    empty = AIAnalysis().model_dump()
+    ops = [
+        UpdateOne(
+            {"_id": doc["_id"]},
+            {"$set": {"ai_analysis": {**empty, **(doc.get("ai_analysis") or {}), **item}, "updated_at": now}},
+        )
+        for doc, item in zip(docs, insights)
+    ]
+    result = await collection.bulk_write(ops, ordered=False)
+    t3 = time.perf_counter()
+    print(f"Updated {result.modified_count} villages in {t3 - t2:.3f}s (total {t3 - t0:.3f}s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Rule-based personas for every village (no AI calls).")
+    parser.add_argument("--district", default=None, help="Only this district (NAMA_KEC)")
+    parser.add_argument("--prefix", default=None, help="Only village ids with this prefix (e.g. a regency code)")
+    parser.add_argument("--missing", action="store_true", help="Only villages without generated insights")
+    parser.add_argument("--dry-run", action="store_true", help="Evaluate and report without writing")
+    return parser.parse_args()
+
 
 if __name__ == "__main__":
-    apply_smart_personas()
+    args = parse_args()
+    asyncio.run(apply_smart_personas(args.district, args.prefix, args.missing, args.dry_run))
@@ -0,0 +1,273 @@
+"""
+Synthetic PODES generator for scale testing (1k / 10k / 84k villages).
+
+Villages are bootstrapped from the real extract (data/podes_dashboard_data.csv):
+each synthetic row starts from a random real row, numeric columns are jittered
+and a share of them resampled from the column's real distribution, so both the
+marginals and the typical co-occurrences stay realistic. Villages are laid out
+over a region with the real village density, grouped spatially into
+districts / regencies / provinces (IDDESA = 2+2+3+3 digits), and given
+non-overlapping Voronoi boundaries.
+
+Outputs (same formats as the real data):
+- a CSV accepted by scripts/import_csv_to_mongo.py, scripts/ingest_podes.py
+  and INDEST_CSV_PATH (embedded storage),
+- a GeoJSON (iddesa / nmdesa properties) for GeofenceService via INDEST_GEOJSON_PATH.
+
+    python scripts/generate_synthetic_podes.py --scale 10k
+    python scripts/generate_synthetic_podes.py --villages 84000 --per-regency
+"""
+import argparse
+import csv
+import json
+import math
+import os
+import random
+import sys
+import time
+
+import shapely
+from shapely.geometry import MultiPoint, box, mapping
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.services.podes import CSV_FILE_PATH
+
+SCALES = {"1k": 1_000, "10k": 10_000, "84k": 84_000}
+DEFAULT_OUT_DIR = os.path.join(os.path.dirname(CSV_FILE_PATH), "synthetic")
+
+# Roughly national averages (84k villages, ~7.2k districts, ~514 regencies, 38 provinces)
+VILLAGES_PER_DISTRICT = 12
+DISTRICTS_PER_REGENCY = 14
+REGENCIES_PER_PROVINCE = 14
+
+# Share of numeric columns resampled from the column distribution instead of jittered
+RESAMPLE_RATE = 0.15
+JITTER_SIGMA = 0.35
+
+# South-west corner of the synthetic region (degrees)
+ORIGIN_LAT, ORIGIN_LON = -8.6, 105.0
+
+ID_COLUMNS = {"IDDESA", "NAMA_KEC", "NAMA_DESA", "latitude", "longitude"}
+
+# ==========================================
+# REAL DISTRIBUTIONS
+# ==========================================
+
+class ColumnProfile:
+    """
+    Per-column view of the real extract: which columns are integer counts,
+    the observed values to resample from, and name fragments.
+    """
+
+    def __init__(self, csv_path: str):
+        with open(csv_path, mode="r", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            self.header = reader.fieldnames
+            self.rows = list(reader)
+
+        self.values = {}
+        self.integer_columns = set()
+        for column in self.header:
+            values = [r[column] for r in self.rows]
+            self.values[column] = values
+            if column in ID_COLUMNS:
+                continue
+            try:
+                numbers = [float(v) for v in values if v.strip() != ""]
+            except ValueError:
+                continue
+            if numbers and all(n.is_integer() for n in numbers):
+                self.integer_columns.add(column)
+
+        self.value_columns = [(c, c in self.integer_columns) for c in self.header if c not in ID_COLUMNS]
+        self.name_parts = self._split_names(r["NAMA_DESA"] for r in self.rows)
+        self.district_parts = self._split_names({r["NAMA_KEC"] for r in self.rows})
+        lats = [float(r["latitude"]) for r in self.rows]
+        lons = [float(r["longitude"]) for r in self.rows]
+        area = (max(lats) - min(lats)) * (max(lons) - min(lons))
+        self.density = len(self.rows) / area  # villages per square degree
+
+    @staticmethod
+    def _split_names(names):
+        prefixes, suffixes = [], []
+        for name in names:
+            name = name.strip().upper()
+            if len(name) < 4 or " " in name:
+                continue
+            cut = len(name) // 2
+            prefixes.append(name[:cut])
+            suffixes.append(name[cut:])
+        return prefixes, suffixes
+
+# ==========================================
+# GENERATION
+# ==========================================
+
+def make_name(rng: random.Random, parts, used: set) -> str:
+    prefixes, suffixes = parts
+    for _ in range(20):
+        name = rng.choice(prefixes) + rng.choice(suffixes)
+        if name not in used:
+            break
+    used.add(name)
+    return name
+
+def synth_values(rng: random.Random, profile: ColumnProfile) -> dict:
+    template = rng.choice(profile.rows)
+    row = {}
+    for column, is_integer in profile.value_columns:
+        if rng.random() < RESAMPLE_RATE:
+            row[column] = rng.choice(profile.values[column])
+        elif is_integer and template[column].strip():
+            value = float(template[column])
+            row[column] = str(max(0, int(round(value * math.exp(rng.gauss(0, JITTER_SIGMA))))))
+        else:
+            row[column] = template[column]
+    return row
+
+def layout(n: int, density: float, rng: random.Random):
+    """
+    Uniform random centroids over a rectangle sized for the real density.
+    Returns (points, bounds) with points as (lon, lat).
+    """
+    area = n / density
+    height = math.sqrt(area / 1.5)
+    width = area / height
+    bounds = (ORIGIN_LON, ORIGIN_LAT, ORIGIN_LON + width, ORIGIN_LAT + height)
+    points = [(rng.uniform(bounds[0], bounds[2]), rng.uniform(bounds[1], bounds[3])) for _ in range(n)]
+    return points, bounds
+
+def chunk_spatially(indices, points, size: int):
+    """
+    Splits indices into groups of ~size neighbours: vertical strips, then by latitude.
+    """
+    groups = max(1, round(len(indices) / size))
+    strips = max(1, round(math.sqrt(groups)))
+    by_lon = sorted(indices, key=lambda i: points[i][0])
+    per_strip = math.ceil(len(by_lon) / strips)
+    result = []
+    for s in range(strips):
+        strip = sorted(by_lon[s * per_strip:(s + 1) * per_strip], key=lambda i: points[i][1])
+        if not strip:
+            continue
+        per_group = max(1, math.ceil(len(strip) / max(1, round(len(strip) / size))))
+        result.extend(strip[g:g + per_group] for g in range(0, len(strip), per_group))
+    return result
+
+def assign_hierarchy(points, rng: random.Random, profile: ColumnProfile):
+    """
+    Province / regency / district / village codes and names, spatially coherent.
+    Returns a list of (index, iddesa, district_name, village_name, regency_code).
+    """
+    assigned = []
+    per_regency = VILLAGES_PER_DISTRICT * DISTRICTS_PER_REGENCY
+    regencies = chunk_spatially(list(range(len(points))), points, per_regency)
+    district_names = set()
+    for r, regency in enumerate(regencies):
+        province_code = 11 + r // REGENCIES_PER_PROVINCE
+        regency_code = f"{province_code:02d}{1 + r % REGENCIES_PER_PROVINCE:02d}"
+        for d, district in enumerate(chunk_spatially(regency, points, VILLAGES_PER_DISTRICT), start=1):
+            district_name = make_name(rng, profile.district_parts, district_names)
+            village_names = set()
+            for v, index in enumerate(district, start=1):
+                iddesa = f"{regency_code}{d * 10:03d}{v:03d}"
+                assigned.append((index, iddesa, district_name, make_name(rng, profile.name_parts, village_names), regency_code))
+    return assigned
+
+def voronoi_cells(points, bounds):
+    """
+    One non-overlapping polygon per point (same order), clipped to the region.
+    """
+    region = box(*bounds)
+    cells = shapely.get_parts(shapely.voronoi_polygons(MultiPoint(points), extend_to=region, ordered=True))
+    # ~10 cm precision keeps the GeoJSON small
+    return shapely.set_precision(shapely.intersection(cells, region), 1e-6)
+
+# ==========================================
+# OUTPUT
+# ==========================================
+
+def write_csv(path: str, header, rows):
+    with open(path, mode="w", encoding="utf-8", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=header)
+        writer.writeheader()
+        writer.writerows(rows)
+
+def write_geojson(path: str, features):
+    with open(path, mode="w", encoding="utf-8") as f:
+        json.dump({"type": "FeatureCollection", "features": features}, f, separators=(",", ":"))
+
+def generate(n: int, out_dir: str, seed: int, per_regency: bool, csv_source: str = CSV_FILE_PATH) -> dict:
+    rng = random.Random(seed)
+    timings = {}
+
+    t0 = time.perf_counter()
+    profile = ColumnProfile(csv_source)
+    points, bounds = layout(n, profile.density, rng)
+    assigned = assign_hierarchy(points, rng, profile)
+    assigned.sort(key=lambda a: a[1])
+    timings["layout_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    cells = voronoi_cells(points, bounds)
+    timings["voronoi_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    rows, features, by_regency = [], [], {}
+    for index, iddesa, district_name, village_name, regency_code in assigned:
+        lon, lat = points[index]
+        row = synth_values(rng, profile)
+        row.update({
+            "IDDESA": iddesa, "NAMA_KEC": district_name, "NAMA_DESA": village_name,
+            "latitude": f"{lat:.7f}", "longitude": f"{lon:.7f}",
+        })
+        rows.append(row)
+        by_regency.setdefault(regency_code, []).append(row)
+        features.append({
+            "type": "Feature",
+            "properties": {"iddesa": iddesa, "nmdesa": village_name, "nmkec": district_name},
+            "geometry": mapping(cells[index]),
+        })
+    timings["rows_s"] = time.perf_counter() - t0
+
+    t0 = time.perf_counter()
+    os.makedirs(out_dir, exist_ok=True)
+    csv_path = os.path.join(out_dir, f"podes_synthetic_{n}.csv")
+    geojson_path = os.path.join(out_dir, f"peta_desa_synthetic_{n}.geojson")
+    write_csv(csv_path, profile.header, rows)
+    write_geojson(geojson_path, features)
+    regency_dir = None
+    if per_regency:
+        regency_dir = os.path.join(out_dir, f"podes_synthetic_{n}_regencies")
+        os.makedirs(regency_dir, exist_ok=True)
+        for code, regency_rows in by_regency.items():
+            write_csv(os.path.join(regency_dir, f"{code}.csv"), profile.header, regency_rows)
+    timings["write_s"] = time.perf_counter() - t0
+
+    return {
+        "villages": n,
+        "districts": len({r["IDDESA"][:7] for r in rows}),
+        "regencies": len(by_regency),
+        "bounds": bounds,
+        "csv": csv_path,
+        "geojson": geojson_path,
+        "regency_dir": regency_dir,
+        **{k: round(v, 2) for k, v in timings.items()},
+    }
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Generate synthetic PODES villages and Voronoi boundaries.")
+    size = parser.add_mutually_exclusive_group()
+    size.add_argument("--scale", choices=sorted(SCALES), default="1k")
+    size.add_argument("--villages", type=int, help="Exact number of villages (overrides --scale)")
+    parser.add_argument("--out-dir", default=DEFAULT_OUT_DIR)
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--per-regency", action="store_true", help="Also write one CSV per regency (for ingest_podes.py)")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = generate(args.villages or SCALES[args.scale], args.out_dir, args.seed, args.per_regency)
+    print(json.dumps(result, indent=2))
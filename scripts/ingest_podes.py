@@ -0,0 +1,215 @@
+"""
+Columnar, parallel PODES ingestion for national releases (~84k villages).
+
+Each CSV (one per regency or province) is read and mapped in its own worker
+process with the vectorized mapping from backend/services/podes_columnar.py;
+the parent upserts changed villages with concurrent unordered bulk writes as
+soon as each file is mapped.
+
+Needs pandas (pyarrow makes the CSV reader faster):
+    pip install pandas pyarrow
+    python scripts/ingest_podes.py data/podes/ --workers 8
+    python scripts/ingest_podes.py data/podes_dashboard_data.csv --dry-run
+
+For a single small file, scripts/import_csv_to_mongo.py (resumable, with
+deletions) is still the simpler tool.
+"""
+import argparse
+import asyncio
+import glob
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
+
+from backend.models import AIAnalysis
+from backend.services.podes import CSV_FILE_PATH
+from backend.services.podes_columnar import map_file
+
+DEFAULT_BATCH_SIZE = 1000
+DEFAULT_CONCURRENCY = 4
+
+# ==========================================
+# STAGE TIMINGS
+# ==========================================
+
+class StageTimer:
+    """
+    Accumulates seconds per stage; worker stages are summed across processes
+    (CPU time spent), `wall` is the elapsed time of the whole run.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.started = time.perf_counter()
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    def report(self, rows: int) -> dict:
+        wall = time.perf_counter() - self.started
+        return {
+            "rows": rows,
+            "wall_s": round(wall, 3),
+            "rows_per_s": round(rows / wall, 1) if wall else 0.0,
+            "stages_s": {k: round(v, 3) for k, v in self.stages.items()},
+        }
+
+# ==========================================
+# BULK WRITER
+# ==========================================
+
+def document_upsert(doc: dict, now: datetime) -> UpdateOne:
+    """
+    Same write as import_csv_to_mongo.village_upsert, from a raw document.
+    """
+    fields = dict(doc)
+    village_id = fields.pop("_id")
+    fields["updated_at"] = now
+    return UpdateOne(
+        {"_id": village_id},
+        {"$set": fields, "$setOnInsert": {"ai_analysis": AIAnalysis().model_dump()}},
+        upsert=True,
+    )
+
+class BulkWriter:
+    """
+    Upserts documents whose content_hash differs from the stored one, in
+    unordered batches with at most `concurrency` bulk_write calls in flight.
+    """
+
+    def __init__(self, collection, existing_hashes: dict, batch_size: int, concurrency: int, timer: StageTimer):
+        self.collection = collection
+        self.existing = existing_hashes
+        self.batch_size = batch_size
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.timer = timer
+        self.counts = {"inserted": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+    async def _write(self, operations):
+        async with self.semaphore:
+            t0 = time.perf_counter()
+            try:
+                await self.collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                errors = e.details.get("writeErrors", [])
+                self.counts["failed"] += len(errors)
+                for error in errors[:5]:
+                    print(f"  - write error: {error.get('errmsg')}")
+            self.timer.add("write", time.perf_counter() - t0)
+
+    async def write(self, documents):
+        t0 = time.perf_counter()
+        now = datetime.utcnow()
+        operations = []
+        for doc in documents:
+            stored = self.existing.get(doc["_id"], False)
+            if stored == doc["content_hash"]:
+                self.counts["unchanged"] += 1
+                continue
+            self.counts["inserted" if stored is False else "updated"] += 1
+            operations.append(document_upsert(doc, now))
+        self.timer.add("diff", time.perf_counter() - t0)
+
+        await asyncio.gather(*(
+            self._write(operations[i:i + self.batch_size])
+            for i in range(0, len(operations), self.batch_size)
+        ))
+
+# ==========================================
+# PIPELINE
+# ==========================================
+
+def expand_paths(paths):
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, "*.csv"))))
+        else:
+            files.append(path)
+    return files
+
+async def ingest(paths, workers: int, batch_size: int, concurrency: int, dry_run: bool) -> dict:
+    files = expand_paths(paths)
+    missing = [f for f in files if not os.path.exists(f)]
+    if missing or not files:
+        print(f"Error: CSV file(s) not found: {missing or paths}")
+        return {}
+
+    timer = StageTimer()
+    writer = None
+    if not dry_run:
+        from backend.database import init_db
+        from backend.models import Village
+
+        await init_db()
+        collection = Village.get_motor_collection()
+        t0 = time.perf_counter()
+        existing = {}
+        async for doc in collection.find({}, {"content_hash": 1}):
+            existing[doc["_id"]] = doc.get("content_hash")
+        timer.add("load_hashes", time.perf_counter() - t0)
+        writer = BulkWriter(collection, existing, batch_size, concurrency, timer)
+
+    workers = max(1, min(workers, len(files)))
+    print(f"Ingesting {len(files)} file(s) with {workers} worker(s){' (dry run)' if dry_run else ''}...")
+    loop = asyncio.get_running_loop()
+    rows = 0
+    writes = []
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = [loop.run_in_executor(pool, map_file, f) for f in files]
+        for next_done in asyncio.as_completed(pending):
+            path, documents, timings = await next_done
+            for stage, seconds in timings.items():
+                timer.add(stage, seconds)
+            rows += len(documents)
+            print(f"  {os.path.basename(path)}: {len(documents)} villages "
+                  f"(read {timings['read']:.2f}s, map {timings['map']:.2f}s, build {timings['build']:.2f}s)")
+            if writer is not None:
+                # Start writing this file while the others are still being mapped
+                writes.append(asyncio.create_task(writer.write(documents)))
+
+    await asyncio.gather(*writes)
+
+    report = timer.report(rows)
+    report["files"] = len(files)
+    report["workers"] = workers
+    if writer is not None:
+        report["changes"] = writer.counts
+    return report
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Columnar, parallel PODES ingestion into MongoDB.")
+    parser.add_argument("paths", nargs="*", default=[CSV_FILE_PATH], help="CSV files or directories of CSV files")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Mapping processes")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_CONCURRENCY, help="Bulk writes in flight")
+    parser.add_argument("--dry-run", action="store_true", help="Map only, no database")
+    parser.add_argument("--report", default=None, help="Write the timing report as JSON to this path")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    result = asyncio.run(ingest(args.paths, args.workers, args.batch_size, args.concurrency, args.dry_run))
+    if not result:
+        sys.exit(1)
+    print(json.dumps(result, indent=2))
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+    sys.exit(1 if result.get("changes", {}).get("failed") else 0)
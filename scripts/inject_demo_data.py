@@ -1,31 +1,17 @@
+import argparse
 import asyncio
 import os
 import sys
-from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
 
 # Add parent dir
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend.database import init_db
 from backend.models import Village, AIAnalysis
+from backend.services.bulk_patch import BulkPatcher, subdocument_patch
 
-async def init_db_script():
-    mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    db_name = os.getenv("MONGODB_DB_NAME", "indest_db")
-    db = client[db_name]
-    await init_beanie(database=db, document_models=[Village])
-
-async def inject_demo_data():
-    await init_db_script()
-
-    # Target the village used in testing
-    village_id = "3524010001"
-    village = await Village.get(village_id)
-    
-    if not village:
-        print(f"Village {village_id} not found.")
-        return
+async def inject_demo_data(village_id: str = "3524010001", dry_run: bool = False):
+    await init_db()
 
     # Prepare High Quality Mock Data
     mock_data = {
@@ -62,18 +48,24 @@ async def inject_demo_data():
         }
     }
 
-    # Ensure ai_analysis object exists
-    if not village.ai_analysis:
-        village.ai_analysis = AIAnalysis()
+    # Targeted $set of the demo fields (creates ai_analysis if missing)
+    names = []
 
-    # Update fields
-    village.ai_analysis.persona = mock_data["persona"]
-    village.ai_analysis.social_capital_narrative = mock_data["social_capital_narrative"]
-    village.ai_analysis.swot_analysis = mock_data["swot_analysis"]
-    village.ai_analysis.recommendations = mock_data["recommendations"]
-    
-    await village.save()
-    print(f"Successfully injected demo AI data for Village {village.name}")
+    def patch(doc):
+        names.append(doc.get("name"))
+        return subdocument_patch(doc, "ai_analysis", mock_data, AIAnalysis().model_dump())
+
+    patcher = BulkPatcher(Village.get_motor_collection(), dry_run=dry_run)
+    stats = await patcher.run({"_id": village_id}, {"name": 1, "ai_analysis.persona": 1}, patch)
+
+    if not names:
+        print(f"Village {village_id} not found.")
+        return
+    print(f"Successfully injected demo AI data for Village {names[0]} ({stats.summary()})")
 
 if __name__ == "__main__":
-    asyncio.run(inject_demo_data())
+    parser = argparse.ArgumentParser(description="Write demo AI insights for one village (the populate_all.py template).")
+    parser.add_argument("--village-id", default="3524010001", help="Target the village used in testing by default")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(inject_demo_data(args.village_id, args.dry_run))
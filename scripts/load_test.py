@@ -0,0 +1,361 @@
+"""
+Async load generator replaying dashboard traffic.
+
+Virtual users loop over sessions modelled on what the frontend does:
+- open_dashboard: /api/macro + /api/boundaries in parallel (MacroDashboard, first visit)
+- revisit: /api/macro only (boundaries cached in the browser)
+- geolocate: a burst of /api/nearest-village calls around one position
+  (App.jsx watchPosition fires repeatedly while GPS accuracy improves)
+- drill_down: typeahead /api/search per keystroke, then /api/micro/{id} and its trend
+- request_insights: POST /api/micro/{id}/insights and poll the job (mix "ai";
+  LLM_PROVIDER=stub keeps it offline)
+
+A traffic mix weights those sessions; concurrency ramps through stages.
+Per stage and route: p50/p95/p99, throughput and error rate.
+
+Fully offline against a locally started app:
+    python scripts/load_test.py --start-server --workers 2 --stages 10:20,50:30,100:30
+    python scripts/load_test.py --base-url http://127.0.0.1:8000 --mix field_survey --out load.json
+
+    python scripts/load_test.py --in-process --stages 20:10
+    LLM_PROVIDER=stub python scripts/load_test.py --in-process --mix ai
+
+--start-server runs uvicorn with INDEST_STORAGE=embedded unless --storage mongo is given;
+--in-process imports the app directly (storage from the environment / backend/.env).
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# Add the parent directory to sys.path to allow imports from backend (--in-process)
+sys.path.append(ROOT)
+
+# Session weights per named mix
+MIXES = {
+    # District officers opening the dashboard and browsing villages
+    "dashboard": {"open_dashboard": 3, "revisit": 3, "geolocate": 2, "drill_down": 4, "request_insights": 0},
+    # Field staff on phones: mostly geolocation, little browsing
+    "field_survey": {"open_dashboard": 1, "revisit": 1, "geolocate": 8, "drill_down": 2, "request_insights": 0},
+    # Analysts comparing villages
+    "analyst": {"open_dashboard": 1, "revisit": 2, "geolocate": 0, "drill_down": 9, "request_insights": 0},
+    # On-demand AI generation (run offline with LLM_PROVIDER=stub)
+    "ai": {"open_dashboard": 1, "revisit": 1, "geolocate": 0, "drill_down": 4, "request_insights": 4},
+}
+
+INSIGHT_POLL_S = 0.25
+INSIGHT_JOB_TIMEOUT_S = 60
+GEOLOCATION_BURST = (3, 6)          # watchPosition updates per session
+GPS_JITTER_DEG = 0.0005             # ~50 m
+ROUTE_PATTERNS = [
+    (re.compile(r"^/api/micro/[^/]+/insights$"), "/api/micro/{id}/insights"),
+    (re.compile(r"^/api/insights/jobs/[^/]+$"), "/api/insights/jobs/{id}"),
+    (re.compile(r"^/api/micro/[^/]+/trend$"), "/api/micro/{id}/trend"),
+    (re.compile(r"^/api/micro/[^/]+$"), "/api/micro/{id}"),
+]
+
+# ==========================================
+# STATS
+# ==========================================
+
+def percentile(sorted_values, p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = (len(sorted_values) - 1) * p / 100
+    lo, hi = int(k), min(int(k) + 1, len(sorted_values) - 1)
+    return sorted_values[lo] + (sorted_values[hi] - sorted_values[lo]) * (k - lo)
+
+def route_of(path: str) -> str:
+    path = path.split("?", 1)[0]
+    for pattern, name in ROUTE_PATTERNS:
+        if pattern.match(path):
+            return name
+    return path
+
+class StageStats:
+    def __init__(self, name: str, users: int):
+        self.name = name
+        self.users = users
+        self.samples = {}   # route -> [latency_s]
+        self.errors = {}    # route -> {reason: count}
+        self.started = time.perf_counter()
+        self.finished = None
+
+    def record(self, route: str, latency: float, error: str = None):
+        self.samples.setdefault(route, []).append(latency)
+        if error:
+            bucket = self.errors.setdefault(route, {})
+            bucket[error] = bucket.get(error, 0) + 1
+
+    def report(self) -> dict:
+        elapsed = (self.finished or time.perf_counter()) - self.started
+        routes = {}
+        for route, latencies in sorted(self.samples.items()):
+            ms = sorted(l * 1000 for l in latencies)
+            errors = sum(self.errors.get(route, {}).values())
+            routes[route] = {
+                "requests": len(ms),
+                "rps": round(len(ms) / elapsed, 1) if elapsed else 0.0,
+                "p50_ms": round(percentile(ms, 50), 2),
+                "p95_ms": round(percentile(ms, 95), 2),
+                "p99_ms": round(percentile(ms, 99), 2),
+                "max_ms": round(ms[-1], 2),
+                "error_rate": round(errors / len(ms), 4),
+                "errors": self.errors.get(route, {}),
+            }
+        total = sum(r["requests"] for r in routes.values())
+        total_errors = sum(sum(e.values()) for e in self.errors.values())
+        return {
+            "stage": self.name,
+            "users": self.users,
+            "duration_s": round(elapsed, 1),
+            "requests": total,
+            "rps": round(total / elapsed, 1) if elapsed else 0.0,
+            "error_rate": round(total_errors / total, 4) if total else 0.0,
+            "routes": routes,
+        }
+
+# ==========================================
+# VIRTUAL USER
+# ==========================================
+
+class VirtualUser:
+    def __init__(self, client: httpx.AsyncClient, catalog: dict, mix: dict, think_s: float, rng: random.Random):
+        self.client = client
+        self.catalog = catalog
+        self.sessions = [name for name, weight in mix.items() if weight > 0]
+        self.weights = [mix[name] for name in self.sessions]
+        self.think_s = think_s
+        self.rng = rng
+
+    async def get(self, stats: StageStats, path: str, params: dict = None, ok=(200,), method: str = "GET"):
+        route = route_of(path)
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, path, params=params)
+            await response.aread()
+            error = None if response.status_code in ok else f"http_{response.status_code}"
+            latency = time.perf_counter() - start
+            stats.record(route, latency, error)
+            return response if error is None else None
+        except httpx.HTTPError as e:
+            stats.record(route, time.perf_counter() - start, type(e).__name__)
+            return None
+
+    async def think(self, factor: float = 1.0):
+        if self.think_s > 0:
+            await asyncio.sleep(self.rng.expovariate(1 / (self.think_s * factor)))
+
+    # ---------- sessions ----------
+
+    async def open_dashboard(self, stats):
+        await asyncio.gather(self.get(stats, "/api/macro"), self.get(stats, "/api/boundaries", ok=(200, 404)))
+
+    async def revisit(self, stats):
+        await self.get(stats, "/api/macro")
+
+    async def geolocate(self, stats):
+        lat, lon = self.rng.choice(self.catalog["points"])
+        for _ in range(self.rng.randint(*GEOLOCATION_BURST)):
+            params = {"lat": lat + self.rng.uniform(-GPS_JITTER_DEG, GPS_JITTER_DEG),
+                      "long": lon + self.rng.uniform(-GPS_JITTER_DEG, GPS_JITTER_DEG)}
+            await self.get(stats, "/api/nearest-village", params=params)
+            await self.think(0.3)
+
+    async def drill_down(self, stats):
+        village_id, name = self.rng.choice(self.catalog["villages"])
+        # Debounced typeahead: a request every couple of keystrokes
+        for end in range(2, min(len(name), 8) + 1, 2):
+            await self.get(stats, "/api/search", params={"q": name[:end].lower(), "limit": 10})
+        await self.think(0.5)
+        await self.get(stats, f"/api/micro/{village_id}")
+        await self.get(stats, f"/api/micro/{village_id}/trend")
+
+    async def request_insights(self, stats):
+        """
+        Fresh AI analysis from the micro dashboard: enqueue, then poll the job.
+        The end-to-end time is recorded as "insight job (end-to-end)".
+        """
+        village_id, _ = self.rng.choice(self.catalog["villages"])
+        start = time.perf_counter()
+        response = await self.get(stats, f"/api/micro/{village_id}/insights", params={"force": "true"},
+                                  ok=(200, 202), method="POST")
+        if response is None:
+            return
+        job = response.json()
+        while job["status"] in ("queued", "running") and time.perf_counter() - start < INSIGHT_JOB_TIMEOUT_S:
+            await asyncio.sleep(INSIGHT_POLL_S)
+            response = await self.get(stats, f"/api/insights/jobs/{job['job_id']}")
+            if response is None:
+                return
+            job = response.json()
+        error = None if job["status"] == "done" else f"job_{job['status']}"
+        stats.record("insight job (end-to-end)", time.perf_counter() - start, error)
+
+    async def run(self, stats: StageStats, deadline: float):
+        while time.perf_counter() < deadline:
+            session = self.rng.choices(self.sessions, weights=self.weights)[0]
+            await getattr(self, session)(stats)
+            await self.think()
+
+# ==========================================
+# RUNNER
+# ==========================================
+
+async def load_catalog(client: httpx.AsyncClient) -> dict:
+    """
+    Village ids, names and coordinates, taken from /api/macro like the frontend does.
+    """
+    response = await client.get("/api/macro")
+    response.raise_for_status()
+    rows = response.json()["data"]
+    return {
+        "villages": [(v["id"], v["name"]) for v in rows],
+        "points": [(v["latitude"], v["longitude"]) for v in rows if v["latitude"] or v["longitude"]],
+    }
+
+def parse_stages(spec: str):
+    """
+    "10:30,50:60" -> [(10 users, 30 s), (50 users, 60 s)]
+    """
+    stages = []
+    for part in spec.split(","):
+        users, seconds = part.split(":")
+        stages.append((int(users), float(seconds)))
+    return stages
+
+async def run_load(base_url: str, stages, mix: dict, think_s: float, seed: int, timeout: float, in_process: bool = False) -> dict:
+    peak_users = max(u for u, _ in stages)
+    limits = httpx.Limits(max_connections=peak_users, max_keepalive_connections=peak_users)
+    transport = None
+    if in_process:
+        # Same event loop as the load generator: measures handler cost, not the network stack
+        from backend.main import app, on_startup
+        await on_startup()
+        transport = httpx.ASGITransport(app=app)
+        base_url = "http://loadtest"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=timeout, limits=limits, transport=transport) as client:
+            return await run_stages(client, base_url, stages, mix, think_s, seed)
+    finally:
+        if in_process:
+            from backend.main import on_shutdown
+            await on_shutdown()
+
+async def run_stages(client: httpx.AsyncClient, base_url: str, stages, mix: dict, think_s: float, seed: int) -> dict:
+    catalog = await load_catalog(client)
+    print(f"Catalog: {len(catalog['villages'])} villages from {base_url}")
+
+    reports = []
+    for index, (users, seconds) in enumerate(stages, start=1):
+        stats = StageStats(f"stage {index}", users)
+        deadline = time.perf_counter() + seconds
+        vus = [VirtualUser(client, catalog, mix, think_s, random.Random(seed * 1000 + index * 100 + u)) for u in range(users)]
+        await asyncio.gather(*(vu.run(stats, deadline) for vu in vus))
+        stats.finished = time.perf_counter()
+        report = stats.report()
+        reports.append(report)
+        print_stage(report)
+    return {"stages": reports, "villages": len(catalog["villages"])}
+
+def print_stage(report: dict):
+    print(f"\n== {report['stage']}: {report['users']} users, {report['duration_s']}s, "
+          f"{report['rps']} req/s, errors {report['error_rate']:.2%}")
+    for route, r in report["routes"].items():
+        print(f"  {route:<24} {r['requests']:>6}  {r['rps']:>7.1f}/s  p50 {r['p50_ms']:>8.2f}  "
+              f"p95 {r['p95_ms']:>8.2f}  p99 {r['p99_ms']:>8.2f} ms  err {r['error_rate']:.2%}")
+
+# ==========================================
+# LOCAL SERVER
+# ==========================================
+
+def start_server(port: int, workers: int, storage: str) -> subprocess.Popen:
+    env = dict(os.environ)
+    if storage == "embedded":
+        env.setdefault("INDEST_STORAGE", "embedded")
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.main:app", "--host", "127.0.0.1", "--port", str(port),
+         "--workers", str(workers), "--log-level", "warning", "--no-access-log"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/api/metrics/db-pool", timeout=1).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.3)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become ready within 60s")
+
+def parse_mix(spec: str) -> dict:
+    if spec in MIXES:
+        return MIXES[spec]
+    # "open_dashboard=1,geolocate=5"
+    mix = {name: 0 for name in MIXES["dashboard"]}
+    for part in spec.split(","):
+        name, weight = part.split("=")
+        if name not in mix:
+            raise SystemExit(f"Unknown session '{name}', expected one of {sorted(mix)}")
+        mix[name] = float(weight)
+    return mix
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Replay dashboard traffic mixes against the API.")
+    parser.add_argument("--base-url", default="http://127.0.0.1:8000")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--start-server", action="store_true", help="Start uvicorn locally for the run")
+    target.add_argument("--in-process", action="store_true", help="Drive the app through ASGI in this process (no server, no network)")
+    parser.add_argument("--port", type=int, default=8765, help="Port for --start-server")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers for --start-server")
+    parser.add_argument("--storage", choices=["embedded", "mongo"], default="embedded", help="Storage for --start-server")
+    parser.add_argument("--stages", default="5:15,20:30,50:30", help="users:seconds,... ramp")
+    parser.add_argument("--mix", default="dashboard", help=f"One of {sorted(MIXES)} or session=weight,...")
+    parser.add_argument("--think-ms", type=float, default=500, help="Mean think time between sessions (0 = closed loop)")
+    parser.add_argument("--timeout", type=float, default=30.0, help="Per request timeout (s)")
+    parser.add_argument("--seed", type=int, default=2024)
+    parser.add_argument("--out", default=None, help="Write the report as JSON to this path")
+    return parser.parse_args()
+
+if __name__ == "__main__":
+    args = parse_args()
+    mix = parse_mix(args.mix)
+    stages = parse_stages(args.stages)
+
+    server = None
+    base_url = args.base_url
+    if args.start_server:
+        base_url = f"http://127.0.0.1:{args.port}"
+        server = start_server(args.port, args.workers, args.storage)
+    try:
+        result = asyncio.run(run_load(base_url, stages, mix, args.think_ms / 1000, args.seed, args.timeout, args.in_process))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=10)
+
+    result["meta"] = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "base_url": "in-process" if args.in_process else base_url,
+        "mix": mix,
+        "think_ms": args.think_ms,
+        "workers": args.workers if args.start_server else None,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+        print(f"\nReport written to {args.out}")
+    worst = max((s["error_rate"] for s in result["stages"]), default=0.0)
+    sys.exit(1 if worst > 0.01 else 0)
@@ -1,67 +1,57 @@
+"""
+Copies the demo AI analysis of the template village (inject_demo_data.py)
+to every village without insights, as targeted bulk patches.
+
+    python scripts/populate_all.py
+    python scripts/populate_all.py --dry-run
+"""
+import argparse
 import asyncio
 import os
 import sys
-from motor.motor_asyncio import AsyncIOMotorClient
-from beanie import init_beanie
 
 # Add parent dir
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
+from backend.database import init_db
 from backend.models import Village, AIAnalysis
+from backend.services.bulk_patch import DEFAULT_BATCH_SIZE, BulkPatcher, subdocument_patch
+from backend.services.db_service import MISSING_INSIGHTS
 
-async def init_db_script():
-    mongo_url = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
-    client = AsyncIOMotorClient(mongo_url)
-    db_name = os.getenv("MONGODB_DB_NAME", "indest_db")
-    db = client[db_name]
-    await init_beanie(database=db, document_models=[Village])
+TEMPLATE_ID = "3524010001"
+DEMO_FIELDS = ("persona", "social_capital_narrative", "swot_analysis", "recommendations")
 
-async def populate_all_demo_data():
-    await init_db_script()
+async def populate_all_demo_data(dry_run: bool = False, batch_size: int = DEFAULT_BATCH_SIZE):
+    await init_db()
 
     # 1. Get the High Quality Demo Data from our template village
-    template_id = "3524010001" 
-    template_village = await Village.get(template_id)
-    
+    template_village = await Village.get(TEMPLATE_ID)
+
     if not template_village or not template_village.ai_analysis or not template_village.ai_analysis.persona:
         print("Template data missing or invalid! Run inject_demo_data.py first.")
         return
 
-    demo_analysis = template_village.ai_analysis
+    demo = template_village.ai_analysis.model_dump(include=set(DEMO_FIELDS))
+    empty = AIAnalysis().model_dump()
+
+    # 2. Patch every village without insights (missing analysis or empty/unknown persona)
+    patcher = BulkPatcher(Village.get_motor_collection(), batch_size=batch_size, dry_run=dry_run)
+    stats = await patcher.run(
+        {"$and": [MISSING_INSIGHTS, {"_id": {"$ne": TEMPLATE_ID}}]},
+        {"ai_analysis.persona": 1},
+        lambda doc: subdocument_patch(doc, "ai_analysis", demo, empty),
+    )
 
-    # 2. Get all villages
-    villages = await Village.find_all().to_list()
-    count = 0
-    
-    for v in villages:
-        if v.id == template_id:
-            continue
+    for village_id, fields in stats.samples:
+        print(f"  {village_id}: {sorted(fields)}")
+    print(f"Demo AI data: {stats.summary()}")
 
-        changed = False
-        # Create new if missing
-        if not v.ai_analysis:
-            v.ai_analysis = AIAnalysis(
-                persona=demo_analysis.persona,
-                social_capital_narrative=demo_analysis.social_capital_narrative,
-                swot_analysis=demo_analysis.swot_analysis,
-                recommendations=demo_analysis.recommendations
-            )
-            changed = True
-        else:
-            # Update if empty/unknown
-            aa = v.ai_analysis
-            if not aa.persona or aa.persona == "Unknown":
-                aa.persona = demo_analysis.persona
-                aa.social_capital_narrative = demo_analysis.social_capital_narrative
-                aa.swot_analysis = demo_analysis.swot_analysis
-                aa.recommendations = demo_analysis.recommendations
-                changed = True
-        
-        if changed:
-            await v.save()
-            count += 1
-    
-    print(f"Successfully populated demo AI data for {count} villages.")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Copy the template village's demo AI analysis to villages without insights.")
+    parser.add_argument("--dry-run", action="store_true", help="Count the villages to patch without writing")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    asyncio.run(populate_all_demo_data())
+    args = parse_args()
+    asyncio.run(populate_all_demo_data(args.dry_run, args.batch_size))
@@ -0,0 +1,71 @@
+"""
+Trains the village clustering model behind the `cluster` / `cluster_label`
+fields of /api/macro.
+
+Villages are read through the repository (Mongo or INDEST_STORAGE=embedded),
+turned into standardized feature vectors (backend/services/clustering.py) and
+clustered with the numpy k-means of backend/services/kmeans.py (mini-batch
+above --mini-batch-above villages). The scaler and centroids are written to a
+small JSON file that the API loads at startup; the API itself needs no numpy.
+
+    python scripts/train_clusters.py                    # k=5 -> backend/cluster_model.json
+    python scripts/train_clusters.py --k 8 --seed 1 --output /tmp/clusters.json
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+from collections import Counter
+
+# Add the parent directory to sys.path to allow imports from backend
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+# Load .env explicitly from backend directory
+env_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend", ".env")
+load_dotenv(env_path)
+
+from backend.database import init_db
+from backend.services.clustering import feature_vector, train
+from backend.services.repository import village_repository
+from backend.services.scoring import snapshot_features
+
+
+async def train_clusters(k=5, seed=0, batch_size=1024, mini_batch_above=20000, output=None, dry_run=False):
+    await init_db()
+    snapshot = await village_repository.refresh(force=True)
+
+    t0 = time.perf_counter()
+    vectors = [feature_vector(f) for f in snapshot_features(snapshot)]
+    t1 = time.perf_counter()
+    model = train(vectors, k=k, seed=seed, batch_size=batch_size, mini_batch_above=mini_batch_above)
+    t2 = time.perf_counter()
+    print(f"Clustered {model.villages} villages into {model.k}: features {t1 - t0:.3f}s, "
+          f"k-means {t2 - t1:.3f}s ({'mini-batch' if model.mini_batch else 'lloyd'}, "
+          f"{model.iterations} iterations, inertia {model.inertia})")
+
+    sizes = Counter(model.predict(v) for v in vectors)
+    for c, name in enumerate(model.names):
+        centre = ", ".join(f"{f}={z:+.2f}" for f, z in zip(model.features, model.centroids[c]))
+        print(f"  {sizes[c]:>6}  {name:<24} {centre}")
+    if not dry_run:
+        print(f"Saved {model.save(output)}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Train the k-means village clusters served by /api/macro.")
+    parser.add_argument("--k", type=int, default=5, help="Number of clusters")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed (k-means++ and mini-batches)")
+    parser.add_argument("--batch-size", type=int, default=1024, help="Mini-batch size")
+    parser.add_argument("--mini-batch-above", type=int, default=20000,
+                        help="Use mini-batch k-means above this many villages")
+    parser.add_argument("--output", default=None, help="Model file (default CLUSTER_MODEL_PATH or backend/cluster_model.json)")
+    parser.add_argument("--dry-run", action="store_true", help="Train and report without saving")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    asyncio.run(train_clusters(args.k, args.seed, args.batch_size, args.mini_batch_above, args.output, args.dry_run))
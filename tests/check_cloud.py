@@ -1,8 +1,12 @@
 import asyncio
 import os
-from motor.motor_asyncio import AsyncIOMotorClient
+import sys
 from dotenv import load_dotenv
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend.database import get_client, get_pool_stats
+
 async def list_data():
     # Load .env explicitly
     env_path = os.path.join(os.getcwd(), "backend", ".env")
@@ -14,7 +18,7 @@ async def list_data():
 
     # Masking URL for security check
     print(f"Connecting to: {mongo_url.split('@')[-1]}")
-    client = AsyncIOMotorClient(mongo_url)
+    client = get_client()
     
     try:
         dbs = await client.list_database_names()
@@ -46,5 +50,7 @@ async def list_data():
     except Exception as e:
         print(f"Error: {e}")
 
+    print(f"\nPool stats: {get_pool_stats()}")
+
 if __name__ == "__main__":
     asyncio.run(list_data())
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+import time
+
+from backend.services.ai_cache import InsightCache, cache_key
+
+CONFIG = {"temperature": 0.7}
+
+def test_cache_key_is_content_addressed():
+    base = cache_key("T {village_data}", "m", CONFIG, {"name": "A", "markets": 1})
+    # Key order does not matter, any content change does
+    assert base == cache_key("T {village_data}", "m", CONFIG, {"markets": 1, "name": "A"})
+    assert base != cache_key("T {village_data}", "m", CONFIG, {"name": "A", "markets": 2})
+    assert base != cache_key("T2 {village_data}", "m", CONFIG, {"name": "A", "markets": 1})
+    assert base != cache_key("T {village_data}", "m2", CONFIG, {"name": "A", "markets": 1})
+    assert base != cache_key("T {village_data}", "m", {"temperature": 0.2}, {"name": "A", "markets": 1})
+
+def test_hits_misses_and_expiry(tmp_path):
+    cache = InsightCache(str(tmp_path / "ai.sqlite"), ttl_seconds=0.2, max_entries=10)
+    assert cache.get("k") is None
+    cache.put("k", "m", {"persona": "Agraris"})
+    assert cache.get("k") == {"persona": "Agraris"}
+
+    time.sleep(0.25)
+    assert cache.get("k") is None
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["expired"], stats["entries"]) == (1, 2, 1, 0)
+
+def test_lru_eviction(tmp_path):
+    cache = InsightCache(str(tmp_path / "ai.sqlite"), ttl_seconds=3600, max_entries=2)
+    for key in ("a", "b", "c"):
+        cache.put(key, "m", {"key": key})
+        time.sleep(0.01)
+    cache.get("a")  # "b" is now the least recently used
+    assert cache.evict() == 1
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
+
+def test_disabled_cache():
+    cache = InsightCache("", ttl_seconds=60, max_entries=10)
+    cache.put("k", "m", {"persona": "x"})
+    assert cache.get("k") is None
+    assert cache.stats()["enabled"] is False
+
+def test_async_access_runs_off_the_event_loop(tmp_path):
+    cache = InsightCache(str(tmp_path / "ai.sqlite"))
+
+    async def scenario():
+        await cache.aput("k", "m", {"persona": "Agraris"})
+        assert await cache.aget("k") == {"persona": "Agraris"}
+        assert await cache.aget("missing") is None
+
+    asyncio.run(scenario())
+    assert cache.get("k") == {"persona": "Agraris"}
+    assert asyncio.run(InsightCache("").aget("k")) is None
@@ -0,0 +1,94 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.services import ai_service
+from backend.services.ai_cache import insight_cache
+from backend.services.ai_usage import LATENCY_WINDOW, OK, RATE_LIMITED, UsageTracker, usage_tracker
+from backend.services.llm import StubProvider, set_provider
+from backend.services.rate_limit import RateLimited
+
+VILLAGE = {
+    "name": "KEDUNGREJO", "district": "SUKORAME", "forest": None,
+    "demographics": {"health": {"supply": 2, "demand": 0}, "education": {"ratio": 0.0, "status": "Aman"}},
+    "raw_stats": {"markets": 0, "internet": "4G", "disaster_history": {"flood": 0, "landslide": 1}},
+}
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    monkeypatch.setattr(insight_cache, "path", str(tmp_path / "ai.sqlite"))
+    usage_tracker.reset()
+    provider = StubProvider(latency_ms=1)
+    set_provider(provider)
+    yield provider
+    set_provider(None)
+
+def test_tracker_splits_packed_calls_by_region():
+    tracker = UsageTracker(log_path="")
+    tracker.record("full", ["A"], 0.1, OK, prompt_tokens=100, output_tokens=50)
+    tracker.record("compact", ["A", "B"], 0.3, OK, estimated_prompt_tokens=80, estimated_output_tokens=40)
+    tracker.record("compact", ["B"], 0.05, RATE_LIMITED, prompt_tokens=0, output_tokens=0)
+    report = tracker.report()
+
+    assert report["total"]["calls"] == 3
+    assert report["total"]["prompt_tokens"] == 180
+    assert report["total"]["estimated_calls"] == 1
+    assert report["by_mode"]["compact"]["outcomes"] == {OK: 1, RATE_LIMITED: 1}
+    assert report["by_region"]["A"]["prompt_tokens"] == 140
+    assert report["by_region"]["B"]["villages"] == 1.5
+
+def test_latency_window_is_bounded():
+    tracker = UsageTracker(log_path="")
+    for _ in range(LATENCY_WINDOW):
+        tracker.record("full", ["A"], 1.0, OK, prompt_tokens=1, output_tokens=1)
+    for _ in range(LATENCY_WINDOW):
+        tracker.record("full", ["A"], 0.1, OK, prompt_tokens=1, output_tokens=1)
+    total = tracker.report()["total"]
+
+    assert len(tracker.total.latencies) == LATENCY_WINDOW
+    assert total["calls"] == 2 * LATENCY_WINDOW
+    # Percentiles follow the recent window, the mean covers every call
+    assert total["latency_ms"]["p95"] == 100.0
+    assert total["latency_ms"]["mean"] == 550.0
+
+def test_usage_log_lines_do_not_interleave(tmp_path):
+    path = tmp_path / "usage.jsonl"
+    tracker = UsageTracker(log_path=str(path))
+    districts = ["D" * 2000]
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda _: tracker.record("full", districts, 0.1, OK, prompt_tokens=1, output_tokens=1), range(200)))
+    tracker.close()
+
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 200
+    assert all(json.loads(line)["districts"] == districts for line in lines)
+
+def test_compact_input_drops_empty_fields_within_budget():
+    compact = ai_service.prepare_input(VILLAGE, ai_service.COMPACT)
+    assert "forest" not in compact and "markets" not in compact["raw_stats"]
+    assert compact["demographics"]["health"] == {"supply": 2}
+    # False-y but meaningful values survive
+    assert compact["raw_stats"]["disaster_history"] == {"landslide": 1}
+    assert ai_service.prepare_input(VILLAGE, ai_service.FULL) is VILLAGE
+
+    tight = ai_service.prepare_input(VILLAGE, ai_service.COMPACT, budget=25)
+    assert tight["name"] == "KEDUNGREJO" and "disaster_history" not in tight["raw_stats"]
+    assert len(ai_service.build_prompt(VILLAGE, ai_service.COMPACT)) < len(ai_service.build_prompt(VILLAGE, ai_service.FULL))
+
+def test_calls_are_recorded_per_mode(stub):
+    asyncio.run(ai_service.request_village_insights(VILLAGE, use_cache=False, mode=ai_service.FULL))
+    asyncio.run(ai_service.request_village_insights(VILLAGE, use_cache=False, mode=ai_service.COMPACT))
+    report = usage_tracker.report()
+
+    full, compact = report["by_mode"]["full"], report["by_mode"]["compact"]
+    assert full["outcomes"] == {OK: 1} and compact["outcomes"] == {OK: 1}
+    assert 0 < compact["prompt_tokens"] < full["prompt_tokens"]
+    assert report["by_region"]["SUKORAME"]["calls"] == 2
+
+def test_rate_limited_calls_are_recorded(stub):
+    stub.throttle_rate = 1.0
+    with pytest.raises(RateLimited):
+        asyncio.run(ai_service.request_village_insights(VILLAGE, use_cache=False))
+    assert usage_tracker.report()["total"]["outcomes"] == {RATE_LIMITED: 1}
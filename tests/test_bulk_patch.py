@@ -0,0 +1,51 @@
+import asyncio
+from types import SimpleNamespace
+
+from pymongo.errors import BulkWriteError
+
+from backend.services.bulk_patch import BulkPatcher, subdocument_patch
+
+class FakeCollection:
+    def __init__(self, docs, fail_ids=()):
+        self.docs = docs
+        self.fail_ids = set(fail_ids)
+        self.batches = []
+
+    def find(self, query, projection=None, batch_size=None):
+        async def cursor():
+            for doc in self.docs:
+                yield {k: v for k, v in doc.items() if projection is None or k == "_id" or k in projection}
+        return cursor()
+
+    async def bulk_write(self, operations, ordered=True):
+        assert ordered is False
+        await asyncio.sleep(0)
+        self.batches.append([op._doc for op in operations])
+        failed = [i for i, op in enumerate(operations) if op._filter["_id"] in self.fail_ids]
+        ok = len(operations) - len(failed)
+        if failed:
+            raise BulkWriteError({"writeErrors": [{"index": i, "errmsg": "boom"} for i in failed],
+                                  "nMatched": ok, "nModified": ok})
+        return SimpleNamespace(matched_count=ok, modified_count=ok)
+
+def test_patches_are_batched_and_targeted():
+    docs = [{"_id": str(i), "ai_analysis": {"persona": "X"} if i % 2 else None, "big": "..."} for i in range(25)]
+    collection = FakeCollection(docs, fail_ids={"7"})
+    patcher = BulkPatcher(collection, batch_size=10)
+    stats = asyncio.run(patcher.run({}, {"ai_analysis": 1},
+                                    lambda d: None if d["_id"] == "0" else subdocument_patch(d, "ai_analysis", {"persona": "Y"})))
+
+    assert (stats.scanned, stats.patched, stats.batches) == (25, 24, 3)
+    assert (stats.modified, stats.failed) == (23, 1)
+    assert [len(b) for b in collection.batches] == [10, 10, 4]
+    # Existing subdocument -> dotted path only; missing -> whole subdocument; always the data version
+    assert set(collection.batches[0][0]["$set"]) == {"ai_analysis.persona", "updated_at"}
+    second = collection.batches[0][1]["$set"]
+    assert second["ai_analysis"] == {"persona": "Y"} and "updated_at" in second
+
+def test_dry_run_writes_nothing():
+    collection = FakeCollection([{"_id": str(i)} for i in range(5)])
+    stats = asyncio.run(BulkPatcher(collection, dry_run=True, samples=2).run({}, None, lambda d: {"x": 1}))
+    assert collection.batches == []
+    assert stats.patched == 5 and len(stats.samples) == 2
+    assert "dry run" in stats.summary()
@@ -0,0 +1,47 @@
+import json
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from backend.services.clustering import FEATURES, ClusterModel, name_clusters, train
+from backend.services.kmeans import fit_kmeans
+
+def blobs(n_per_cluster, centres, seed=0):
+    rng = np.random.default_rng(seed)
+    return np.concatenate([rng.normal(c, 0.3, (n, len(c))) for c, n in zip(centres, n_per_cluster)])
+
+CENTRES = [(0.0, 0.0), (5.0, 5.0), (0.0, 8.0)]
+
+@pytest.mark.parametrize("mini_batch_above", [10**9, 1000])
+def test_kmeans_recovers_blobs(mini_batch_above):
+    X = blobs([3000, 2000, 1000], CENTRES)
+    result = fit_kmeans(X, 3, seed=1, mini_batch_above=mini_batch_above)
+    assert result.mini_batch == (mini_batch_above < len(X))
+    # Numbered by size, largest first; every blob in one cluster
+    assert np.bincount(result.labels).tolist() == [3000, 2000, 1000]
+    assert np.allclose(result.centroids, CENTRES, atol=0.1)
+
+def test_model_roundtrip_and_pure_python_predict(tmp_path):
+    X = blobs([300, 200, 100, 50, 50, 20], [(i * 4.0,) * len(FEATURES) for i in range(6)])
+    model = train(X.tolist(), k=6, seed=0)
+    labels = [model.predict(row) for row in X.tolist()]
+    assert sorted(np.bincount(labels).tolist(), reverse=True) == [300, 200, 100, 50, 50, 20]
+
+    path = model.save(str(tmp_path / "clusters.json"))
+    loaded = ClusterModel.load(path)
+    assert loaded == model and len(json.dumps(json.load(open(path)))) < 4000
+
+    # A model trained on other features is not used
+    data = json.load(open(path))
+    data["features"] = ["digital"]
+    json.dump(data, open(path, "w"))
+    assert ClusterModel.load(path) is None
+    assert ClusterModel.load(str(tmp_path / "missing.json")) is None
+
+def test_cluster_names():
+    features = list(FEATURES)
+    centroids = [[0.1] * 6, [2.0, 0, 0, 0, 0, 0], [0, 0, 0, 0, 3.0, 0], [1.0, 0, 0, 0, 0, 0]]
+    assert name_clusters(centroids, features) == [
+        "Underserved", "Digitally connected", "Disease hotspot", "Digitally connected (2)",
+    ]
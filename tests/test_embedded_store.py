@@ -0,0 +1,40 @@
+import asyncio
+
+from backend.database import init_db
+from backend.models import AIAnalysis
+from backend.services.embedded_store import EmbeddedVillageStore
+from backend.services.repository import VillageRepository
+
+def test_embedded_store_loads_csv_and_persists_ai(monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    cache_path = str(tmp_path / "cache.sqlite")
+
+    async def scenario():
+        await init_db()
+        store = EmbeddedVillageStore(cache_path=cache_path)
+        repo = VillageRepository(store=store, refresh_interval=0)
+
+        snapshot = await repo.get_snapshot()
+        assert len(snapshot) == 474
+        village = snapshot.get("3524010001")
+        assert village.name == "KEDUNGKUMPUL"
+        assert village.location.coordinates == [village.longitude, village.latitude]
+
+        saved = await repo.save_ai_analysis("3524010001", AIAnalysis(persona="Lumbung Pangan"))
+        assert saved
+        assert await repo.save_ai_analysis("missing", AIAnalysis()) is False
+        refreshed = await repo.refresh()
+        assert refreshed.get("3524010001").ai_analysis.persona == "Lumbung Pangan"
+        # Applied incrementally: only the written village is swapped in
+        assert refreshed.changed_ids == frozenset({"3524010001"})
+        assert refreshed.get("3524010002") is snapshot.get("3524010002")
+        assert (await repo.refresh()) is refreshed
+        # The previous snapshot is not mutated
+        assert snapshot.get("3524010001").ai_analysis.persona is None
+
+        # A fresh store (restart) reads the cache and re-applies the AI write
+        restarted = EmbeddedVillageStore(cache_path=cache_path)
+        villages = {v.id: v for v in await restarted.load_all()}
+        assert villages["3524010001"].ai_analysis.persona == "Lumbung Pangan"
+
+    asyncio.run(scenario())
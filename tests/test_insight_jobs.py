@@ -0,0 +1,100 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.models import AIAnalysis
+from backend.services.insight_jobs import InsightJobQueue, DONE, FAILED
+from backend.services.rate_limit import RateLimited
+
+INSIGHTS = {"swot": {"strengths": ["pasar"]}, "persona": "Agraris", "local_hero": "Pak Kades", "recommendations": ["irigasi"]}
+
+def make_village(village_id):
+    return SimpleNamespace(id=village_id, name=f"Village {village_id}", district="Dist", topography=None,
+                           forest_location=None, status=None, ai_analysis=None, health=None, education=None,
+                           economy=None, infrastructure=None, digital=None, disaster=None, disease=None)
+
+class FakeRepository:
+    def __init__(self, villages):
+        self.villages = {v.id: v for v in villages}
+        self.saved = {}
+
+    async def get_snapshot(self):
+        return SimpleNamespace(get=self.villages.get)
+
+    async def save_ai_analysis(self, village_id, analysis):
+        if village_id not in self.villages:
+            return False
+        self.saved[village_id] = analysis
+        return True
+
+    async def refresh_soon(self):
+        self.villages = {i: SimpleNamespace(**{**vars(v), "ai_analysis": self.saved.get(i, v.ai_analysis)})
+                         for i, v in self.villages.items()}
+
+async def wait_for(queue, job):
+    for _ in range(200):
+        if not job.active:
+            return job
+        await asyncio.sleep(0.01)
+    raise AssertionError(f"job still {job.status}")
+
+def test_jobs_are_deduplicated_and_persisted():
+    calls = []
+
+    async def generate(payload):
+        calls.append(payload["name"])
+        await asyncio.sleep(0.05)
+        return INSIGHTS
+
+    async def scenario():
+        repo = FakeRepository([make_village("1")])
+        queue = InsightJobQueue(repository=repo, generate=generate, workers=2, rpm=6000)
+        first = queue.submit("1")
+        # Same village while the first job is pending -> same job
+        assert queue.submit("1") is first
+        await wait_for(queue, first)
+        await queue.stop()
+        return repo, first
+
+    repo, job = asyncio.run(scenario())
+    assert calls == ["Village 1"]
+    assert job.status == DONE
+    assert isinstance(repo.saved["1"], AIAnalysis)
+    assert repo.saved["1"].persona == "Agraris"
+    assert repo.saved["1"].recommendations == {"recommendations": ["irigasi"]}
+    assert repo.villages["1"].ai_analysis is repo.saved["1"]
+
+def test_rate_limited_job_retries_then_unknown_village_fails():
+    attempts = []
+
+    async def generate(payload):
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RateLimited(retry_after=0.01)
+        return INSIGHTS
+
+    async def scenario():
+        queue = InsightJobQueue(repository=FakeRepository([make_village("1")]), generate=generate, workers=1, rpm=6000)
+        ok = await wait_for(queue, queue.submit("1"))
+        missing = await wait_for(queue, queue.submit("404"))
+        await queue.stop()
+        return ok, missing
+
+    ok, missing = asyncio.run(scenario())
+    assert (ok.status, ok.attempts) == (DONE, 2)
+    assert missing.status == FAILED and missing.error == "Village not found"
+
+def test_stream_yields_parts_then_persists():
+    async def stream_generate(payload):
+        yield "persona", "Agraris"
+        yield "insights", INSIGHTS
+
+    async def scenario():
+        repo = FakeRepository([make_village("1")])
+        queue = InsightJobQueue(repository=repo, stream_generate=stream_generate, rpm=6000)
+        events = [e async for e in queue.stream(repo.villages["1"])]
+        return repo, events
+
+    repo, events = asyncio.run(scenario())
+    assert events[0] == ("persona", "Agraris")
+    assert events[1] == ("saved", repo.saved["1"])
+    assert repo.villages["1"].ai_analysis.persona == "Agraris"
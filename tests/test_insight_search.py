@@ -0,0 +1,55 @@
+from types import SimpleNamespace
+
+from backend.models import AIAnalysis
+from backend.services.insight_search import InsightSearchIndex, query_terms
+
+def village(village_id, district, weaknesses, persona="Lumbung Pangan"):
+    analysis = AIAnalysis(persona=persona, social_capital_narrative="Warga aktif bergotong royong.",
+                          swot_analysis={"weaknesses": weaknesses},
+                          recommendations={"recommendations": ["Optimalisasi BUMDes"]})
+    return SimpleNamespace(id=village_id, name=f"Desa {village_id}", district=district, ai_analysis=analysis)
+
+def snapshot(villages, changed_ids=None):
+    by_id = {v.id: v for v in villages}
+    return SimpleNamespace(villages=villages, get=by_id.get, changed_ids=changed_ids)
+
+VILLAGES = [
+    village("1", "A", ["Saluran irigasi rusak", "Akses pasar terbatas"]),
+    village("2", "A", ["Sinyal komunikasi belum merata"]),
+    village("3", "B", ["Pengairan sawah kurang saat kemarau"], persona="Desa Agraris"),
+]
+
+def test_bm25_with_query_expansion():
+    index = InsightSearchIndex()
+    assert index.sync(snapshot(VILLAGES)) == 3
+    assert "irigasi" in query_terms("irrigation problems")
+
+    hits = index.search("villages with irrigation problems", mode="bm25")
+    # Both irrigation villages, not the one with signal issues
+    assert {h["id"] for h in hits} == {"1", "3"}
+    by_id = {h["id"]: h for h in hits}
+    assert by_id["1"]["matches"][0] == {"field": "swot.weaknesses", "text": "Saluran irigasi rusak"}
+    assert [h["id"] for h in index.search("irigasi", district="B")] == []
+    assert index.search("", mode="bm25") == []
+
+def test_vector_fallback_finds_inflected_terms():
+    index = InsightSearchIndex()
+    index.sync(snapshot(VILLAGES))
+    # No exact term: hashed n-gram vectors still find the closest analyses
+    hits = index.search("komunikasinya", mode="hybrid")
+    assert hits and hits[0]["id"] == "2"
+    assert InsightSearchIndex(vectors=False).search("komunikasinya") == []
+
+def test_sync_is_incremental():
+    index = InsightSearchIndex()
+    index.sync(snapshot(VILLAGES))
+    # Full snapshot with identical analyses: nothing to re-index
+    assert index.sync(snapshot(list(VILLAGES))) == 0
+
+    updated = village("2", "A", ["Banjir musiman merusak irigasi"])
+    assert index.sync(snapshot([VILLAGES[0], updated, VILLAGES[2]], changed_ids=frozenset({"2"}))) == 1
+    assert "2" in [h["id"] for h in index.search("banjir")]
+    assert index.search("sinyal") == []
+
+    assert index.sync(snapshot([VILLAGES[0], updated], changed_ids=frozenset({"3"}))) == 1
+    assert len(index) == 2 and "3" not in [h["id"] for h in index.search("pengairan")]
@@ -0,0 +1,127 @@
+import asyncio
+import json
+
+import pytest
+
+from backend.services import ai_service
+from backend.services.ai_cache import insight_cache
+from backend.services.llm import GeminiProvider, LLMConfigError, StubProvider, create_provider, set_provider
+from backend.services.rate_limit import RateLimited
+
+VILLAGE = {"name": "KEDUNGREJO", "district": "SUKORAME", "raw_stats": {"markets": 2}}
+
+@pytest.fixture
+def stub(monkeypatch, tmp_path):
+    monkeypatch.setattr(insight_cache, "path", str(tmp_path / "ai.sqlite"))
+    provider = StubProvider(latency_ms=1)
+    set_provider(provider)
+    yield provider
+    set_provider(None)
+
+def test_gemini_provider_is_lazy(monkeypatch):
+    monkeypatch.delenv("GEMINI_API_KEY", raising=False)
+    monkeypatch.delenv("LLM_PROVIDER", raising=False)
+    provider = create_provider()
+    assert isinstance(provider, GeminiProvider)
+    # Nothing is checked until the client is needed
+    with pytest.raises(LLMConfigError):
+        provider.client
+    # ...or until a batch run asks for it up front
+    with pytest.raises(LLMConfigError):
+        provider.check()
+
+def test_stub_is_deterministic(stub):
+    first = asyncio.run(ai_service.request_village_insights(VILLAGE, use_cache=False))
+    second = ai_service.generate_village_insights(VILLAGE)
+    assert first == second
+    assert ai_service.is_valid_insights(first)
+    assert "KEDUNGREJO" in first["local_hero"]
+
+def test_stub_packed_prompt(stub):
+    villages = {"1": VILLAGE, "2": dict(VILLAGE, name="SIDOREJO")}
+    results, failed = asyncio.run(ai_service.request_packed_insights(villages))
+    assert failed == [] and set(results) == {"1", "2"}
+    assert "SIDOREJO" in results["2"]["local_hero"]
+    # Second call is served from the per-village cache
+    calls = stub.calls
+    asyncio.run(ai_service.request_packed_insights(villages))
+    assert stub.calls == calls
+
+def test_stub_faults_are_reproducible_and_retryable():
+    provider = StubProvider(latency_ms=1, throttle_rate=0.5, malformed_rate=0.5, retry_after_s=3)
+
+    def outcomes(p):
+        result = []
+        for _ in range(6):
+            try:
+                json.loads(p.generate_sync(ai_service.build_prompt(VILLAGE), {}).text)
+                result.append("ok")
+            except RateLimited as e:
+                assert e.retry_after == 3
+                result.append("429")
+            except ValueError:
+                result.append("malformed")
+        return result
+
+    first = outcomes(provider)
+    assert first == outcomes(StubProvider(latency_ms=1, throttle_rate=0.5, malformed_rate=0.5, retry_after_s=3))
+    assert "ok" in first
+
+def test_parse_packed_insights_validates_each_entry():
+    swot = {"strengths": [], "weaknesses": [], "opportunities": [], "threats": []}
+    valid = {"swot": swot, "persona": "P", "recommendations": []}
+    text = json.dumps([dict(valid, village_id="1"), {"village_id": "2", "persona": "x"}, dict(valid, village_id="9")])
+    results, failed = ai_service.parse_packed_insights(text, ["1", "2", "3"])
+    assert list(results) == ["1"] and failed == ["2", "3"]
+
+    # Truncated output keeps the complete entries
+    truncated = json.dumps([dict(valid, village_id="1"), dict(valid, village_id="3")])[:-20]
+    results, failed = ai_service.parse_packed_insights(truncated, ["1", "3"])
+    assert list(results) == ["1"] and failed == ["3"]
+
+def test_mistyped_answers_are_rejected(stub, monkeypatch):
+    mistyped = '{"swot": "good", "persona": "x", "recommendations": "do it"}'
+    with pytest.raises(ValueError):
+        ai_service.parse_insights(mistyped)
+    swot = {"strengths": ["a"], "weaknesses": [], "opportunities": [], "threats": []}
+    assert ai_service.is_valid_insights({"swot": swot, "persona": "P", "recommendations": ["r"]})
+    assert not ai_service.is_valid_insights({"swot": dict(swot, threats="t"), "persona": "P", "recommendations": []})
+    assert not ai_service.is_valid_insights({"swot": swot, "persona": "P", "local_hero": 1, "recommendations": []})
+    assert not ai_service.is_valid_insights({"swot": swot, "persona": "P", "recommendations": [{"text": "r"}]})
+
+    # Counted as invalid (so callers retry) and never cached
+    monkeypatch.setattr(stub, "_insights", lambda data: json.loads(mistyped))
+    with pytest.raises(ValueError):
+        asyncio.run(ai_service.request_village_insights(VILLAGE))
+    assert ai_service.cached_village_insights(VILLAGE) is None
+    results, failed = asyncio.run(ai_service.request_packed_insights({"1": VILLAGE}))
+    assert results == {} and failed == ["1"]
+
+def test_stream_parser_emits_each_part_once():
+    insights = {"swot": {"strengths": ["a"], "weaknesses": [], "opportunities": ["o"], "threats": ["t"]},
+                "persona": "Desa Agraris", "local_hero": "h", "recommendations": ["r1", "r2"]}
+    text = json.dumps(insights, indent=2)
+    parser = ai_service.InsightStreamParser()
+    events = []
+    for i in range(0, len(text), 5):
+        events.extend(parser.feed(text[i:i + 5]))
+    assert events == ai_service.insight_events(insights)
+    assert [e for e, _ in events] == ["swot"] * 4 + ["persona", "local_hero", "recommendation", "recommendation"]
+    assert events[-1] == ("recommendation", {"index": 1, "text": "r2"})
+
+    # A half-written section is held back
+    partial = ai_service.InsightStreamParser().feed('{"swot": {"strengths": ["a"], "weaknesses": ["b')
+    assert partial == [("swot", {"section": "strengths", "items": ["a"]})]
+
+def test_stream_village_insights(stub):
+    async def collect():
+        return [e async for e in ai_service.stream_village_insights(VILLAGE)]
+
+    events = asyncio.run(collect())
+    name, insights = events[-1]
+    assert name == "insights" and ai_service.is_valid_insights(insights)
+    assert events[:-1] == ai_service.insight_events(insights)
+    # Cache hit replays the same events without calling the model
+    calls = stub.calls
+    assert asyncio.run(collect()) == events
+    assert stub.calls == calls
@@ -0,0 +1,59 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("numpy")
+
+from backend.database import init_db
+from backend.models import Digital, Economy
+from backend.services.analytics import ScoringAlgorithm
+from backend.services.personas import (
+    build_insights, columns_from_documents, generate_smart_persona, independence_scores, persona_columns,
+)
+from backend.services.podes import CSV_FILE_PATH, read_villages
+from backend.services.scoring import CompiledScoring, active_scoring, apply_overrides, extract_features
+
+@pytest.fixture
+def villages(monkeypatch):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    asyncio.run(init_db())
+    return list(read_villages(CSV_FILE_PATH))
+
+def test_columnar_index_matches_scoring_algorithm(villages):
+    scores = independence_scores(columns_from_documents([v.model_dump(by_alias=True) for v in villages]))
+    for village, score in zip(villages, scores.tolist()):
+        assert round(score, 2) == ScoringAlgorithm.calculate_independence_index(village)["score"]
+
+def test_advanced_follows_the_scoring_config(villages):
+    # A lower "Maju" threshold and other weights: personas must grade like /api/micro
+    scoring = CompiledScoring(apply_overrides(active_scoring.config, {
+        "independence": {"maju_above": 55, "economy_weight": 3}, "digital": {"bts_points": 50},
+    }))
+    columns = columns_from_documents([v.model_dump(by_alias=True) for v in villages])
+    personas = persona_columns(columns, scoring)["persona"].tolist()
+    expected = [scoring.independence_index(extract_features(v))["grade"] == "Maju" for v in villages]
+    assert any(expected)
+    assert [p.endswith(("Digital", "Unggulan")) for p in personas] == expected
+
+def test_rules(villages):
+    base = villages[0]
+    slope_farm = base.model_copy(update={
+        "topography": "Lereng", "economy": Economy(primary_income="Pertanian"), "digital": Digital(signal_type="3G"),
+    })
+    trade = base.model_copy(update={
+        "economy": Economy(primary_income="Perdagangan besar dan eceran"), "digital": Digital(signal_type="5G/4G/LTE"),
+    })
+    rules = persona_columns(columns_from_documents([slope_farm.model_dump(), trade.model_dump()]))
+    assert rules["persona"].tolist() == ["Agrowisata Pegunungan", "Simpul Perniagaan Terkoneksi"]
+
+    insights = generate_smart_persona(slope_farm)
+    assert insights["persona"] == "Agrowisata Pegunungan"
+    assert "Sinyal komunikasi belum merata" in insights["swot_analysis"]["weaknesses"]
+    assert base.name in insights["social_capital_narrative"]
+
+def test_batch_covers_every_village(villages):
+    # Timing lives in scripts/benchmark_endpoints.py ("personas_batch")
+    docs = [v.model_dump(by_alias=True) for v in villages] * 20
+    insights = build_insights(columns_from_documents(docs))
+    assert len(insights) == len(docs)
+    assert insights[0] == insights[len(villages)]
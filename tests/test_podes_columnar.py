@@ -0,0 +1,26 @@
+import asyncio
+
+import pytest
+
+pytest.importorskip("pandas")
+
+from backend.database import init_db
+from backend.services.podes import CSV_FILE_PATH, read_villages
+from backend.services.podes_columnar import map_file
+
+def test_columnar_mapping_matches_row_mapping(monkeypatch):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    asyncio.run(init_db())
+
+    expected = {v.id: v for v in read_villages(CSV_FILE_PATH)}
+    _, documents, timings = map_file(CSV_FILE_PATH)
+
+    assert set(timings) == {"read", "map", "build"}
+    assert len(documents) == len(expected)
+    for doc in documents:
+        village = expected[doc["_id"]]
+        assert doc["content_hash"] == village.content_hash
+    # Spot check the plain document against the pydantic dump
+    first = documents[0]
+    dumped = expected[first["_id"]].model_dump(by_alias=True, exclude={"updated_at", "ai_analysis", "podes_years"})
+    assert first == dumped
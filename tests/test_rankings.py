@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+
+from backend.database import init_db
+from backend.services.podes import CSV_FILE_PATH, read_villages
+from backend.services.rankings import METRIC_NAMES, RankingIndex
+from backend.services.repository import VillageSnapshot
+
+@pytest.fixture
+def snapshot(monkeypatch):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    asyncio.run(init_db())
+    return VillageSnapshot(read_villages(CSV_FILE_PATH), (1,))
+
+def state(index, district):
+    return [(index.top(m, len(index)), index.summary(m), index.top(m, len(index), district)) for m in METRIC_NAMES]
+
+def test_top_and_positions_match_sorting(snapshot):
+    index = RankingIndex()
+    index.sync(snapshot)
+    values = sorted(((float(v.economy.bumdes or 0), v.id) for v in snapshot.villages if v.economy),
+                    key=lambda p: (-p[0], p[1]))
+
+    top = index.top("bumdes", 5)
+    assert [(e["value"], e["id"]) for e in top] == values[:5]
+    assert top[0]["rank"] == 1
+
+    value, village_id = values[-1]
+    position = index.position("bumdes", village_id)
+    higher = sum(1 for v, _ in values if v > value)
+    assert position["rank"] == higher + 1 and position["of"] == len(values)
+    assert position["percentile"] == round(100 * (len(values) - higher) / len(values), 1)
+    assert position["district_of"] == len([v for v in snapshot.in_district(snapshot.get(village_id).district) if v.economy])
+
+    district = snapshot.villages[0].district
+    assert all(e["district"] == district for e in index.top("infectious_cases", 10, district))
+    assert index.summary("bumdes")["quantiles"]["p99"] >= index.summary("bumdes")["quantiles"]["p50"]
+    assert set(index.positions(village_id)) <= set(METRIC_NAMES)
+    with pytest.raises(ValueError):
+        index.top("population")
+
+def test_incremental_sync_matches_rebuild(snapshot):
+    index = RankingIndex()
+    index.sync(snapshot)
+    assert index.position("bumdes", snapshot.villages[0].id)["district_rank"] >= 1  # builds the district ranking
+    first, second = snapshot.villages[0], snapshot.villages[1]
+    boosted = first.model_copy(update={"economy": first.economy.model_copy(update={"bumdes": 99})})
+
+    changed = snapshot.with_changes([boosted], [second.id], (2,))
+    assert index.sync(changed) == 2
+    assert index.top("bumdes", 1)[0]["id"] == first.id
+    assert index.position("bumdes", second.id) is None
+
+    rebuilt = RankingIndex()
+    rebuilt.sync(VillageSnapshot(changed.villages, (2,)))
+    assert state(index, first.district) == state(rebuilt, first.district)
+    assert state(index, second.district) == state(rebuilt, second.district)
@@ -0,0 +1,54 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from backend.services.rate_limit import RateLimited, TokenBucket, is_rate_limit_error, parse_retry_after
+
+def test_parse_retry_after():
+    header = SimpleNamespace(response=SimpleNamespace(headers={"retry-after": "7"}))
+    assert parse_retry_after(header) == 7.0
+
+    # Gemini puts the hint in the RetryInfo details instead of a header
+    details = SimpleNamespace(response=None, details={"error": {"details": [{"@type": "RetryInfo", "retryDelay": "37s"}]}})
+    assert parse_retry_after(details) == 37.0
+
+    assert parse_retry_after(Exception("boom")) is None
+
+def test_is_rate_limit_error():
+    assert is_rate_limit_error(SimpleNamespace(code=429))
+    assert is_rate_limit_error(Exception("429 RESOURCE_EXHAUSTED"))
+    assert not is_rate_limit_error(SimpleNamespace(code=500))
+    assert RateLimited(retry_after=2.5).retry_after == 2.5
+
+def test_token_bucket_rate_and_throttle():
+    async def scenario():
+        bucket = TokenBucket(rate=50, burst=1, recover_after=2, rate_step=10)
+        t0 = time.monotonic()
+        for _ in range(6):
+            await bucket.acquire()
+        # 1 burst token + 5 refills at 50/s
+        assert time.monotonic() - t0 >= 0.09
+
+        bucket.on_throttle(retry_after=0.1)
+        assert bucket.rate == 25
+        t0 = time.monotonic()
+        await bucket.acquire()
+        assert time.monotonic() - t0 >= 0.1
+
+        # Additive recovery, capped at the configured rate
+        for _ in range(10):
+            bucket.on_success()
+        assert bucket.rate == 50
+
+    asyncio.run(scenario())
+
+def test_pause_is_not_credited_as_burst():
+    bucket = TokenBucket(rate=10, burst=5)
+    bucket.on_throttle(retry_after=1.0)
+    # Old behaviour: the whole second of pause refilled the burst at once
+    bucket._refill(bucket.paused_until)
+    assert bucket.tokens == 0
+    bucket._refill(bucket.paused_until + 0.2)
+    assert bucket.tokens == pytest.approx(1.0)
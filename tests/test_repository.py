@@ -0,0 +1,151 @@
+import asyncio
+from types import SimpleNamespace
+
+from backend.services.repository import (
+    VillageRepository, VillageSnapshot, keep_unless_data_changed, patch_per_village,
+)
+
+def make_village(village_id, name, district, lat, lon):
+    return SimpleNamespace(id=village_id, name=name, district=district, latitude=lat, longitude=lon)
+
+VILLAGES = [
+    make_village("3", "SIDOREJO", "DEKET", -7.05, 112.40),
+    make_village("1", "KEDUNGREJO", "SUKORAME", -7.30, 112.10),
+    make_village("2", "BABATAGUNG", "DEKET", -7.10, 112.45),
+]
+
+class FakeStore:
+    def __init__(self, villages):
+        self.villages = list(villages)
+        self.version_value = 1
+        self.loads = 0
+        self.version_checks = 0
+
+    async def version(self):
+        self.version_checks += 1
+        return self.version_value
+
+    async def load_all(self):
+        self.loads += 1
+        return list(self.villages)
+
+def test_snapshot_indexes():
+    snapshot = VillageSnapshot(VILLAGES, version=1)
+    assert [v.id for v in snapshot.villages] == ["1", "2", "3"]
+    assert snapshot.get("2").name == "BABATAGUNG"
+    assert snapshot.by_district["DEKET"] == ("2", "3")
+    assert snapshot.get("404") is None
+
+def test_snapshot_nearest_and_memo():
+    snapshot = VillageSnapshot(VILLAGES, version=1)
+    village, distance = snapshot.nearest(-7.11, 112.44)
+    assert village.id == "2"
+    assert distance < 2
+    # Far outside every grid ring still resolves
+    village, _ = snapshot.nearest(0.0, 100.0)
+    assert village.id in {"1", "2", "3"}
+
+    calls = []
+    builder = lambda snap: calls.append(1) or len(snap)
+    assert snapshot.memo("count", builder) == 3
+    assert snapshot.memo("count", builder) == 3
+    assert len(calls) == 1
+
+def test_repository_swaps_only_on_version_change():
+    async def scenario():
+        store = FakeStore(VILLAGES)
+        repo = VillageRepository(store=store, refresh_interval=0)
+        swaps = []
+        repo.subscribe(lambda old, new: swaps.append(new.version))
+
+        first = await repo.get_snapshot()
+        assert store.loads == 1
+
+        # Same version: the check runs but nothing is reloaded
+        same = await repo.refresh()
+        assert same is first
+        assert store.loads == 1
+
+        store.villages.append(make_village("4", "BARU", "TURI", -7.2, 112.2))
+        store.version_value = 2
+        await repo.get_snapshot()          # schedules a background refresh
+        await repo._refresh_task
+        assert store.loads == 2
+        assert len(repo.snapshot) == 4
+        assert first.get("4") is None      # old snapshot is untouched
+        assert swaps == [1, 2]
+
+    asyncio.run(scenario())
+
+class DeltaStore(FakeStore):
+    def __init__(self, villages):
+        super().__init__(villages)
+        self.changes = ([], [])
+
+    async def load_changes(self, snapshot, version):
+        return self.changes
+
+def test_repository_applies_deltas():
+    async def scenario():
+        store = DeltaStore(VILLAGES)
+        repo = VillageRepository(store=store, refresh_interval=0)
+        first = await repo.refresh()
+        assert first.changed_ids is None
+
+        renamed = make_village("2", "BABAT AGUNG", "DEKET", -7.10, 112.45)
+        store.changes = ([renamed], ["3"])
+        store.version_value = 2
+        second = await repo.refresh()
+
+        assert store.loads == 1            # no full reload
+        assert second.changed_ids == frozenset({"2", "3"})
+        assert second.get("2").name == "BABAT AGUNG"
+        assert second.get("3") is None
+        assert second.get("1") is first.get("1")   # unchanged objects are shared
+        assert second.by_district["DEKET"] == ("2",)
+
+    asyncio.run(scenario())
+
+def test_ai_writes_patch_the_snapshot_in_place():
+    snapshot = VillageSnapshot(VILLAGES, version=1)
+    names = snapshot.memo("names", lambda s: [v.name for v in s.villages],
+                          lambda values, s: patch_per_village(values, s, lambda v: v.name))
+    snapshot.memo("total", lambda s: len(s), keep_unless_data_changed)
+    snapshot.memo("unpatched", lambda s: object())
+
+    # Only the AI fields change: indexes and memo entries carry over
+    analysed = SimpleNamespace(**vars(snapshot.get("2")), ai_analysis="persona", updated_at=2)
+    second = snapshot.with_changes([analysed], [], version=2)
+    assert second.same_positions and second.data_changed_ids == frozenset()
+    assert second.get("2") is analysed and second.position("2") == 1
+    assert second.by_district is snapshot.by_district and second._grid is snapshot._grid
+    assert second.memo("names", lambda s: None) is names
+    assert second.memo("total", lambda s: None) == 3
+    assert second.memo("unpatched", lambda s: "rebuilt") == "rebuilt"
+
+    # A data change patches just that village; a move reindexes locations
+    renamed = make_village("3", "SIDOREJO LOR", "DEKET", -7.30, 112.11)
+    third = second.with_changes([renamed], [], version=3)
+    assert third.data_changed_ids == frozenset({"3"})
+    assert third.memo("names", lambda s: None) == ["KEDUNGREJO", "BABATAGUNG", "SIDOREJO LOR"]
+    assert third.memo("total", lambda s: "rebuilt") == "rebuilt"
+    assert third.nearest(-7.30, 112.11)[0] is renamed
+
+    # Inserts shift positions: position-based entries are rebuilt
+    fourth = third.with_changes([make_village("0", "BARU", "TURI", -7.2, 112.2)], [], version=4)
+    assert not fourth.same_positions and fourth.position("1") == 1
+    assert fourth.memo("names", lambda s: "rebuilt") == "rebuilt"
+
+def test_refresh_soon_coalesces_writes():
+    async def scenario():
+        store = DeltaStore(VILLAGES)
+        repo = VillageRepository(store=store, refresh_interval=0)
+        await repo.refresh()
+        store.version_value = 2
+        store.changes = ([make_village("2", "BABAT AGUNG", "DEKET", -7.10, 112.45)], [])
+        checks = store.version_checks
+        first, second = await asyncio.gather(repo.refresh_soon(), repo.refresh_soon())
+        assert first is second and first.get("2").name == "BABAT AGUNG"
+        assert store.version_checks == checks + 1
+
+    asyncio.run(scenario())
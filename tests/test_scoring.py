@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from pydantic import ValidationError
+
+from backend.database import init_db
+from backend.services.analytics import ScoringAlgorithm
+from backend.services.podes import CSV_FILE_PATH, read_villages
+from backend.services.repository import VillageSnapshot
+from backend.services.scoring import (
+    DEFAULT_CONFIG_PATH, CompiledScoring, ScoringConfig, active_scoring, apply_overrides, extract_features,
+    load_scoring_config, what_if,
+)
+
+@pytest.fixture
+def villages(monkeypatch):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    asyncio.run(init_db())
+    return list(read_villages(CSV_FILE_PATH))
+
+def test_batch_matches_per_village_scores(villages):
+    columns = active_scoring.evaluate([extract_features(v) for v in villages])
+    for v, health, education, score, grade in zip(villages, *columns):
+        index = ScoringAlgorithm.calculate_independence_index(v)
+        assert health == ScoringAlgorithm.calculate_health_radar(v)["status"]
+        assert education == ScoringAlgorithm.calculate_education_funnel(v)["status"]
+        assert (round(score, 2), grade) == (index["score"], index["grade"])
+
+def test_config_file_matches_model_defaults():
+    config = load_scoring_config(DEFAULT_CONFIG_PATH)
+    assert config == ScoringConfig(version=config.version)
+
+def test_what_if_shifts_grades_without_touching_active_config(villages):
+    snapshot = VillageSnapshot(villages, (1,))
+    before = ScoringAlgorithm.calculate_independence_index(villages[0])
+
+    result = what_if(snapshot, {"independence": {"maju_above": 0, "berkembang_above": 0}}, top=5)
+    grades = result["indicators"]["independence_grade"]
+    assert result["version"].endswith("+what-if") and result["villages"] == len(villages)
+    assert set(grades["after"]) <= {"Maju", "Incomplete Data"}
+    assert grades["changed"] == len(villages) - grades["before"].get("Maju", 0) - grades["before"].get("Incomplete Data", 0)
+    assert len(result["top_changes"]) == 5 and all(c["grade_after"] == "Maju" for c in result["top_changes"])
+    assert result["indicators"]["health_status"]["changed"] == 0
+
+    assert active_scoring.config.independence.maju_above == 80
+    assert ScoringAlgorithm.calculate_independence_index(villages[0]) == before
+
+def test_what_if_district_and_identity(villages):
+    snapshot = VillageSnapshot(villages, (1,))
+    district = villages[0].district
+    result = what_if(snapshot, {}, district=district)
+    assert result["villages"] == len(snapshot.in_district(district))
+    assert all(i["changed"] == 0 for i in result["indicators"].values())
+    assert result["top_changes"] == []
+
+def test_invalid_overrides_are_rejected():
+    for overrides in ({"independence": {"maju_weight": 2}},
+                      {"independence": {"maju_above": 40, "berkembang_above": 60}},
+                      {"health": {"doctor_weight": "many"}}):
+        with pytest.raises(ValidationError):
+            apply_overrides(active_scoring.config, overrides)
+
+def test_health_weights_change_status():
+    config = apply_overrides(active_scoring.config, {"health": {"doctor_weight": 0, "puskesmas_weight": 0}})
+    village = SimpleNamespace(
+        health=SimpleNamespace(jumlah_dokter=2, jumlah_bidan=1, jumlah_puskesmas=1),
+        disease=SimpleNamespace(infectious_cases=5),
+        education=None, digital=None, infrastructure=None, economy=None,
+    )
+    features = extract_features(village)
+    assert active_scoring.health_radar(features)["status"] == "Safe"
+    assert CompiledScoring(config).health_radar(features) == {"supply": 1, "demand": 5, "status": "High Risk"}
@@ -0,0 +1,56 @@
+from backend.services.search import VillageSearchIndex, fold, phonetic
+
+ROWS = [
+    ("3524010001", "KEDUNGREJO", "SUKORAME"),
+    ("3524010002", "SIDOREJO", "DEKET"),
+    ("3524010003", "BANGGLE", "SUKORAME"),
+    ("3524010004", "KEMLAGI LOR", "TURI"),
+    ("3524010005", "BABATAGUNG", "DEKET"),
+]
+
+def build_index():
+    index = VillageSearchIndex()
+    index.build(ROWS)
+    return index
+
+def test_fold_and_phonetic():
+    assert fold("Kedung  Réjo!") == "kedung rejo"
+    # Old spelling and Javanese variants meet in the same key
+    assert phonetic("Kedhoengredja") == phonetic("KEDUNGREJO")
+    assert phonetic("Sidoredjo") == phonetic("sidareja")
+    assert phonetic("Njamplung") == phonetic("Nyamplung")
+    assert phonetic("Sidoarjo") == phonetic("Sidaarja")
+    # ... without merging names that only share consonants
+    assert phonetic("Banjar") == "banjar"
+    assert phonetic("Bono") != phonetic("Bana")
+    assert phonetic("Sono") != phonetic("Sana")
+    assert phonetic("Kedungrejo") != phonetic("Kedungraja")
+
+def test_prefix_search_ranks_exact_first():
+    results = build_index().search("kedungrejo")
+    assert results[0]["id"] == "3524010001"
+    assert results[0]["match"] == "name"
+
+    results = build_index().search("kem")
+    assert results[0]["name"] == "KEMLAGI LOR"
+
+def test_district_and_multi_token_search():
+    results = build_index().search("deket")
+    assert {r["id"] for r in results} >= {"3524010002", "3524010005"}
+
+    results = build_index().search("lor kem")
+    assert results[0]["id"] == "3524010004"
+
+def test_fuzzy_search_handles_typos():
+    results = build_index().search("bangle")
+    assert results[0]["id"] == "3524010003"
+
+    results = build_index().search("sidorjo")
+    assert results[0]["id"] == "3524010002"
+    assert results[0]["match"].startswith("fuzzy")
+
+def test_rebuild_only_when_changed():
+    index = build_index()
+    assert index.rebuild_if_changed(ROWS) is False
+    assert index.rebuild_if_changed(ROWS + [("3524010006", "BARU", "TURI")]) is True
+    assert index.search("baru")[0]["id"] == "3524010006"
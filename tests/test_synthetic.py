@@ -0,0 +1,38 @@
+import asyncio
+import importlib.util
+import json
+import os
+
+from shapely.geometry import Point, shape
+
+from backend.database import init_db
+from backend.services.podes import read_villages
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "scripts", "generate_synthetic_podes.py")
+
+def load_generator():
+    spec = importlib.util.spec_from_file_location("generate_synthetic_podes", SCRIPT)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def test_generator_output_is_importable_and_tiles_the_region(monkeypatch, tmp_path):
+    monkeypatch.setenv("INDEST_STORAGE", "embedded")
+    asyncio.run(init_db())
+
+    result = load_generator().generate(300, str(tmp_path), seed=7, per_regency=True)
+    villages = list(read_villages(result["csv"]))
+    assert len(villages) == 300
+    assert len({v.id for v in villages}) == 300
+    assert all(len(v.id) == 10 and v.location is not None for v in villages)
+
+    with open(result["geojson"], encoding="utf-8") as f:
+        features = json.load(f)["features"]
+    polygons = {f["properties"]["iddesa"]: shape(f["geometry"]) for f in features}
+    assert set(polygons) == {v.id for v in villages}
+    for village in villages[:50]:
+        assert polygons[village.id].contains(Point(village.longitude, village.latitude))
+
+    regency_rows = sum(len(list(read_villages(os.path.join(result["regency_dir"], name))))
+                       for name in os.listdir(result["regency_dir"]))
+    assert regency_rows == 300
@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+import backend.database
+from backend.services import trends
+from backend.services.trends import (
+    ALL_REGIONS, compute_regional_trends, plan_section_version, sections_at, metric_values,
+)
+
+def test_plan_section_version_skips_unchanged_waves():
+    # First wave always stored
+    assert plan_section_version([], 2018, "a") == (True, [])
+    # Same content in a later wave: nothing new
+    assert plan_section_version([(2018, "a", 1)], 2021, "a") == (False, [])
+    # Changed content: new version
+    assert plan_section_version([(2018, "a", 1)], 2021, "b") == (True, [])
+    # Older wave imported last, identical to the next version: that version becomes redundant
+    assert plan_section_version([(2021, "b", 2)], 2018, "b") == (True, [2])
+    # Re-importing a corrected wave replaces its version
+    assert plan_section_version([(2018, "a", 1), (2021, "b", 2)], 2021, "c") == (True, [2])
+    # ... or drops it when the correction matches the previous wave
+    assert plan_section_version([(2018, "a", 1), (2021, "b", 2)], 2021, "a") == (False, [2])
+
+def test_sections_and_regional_deltas():
+    versions = [
+        SimpleNamespace(section="economy", year=2018, data={"markets": 1}),
+        SimpleNamespace(section="economy", year=2024, data={"markets": 3}),
+        SimpleNamespace(section="digital", year=2018, data={"bts_count": 2}),
+    ]
+    # 2021 reuses the 2018 versions (unchanged values are not duplicated)
+    assert sections_at(versions, 2021)["economy"] == {"markets": 1}
+    assert metric_values(sections_at(versions, 2024))["markets"] == 3.0
+
+    entries = [
+        ("DEKET", 2018, {"markets": 1.0}),
+        ("DEKET", 2024, {"markets": 3.0}),
+        ("TURI", 2018, {"markets": 2.0}),
+        ("TURI", 2024, {"markets": 2.0}),
+    ]
+    trends = compute_regional_trends(entries)
+    assert trends["DEKET"]["years"] == [2018, 2024]
+    assert trends["DEKET"]["deltas"]["markets"] == [None, 2.0]
+    assert trends[ALL_REGIONS]["metrics"]["markets"] == [3.0, 5.0]
+    assert trends[ALL_REGIONS]["village_counts"] == [2, 2]
+
+def test_trends_are_loaded_once_per_snapshot(monkeypatch):
+    loads = []
+
+    async def load_metric_versions():
+        loads.append(1)
+        await asyncio.sleep(0)
+        return {
+            "1": [SimpleNamespace(section="economy", year=2018, data={"markets": 1}),
+                  SimpleNamespace(section="economy", year=2024, data={"markets": 3})],
+            "2": [SimpleNamespace(section="economy", year=2024, data={"markets": 2})],
+        }
+
+    monkeypatch.setattr(backend.database, "is_embedded", lambda: False)
+    monkeypatch.setattr(trends, "load_metric_versions", load_metric_versions)
+    villages = [
+        SimpleNamespace(id="1", name="A", district="DEKET", podes_years=[2018, 2024]),
+        SimpleNamespace(id="2", name="B", district="TURI", podes_years=[2024]),
+    ]
+    memos = {}
+    snapshot = SimpleNamespace(villages=villages)
+    snapshot.memo = lambda key, builder, patch=None: memos.setdefault(key, builder(snapshot))
+
+    async def requests():
+        return await asyncio.gather(*(trends.get_trend(snapshot, v) for v in villages * 3))
+
+    results = asyncio.run(requests())
+    assert len(loads) == 1
+    first = results[0]
+    assert first["village"]["metrics"]["markets"] == [1.0, 3.0]
+    assert first["district_trend"]["metrics"]["markets"] == [1.0, 3.0]
+    assert first["region_trend"]["metrics"]["markets"] == [1.0, 5.0]
+    assert results[1]["village"]["years"] == [2024]